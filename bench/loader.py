@@ -0,0 +1,28 @@
+""" Loads a generated .sneps file, reporting progress and throughput.
+Usage: python -m bench.loader [number of assertions] """
+
+import os
+import sys
+import tempfile
+from src import Network
+
+def write_kb(path: str, n: int) -> None:
+    with open(path, 'w') as file:
+        file.write("define_type(Agent, [Thing])\n")
+        file.write("define_slot(agent, Agent)\n")
+        file.write("define_slot(has, Thing)\n")
+        file.write("define_caseframe(Has, Proposition, [agent, has])\n")
+        for i in range(n):
+            if i % 2:
+                file.write("Isa(E{}, C{})\n".format(i, i % 100))
+            else:
+                file.write("Has(A{},\n    T{})\n".format(i % 1000, i))
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    path = os.path.join(tempfile.mkdtemp(), "bench.sneps")
+    write_kb(path, n)
+
+    net = Network()
+    report = net.load_sneps(path, progress=print, progress_every=max(1, n // 4))
+    print("{} nodes, {} errors".format(len(net.nodes), len(report.errors)))
@@ -0,0 +1,36 @@
+""" Compares paths_from_all, with sparse matrices and in chunks, against following each path
+from every node with derivable, one node at a time.
+Usage: python -m bench.matrix [number of classes] """
+
+import sys
+import time
+from bench.paths import build
+from src.sneps.PathMatrix import has_scipy, relation_by_matrices, relation_by_chunks
+
+QUERIES = [
+    "kstar(class-)",
+    "kplus(compose(member-, class))",
+    "compose(member-, class, class-, member)",
+    "and(kplus(compose(member-, class)), compose(member-, kstar(compose(class, class-)), class))",
+]
+
+def timed(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    net = build(n)
+    nodes = list(net.nodes.values())
+
+    print("{} nodes".format(len(nodes)))
+    print("{:>10}  {:>10}  {:>10}  query".format("derivable", "chunks", "matrices"))
+    for query in QUERIES:
+        path = net.parse_path(query)
+        net.closure_cache.clear()
+        one_at_a_time = timed(lambda: [path.derivable(node) for node in nodes])
+        net.closure_cache.clear()
+        chunks = timed(lambda: relation_by_chunks(path, nodes))
+        matrices = timed(lambda: relation_by_matrices(path, nodes)) if has_scipy else float('nan')
+        print("{:>9.4f}s  {:>9.4f}s  {:>9.4f}s  {}".format(one_at_a_time, chunks, matrices, query))
@@ -0,0 +1,32 @@
+""" Imports a generated N-Triples file, reporting progress and throughput.
+Usage: python -m bench.ntriples [number of triples] """
+
+import os
+import sys
+import tempfile
+from src import Network
+
+RDF_TYPE = "<http://www.w3.org/1999/02/22-rdf-syntax-ns#type>"
+KNOWS = "<http://xmlns.com/foaf/0.1/knows>"
+
+def write_triples(path: str, n: int) -> None:
+    with open(path, 'w') as file:
+        for i in range(n):
+            if i % 2:
+                file.write("<http://example.org/e{}> {} <http://example.org/C{}> .\n".format(i, RDF_TYPE, i % 100))
+            else:
+                file.write("<http://example.org/a{}> {} <http://example.org/e{}> .\n".format(i % 1000, KNOWS, i + 1))
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    path = os.path.join(tempfile.mkdtemp(), "bench.nt")
+    write_triples(path, n)
+
+    net = Network()
+    net.define_slot("knower", "Entity")
+    net.define_slot("known", "Entity")
+    net.define_caseframe("Knows", "Proposition", ["knower", "known"])
+    report = net.import_ntriples(path, {"rdf:type": "Isa(member, class)", "foaf:knows": "Knows(knower, known)"},
+                                 prefixes={"foaf": "http://xmlns.com/foaf/0.1/"},
+                                 progress=print, progress_every=max(1, n // 4))
+    print("{} nodes, {} errors".format(len(net.nodes), len(report.errors)))
@@ -0,0 +1,66 @@
+""" Compares following a path from many terms one term at a time with following it from all of
+them in one sweep, for the union (paths_from) and per term (paths_from_each), with the closure
+cache cold (just cleared) and warm (after the same query). Then compares testing membership in
+paths_from with path_connects, and the first node of paths_from_iter with all of paths_from,
+down a tree of classes with a high branching factor.
+Usage: python -m bench.paths [number of classes] [number of start terms] [branching factor] """
+
+import contextlib
+import io
+import sys
+import time
+from src import Network
+
+def build(n: int) -> Network:
+    net = Network()
+    with contextlib.redirect_stdout(io.StringIO()):
+        net.assert_wfts(["Isa(C{}, C{})".format(i, j) for i in range(n) for j in (i + 1, 2 * i + 1) if j < n])
+        net.assert_wfts(["Isa(E{}, C{})".format(i, i % n) for i in range(10 * n)])
+    return net
+
+def build_tree(branching: int, depth: int) -> Network:
+    net = Network()
+    with contextlib.redirect_stdout(io.StringIO()):
+        net.assert_wfts(["Isa(T{}, T{})".format(i, (i - 1) // branching)
+                         for i in range(1, sum(branching ** level for level in range(depth + 1)))])
+    return net
+
+def timed(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    branching = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    net = build(n)
+    path = "kplus(compose(member-, class))"
+    terms = ["E{}".format(i) for i in range(k)]
+
+    queries = (("one term at a time", lambda: [net.paths_from([term], path) for term in terms]),
+               ("paths_from", lambda: net.paths_from(terms, path)),
+               ("paths_from_each", lambda: net.paths_from_each(terms, path)))
+
+    print("{} nodes, {} start terms, {}".format(len(net.nodes), k, path))
+    print("{:>20}  {:>9}  {:>9}".format("", "cold", "warm"))
+    for name, query in queries:
+        net.closure_cache.clear()
+        cold = timed(query)
+        print("{:>20}  {:>8.4f}s  {:>8.4f}s".format(name, cold, timed(query)))
+
+    tree = build_tree(branching, 3)
+    leaf = "T{}".format(len(tree.nodes) // 2)
+    down = "kplus(compose(class-, member))"
+    tree.closure_cache.clear()
+    membership = timed(lambda: tree.find_term(leaf) in tree.paths_from(["T0"], down))
+    connects = timed(lambda: tree.path_connects("T0", leaf, down))
+    tree.closure_cache.clear()
+    everything = timed(lambda: tree.paths_from(["T0"], down))
+    first = timed(lambda: next(tree.paths_from_iter(["T0"], down)))
+    print()
+    print("{} nodes, branching {}, T0 to {}, {}".format(len(tree.nodes), branching, leaf, down))
+    print("{:>20}  {:>8.4f}s".format("paths_from", membership))
+    print("{:>20}  {:>8.4f}s".format("path_connects", connects))
+    print("{:>20}  {:>8.4f}s".format("all of paths_from", everything))
+    print("{:>20}  {:>8.4f}s".format("first of iter", first))
@@ -0,0 +1,39 @@
+""" Compares following redundant paths as written with following them after they are rewritten
+by optimize, with the closure cache cleared before each query.
+Usage: python -m bench.rewrite [number of classes] [number of start terms] """
+
+import sys
+import time
+from bench.paths import build
+
+QUERIES = [
+    "kstar(kstar(compose(member-, class)))",
+    "kplus(kstar(compose(member-, class)))",
+    "converse(converse(kplus(compose(member-, class))))",
+    "compose(compose(member-, class), compose(compose(class-, member), member-, class))",
+    "or(compose(member-, class), compose(member-, class), compose(member-, class))",
+    "irreflexive-restrict(kplus(compose(member-, class)))",
+    "irreflexive-restrict(compose(member-, kplus(or(member-, class-))))",
+]
+
+def timed(net, terms, path_str: str) -> float:
+    net.closure_cache.clear()
+    start = time.perf_counter()
+    net.paths_from(terms, path_str)
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    net = build(n)
+    terms = ["E{}".format(i) for i in range(k)]
+
+    print("{} nodes, {} start terms".format(len(net.nodes), k))
+    print("{:>10}  {:>10}  query".format("as written", "optimized"))
+    for query in QUERIES:
+        net.optimize_paths = False
+        written = timed(net, terms, query)
+        net.optimize_paths = True
+        optimized = timed(net, terms, query)
+        print("{:>9.4f}s  {:>9.4f}s  {}".format(written, optimized, query))
+        print("{:>10}  {:>10}  -> {}".format("", "", net.parse_path(query)))
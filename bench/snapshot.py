@@ -0,0 +1,44 @@
+""" Compares rebuilding a network by replaying assertions with saving and loading a snapshot.
+Usage: python -m bench.snapshot [number of assertions] """
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from src import Network
+
+def replay(n: int) -> Network:
+    net = Network()
+    net.define_type("Agent", ["Thing"])
+    net.define_slot("agent", "Agent")
+    net.define_slot("has", "Thing")
+    net.define_caseframe("Has", "Proposition", ["agent", "has"])
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(n):
+            if i % 2:
+                net.assert_wft("Isa(E{}, C{})".format(i, i % 100))
+            else:
+                net.assert_wft("Has(A{}, T{})".format(i % 1000, i))
+    return net
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    path = os.path.join(tempfile.mkdtemp(), "bench.snet")
+
+    start = time.perf_counter()
+    net = replay(n)
+    replay_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    net.save(path)
+    save_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    loaded = Network.load(path)
+    load_time = time.perf_counter() - start
+
+    print("{} assertions, {} nodes, snapshot {:.1f} KiB".format(n, len(net.nodes), os.path.getsize(path) / 1024))
+    print("replay: {:.3f}s  save: {:.3f}s  load: {:.3f}s  (load is {:.0f}x faster than replay)".format(
+        replay_time, save_time, load_time, replay_time / load_time))
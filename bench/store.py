@@ -0,0 +1,51 @@
+""" Compares path and ask latency for a network held in memory and one held in a SQLite node store,
+with the store's cache cold (just cleared) and warm (after the same query).
+Usage: python -m bench.store [number of assertions] [cache size] """
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from src import Network, Inference
+
+def build(n: int) -> Network:
+    net = Network()
+    with contextlib.redirect_stdout(io.StringIO()):
+        net.assert_wft("if(Isa(every(x, Isa(x, C0)), C1), Isa(x, Animal))")
+        net.assert_wfts(["Isa(E{}, C{})".format(i, i % 100) for i in range(n)])
+        net.assert_wfts(["Isa(C{}, C{})".format(i, i + 1) for i in range(99)])
+    return net
+
+def timed(function) -> float:
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        function()
+    return time.perf_counter() - start
+
+def measure(net: Network, store=None) -> list:
+    path = lambda: net.paths_from(["E0"], "kplus(compose(member-, class))")
+    ask = lambda: Inference(net).query("Isa(E100, Animal)")
+    times = []
+    for query in (path, ask):
+        if store is not None:
+            store.clear_cache()
+        times.append(timed(query))
+        times.append(timed(query))
+    return times
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    cache_size = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+    memory = measure(build(n))
+
+    net = build(n)
+    store = net.use_sqlite_store(os.path.join(tempfile.mkdtemp(), "bench.db"), cache_size)
+    stored = measure(net, store)
+
+    print("{} assertions, {} nodes, cache of {} nodes".format(n, len(net.nodes), cache_size))
+    print("{:>8}  {:>12}  {:>12}  {:>12}".format("", "memory", "store cold", "store warm"))
+    for name, i in (("path", 0), ("ask", 2)):
+        print("{:>8}  {:>11.4f}s  {:>11.4f}s  {:>11.4f}s".format(name, memory[i + 1], stored[i], stored[i + 1]))
@@ -2,8 +2,10 @@ from __future__ import annotations # Allows type hints to reference self's type.
 from .Slot import *
 from .SemanticType import SemanticType, SemanticHierarchy
 from .SNError import SNError
+from .Journal import journaled
 from re import match
 from typing import List, Set
+from collections import namedtuple
 
 # =====================================
 # -------------- GLOBALS --------------
@@ -12,6 +14,9 @@ from typing import List, Set
 class CaseframeError(SNError):
     pass
 
+# Yielded by CaseframeMixin.iter_caseframes
+CaseframeRecord = namedtuple('CaseframeRecord', ['name', 'sem_type', 'docstring', 'slots', 'aliases'])
+
 # =====================================
 # ------------- CASEFRAME -------------
 # =====================================
@@ -143,6 +148,10 @@ class Frame:
     def __eq__(self, other: Caseframe) -> bool:
         return self.caseframe is other.caseframe and self.filler_set == other.filler_set
 
+    def key(self) -> tuple:
+        """ A hashable value which is equal for equal frames. """
+        return (self.caseframe, tuple(frozenset(fillers.nodes) for fillers in self.filler_set))
+
     def __str__(self) -> str:
         ret = self.caseframe.name
         for i in range(len(self.filler_set)):
@@ -195,11 +204,20 @@ class CaseframeMixin:
         else:
             raise CaseframeError('ERROR: Caseframe "' + name + '" not defined.')
 
+    def iter_caseframes(self, filter=None):
+        """ Yields a CaseframeRecord for each caseframe (for which filter(record) is true, if given). """
+        for caseframe in self.caseframes.values():
+            record = CaseframeRecord(caseframe.name, caseframe.sem_type.name, caseframe.docstring,
+                                     tuple(slot.name for slot in caseframe.slots), tuple(sorted(caseframe.aliases)))
+            if filter is None or filter(record):
+                yield record
+
     def list_caseframes(self) -> None:
         """ Prints out all representations for all of the defined caseframes. """
         for caseframe in self.caseframes:
             print(self.caseframes[caseframe])
 
+    @journaled
     def same_frame(self, aliases: List[str], caseframe_str: str):
         """ Add aliases to caseframe. """
         caseframe = self.find_caseframe(caseframe_str)
@@ -215,6 +233,7 @@ class CaseframeMixin:
 
             caseframe.add_alias(alias)
 
+    @journaled
     def define_caseframe(self, name: str, sem_type_name: str, slot_names: List[str], docstring: str = "") -> None:
         """ Defines a new caseframe in the network """
 
@@ -241,6 +260,9 @@ class CaseframeMixin:
                 raise CaseframeError("ERROR: Caseframe name '{}' is already taken".format(name))
 
             if new_caseframe == caseframe:
+                # Without output there is no one to ask, so the existing caseframe is left as it is
+                if not self.verbose:
+                    return
                 print("The existing caseframe \"{}\" is identical to the new caseframe you have defined".format(
                     caseframe.name, name))
 
@@ -1,5 +1,9 @@
+from __future__ import annotations
 from .SNError import SNError
+from .Journal import journaled
 from re import match
+from collections import namedtuple
+from weakref import WeakSet
 
 # =====================================
 # -------------- GLOBALS --------------
@@ -8,17 +12,102 @@ from re import match
 class ContextError(SNError):
     pass
 
+# Yielded by ContextMixin.iter_contexts. hyps and ders are the context's own sets, not copies.
+ContextRecord = namedtuple('ContextRecord', ['name', 'parent', 'docstring', 'hyps', 'ders'])
+
+# =====================================
+# --------------- ATMS ----------------
+# =====================================
+
+class ATMS:
+    """ Assumption-based truth maintenance, shared by every context in a network.
+        Each hypothesis used as a premise is given a bit, and each derived node is labelled with the minimal
+        sets of hypotheses (environments, stored as int bitsets) it can be derived from.
+        A node holds in a context when one of its environments is a subset of the
+        context's hypotheses, so one derivation serves every context. """
+
+    def __init__(self) -> None:
+        self.hyp_bits = {} # Maps hypothesis nodes to their bit
+        self.labels = {} # Maps nodes to lists of minimal environments
+        self.consequences = {} # Maps nodes to the justifications they are premises of
+        self.dependents = {} # Maps hypothesis bits to the nodes with an environment containing them
+        self.belief_hooks = [] # Functions called with each context and the node added to its beliefs
+
+    def hyp_bit(self, node) -> int:
+        """ Returns the bitset containing only the given hypothesis, assigning it a bit if necessary. """
+        bit = self.hyp_bits.get(node)
+        if bit is None:
+            bit = 1 << len(self.hyp_bits)
+            self.hyp_bits[node] = bit
+            self._update(node, [bit])
+        return bit
+
+    def justify(self, node, premises) -> None:
+        """ Records that node can be derived from the list of premise nodes. """
+        justification = (node, tuple(premises))
+        for premise in justification[1]:
+            self.consequences.setdefault(premise, []).append(justification)
+        self._update(node, self._combine(justification[1]))
+
+    def holds(self, node, mask: int) -> bool:
+        """ True if some environment of the node is a subset of the hypotheses in mask. """
+        return any(env & ~mask == 0 for env in self.labels.get(node, ()))
+
+    def _combine(self, premises) -> list:
+        """ Every union of one environment from each premise. """
+        envs = [0]
+        for premise in premises:
+            label = self.labels.get(premise)
+            if not label:
+                return []
+            envs = minimal([env | other for env in envs for other in label])
+        return envs
+
+    def _update(self, node, envs: list) -> None:
+        """ Adds environments to a node's label, then updates the labels of its consequences. """
+        pending = [(node, envs)]
+        while pending:
+            node, envs = pending.pop()
+            label = self.labels.get(node, [])
+            new_label = minimal(label + envs)
+            if set(new_label) == set(label):
+                continue
+            self.labels[node] = new_label
+            for env in new_label:
+                while env:
+                    bit = env & -env
+                    self.dependents.setdefault(bit, set()).add(node)
+                    env ^= bit
+            for consequence, premises in self.consequences.get(node, ()):
+                pending.append((consequence, self._combine(premises)))
+
+def minimal(envs: list) -> list:
+    """ Removes duplicate environments and those which are supersets of another. """
+    envs = sorted(set(envs), key=lambda env: bin(env).count('1'))
+    result = []
+    for env in envs:
+        if not any(other & env == other for other in result):
+            result.append(env)
+    return result
+
 # =====================================
 # -------------- CONTEXT --------------
 # =====================================
 
 class Context:
-    def __init__(self, name: str, docstring="", parent=None) -> None:
+    def __init__(self, name: str, docstring="", parent=None, atms: ATMS = None) -> None:
         self.name = name
         self.parent = parent # Another context object
         self.docstring = docstring
         self.hyps = set() # Hypothetical beliefs
         self.ders = set() # Derived beliefs
+        self.atms = ATMS() if atms is None else atms
+        self.hyp_mask = 0 # Bitset of this context's own hypotheses
+        self.revision = 0 # Incremented whenever beliefs are removed
+        self.changes = 0 # Incremented whenever beliefs are added or removed
+        self.snapshots = WeakSet() # BeliefSnapshots in use
+        self.joined = {} # Maps nodes which became beliefs while snapshots were in use to the change that added them
+        self.left = {} # Maps nodes which stopped being beliefs while snapshots were in use to lists of (added, removed) changes
 
     def __contains__(self, term: str) -> bool:
         """ Overloads the 'in' operator for use on contexts.
@@ -26,6 +115,32 @@ class Context:
             i.e. that term in in either hyps or ders """
         return term in self.hyps or term in self.ders
 
+    def snapshot(self) -> BeliefSnapshot:
+        """ The beliefs of the context as they are now, unchanged by later changes. Taking one
+            copies nothing: membership is checked against the context itself, and against
+            the changes made since, which are only recorded while snapshots are in use. """
+        snapshot = BeliefSnapshot(self)
+        self.snapshots.add(snapshot)
+        return snapshot
+
+    def _was_belief(self, node) -> bool:
+        """ Whether the node is a belief before a change, if a snapshot needs to know. """
+        return bool(self.snapshots) and node in self
+
+    def _changed(self, node, was_belief: bool) -> None:
+        self.changes += 1
+        if not self.snapshots:
+            # No snapshot is older than this change
+            if self.joined or self.left:
+                self.joined = {}
+                self.left = {}
+            return
+        is_belief = node in self
+        if is_belief and not was_belief:
+            self.joined[node] = self.changes
+        elif was_belief and not is_belief:
+            self.left.setdefault(node, []).append((self.joined.pop(node, 0), self.changes))
+
     def __repr__(self) -> str:
         return "<Context {} id: {}>".format(self.name, hex(id(self)))
 
@@ -35,20 +150,75 @@ class Context:
             ", ".join([hyp.name for hyp in self.hyps]), ", ".join([der.name for der in self.ders]))
 
     def add_hypothesis(self, node):
+        was_belief = self._was_belief(node)
         self.hyps.add(node)
+        self._changed(node, was_belief)
+        # Hypotheses only need a bit once they are the premise of a justification
+        if node in self.atms.consequences:
+            self.hyp_mask |= self.atms.hyp_bit(node)
+        for hook in self.atms.belief_hooks:
+            hook(self, node)
+
+    def remove_hypothesis(self, node):
+        was_belief = self._was_belief(node)
+        self.hyps.discard(node)
+        self.hyp_mask &= ~self.atms.hyp_bits.get(node, 0)
+        self.revision += 1
+        self._changed(node, was_belief)
 
     def add_derived(self, node):
+        was_belief = self._was_belief(node)
         self.ders.add(node)
+        self._changed(node, was_belief)
+        for hook in self.atms.belief_hooks:
+            hook(self, node)
+
+    def remove_derived(self, node):
+        was_belief = self._was_belief(node)
+        self.ders.discard(node)
+        self.revision += 1
+        self._changed(node, was_belief)
 
     def all_asserted(self):
         return self.hyps | self.ders
 
+    def mask(self) -> int:
+        """ Bitset of the hypotheses of this context, including those inherited from its parents. """
+        return self.hyp_mask if self.parent is None else self.hyp_mask | self.parent.mask()
+
+    def holds(self, node) -> bool:
+        """ True if the node is asserted in this context, or is labelled with a set of
+            hypotheses that this context (or one of its parents) has asserted. """
+        context = self
+        while context is not None:
+            if node in context.hyps:
+                return True
+            context = context.parent
+        return node in self.ders or self.atms.holds(node, self.mask())
+
     def __eq__(self, other) -> bool:
         return self.name == other.name
 
     def __hash__(self) -> int:
         return id(self) # Contexts are unique
 
+class BeliefSnapshot:
+    """ The beliefs of a context as of one change, made by Context.snapshot. Checking a node
+        is a lookup in the context's beliefs while the context is unchanged, and otherwise also
+        in the changes recorded since. """
+
+    __slots__ = ('context', 'version', '__weakref__')
+
+    def __init__(self, context: Context) -> None:
+        self.context = context
+        self.version = context.changes
+
+    def __contains__(self, node) -> bool:
+        context = self.context
+        if node in context.hyps or node in context.ders:
+            return context.changes == self.version or context.joined.get(node, 0) <= self.version
+        return any(added <= self.version < removed for added, removed in context.left.get(node, ()))
+
 # =====================================
 # --------------- MIXIN ---------------
 # =====================================
@@ -61,10 +231,12 @@ class ContextMixin:
             raise NotImplementedError("Mixins can't be instantiated.")
 
         self.contexts = {}
-        self.default_context = Context("default", docstring="The default context")
+        self.atms = ATMS()
+        self.default_context = Context("default", docstring="The default context", atms=self.atms)
         self.current_context = self.default_context
         self.contexts[self.current_context.name] = self.current_context
 
+    @journaled
     def define_context(self, name: str, docstring: str = "", parent: str = "default") -> None:
         """ Defines a new context. """
 
@@ -81,8 +253,11 @@ class ContextMixin:
 
         # Builds new Context object and stores in Network
         else:
-            self.contexts[name] = Context(name, docstring, self.contexts[parent])
+            self.contexts[name] = Context(name, docstring, self.contexts[parent], self.atms)
+            if self.node_store is not None:
+                self.attach_context(self.node_store, self.contexts[name])
 
+    @journaled
     def set_current_context(self, context_name: str) -> None:
         """ Sets the current context. """
         if context_name in self.contexts:
@@ -90,6 +265,85 @@ class ContextMixin:
         else:
             raise ContextError("ERROR: Context \"{}\" does not exist.".format(context_name))
 
+    def justify(self, node, premises) -> None:
+        """ Records that node can be derived from the given premises. The node then holds
+            in every context whose hypotheses support all of the premises. """
+        premises = list(premises)
+        for premise in premises:
+            if premise not in self.atms.hyp_bits:
+                holding = [context for context in self.contexts.values() if premise in context.hyps]
+                if holding:
+                    bit = self.atms.hyp_bit(premise)
+                    for context in holding:
+                        context.hyp_mask |= bit
+        self.atms.justify(node, premises)
+
+    def believes(self, node, context_name: str = None) -> bool:
+        """ Checks if the node is asserted in the named (or current) context, or can be
+            derived there from a recorded justification. """
+        context = self.current_context if context_name is None else self.contexts.get(context_name)
+        if context is None:
+            raise ContextError("ERROR: Context \"{}\" does not exist.".format(context_name))
+        return context.holds(node)
+
+    @journaled
+    def retract(self, node, context_name: str = None) -> set:
+        """ Removes a hypothesis from the named (or current) context. Derived beliefs which
+            depended on it, in that context or any context inheriting from it, are removed
+            unless they still hold through other hypotheses. Returns the removed beliefs. """
+        context = self.current_context if context_name is None else self.contexts.get(context_name)
+        if context is None:
+            raise ContextError("ERROR: Context \"{}\" does not exist.".format(context_name))
+        if node not in context.hyps:
+            raise ContextError("ERROR: {} is not a hypothesis in context {}.".format(node.name, context.name))
+
+        context.remove_hypothesis(node)
+        bit = self.atms.hyp_bits.get(node)
+
+        # Only the beliefs whose labels mention the hypothesis need to be checked. Hypotheses
+        # are only given a bit once they are premises, so the hypothesis itself is checked too,
+        # in case an inheriting context holds an unlabelled copy of it
+        dependents = self.atms.dependents.get(bit, set()) if bit is not None else set()
+        dependents = dependents | {node}
+        removed = set()
+        for other in self.contexts.values():
+            if not self._inherits_from(other, context):
+                continue
+            mask = other.mask()
+            for der in dependents & other.ders:
+                if not (self.atms.holds(der, mask) or self._hypothesis_in(other, der)):
+                    other.remove_derived(der)
+                    removed.add(der)
+        return removed
+
+    def _hypothesis_in(self, context: Context, node) -> bool:
+        """ True if the node is a hypothesis of context or one of its parents. """
+        while context is not None:
+            if node in context.hyps:
+                return True
+            context = context.parent
+        return False
+
+    def _inherits_from(self, context: Context, ancestor: Context) -> bool:
+        """ True if context is ancestor or one of its descendants. """
+        while context is not None:
+            if context is ancestor:
+                return True
+            context = context.parent
+        return False
+
+    def believing_contexts(self, node) -> list:
+        """ Returns the names of all contexts in which the node holds. """
+        return [name for name, context in self.contexts.items() if context.holds(node)]
+
+    def iter_contexts(self, filter=None):
+        """ Yields a ContextRecord for each context (for which filter(record) is true, if given). """
+        for context in self.contexts.values():
+            record = ContextRecord(context.name, None if context.parent is None else context.parent.name,
+                                   context.docstring, context.hyps, context.ders)
+            if filter is None or filter(record):
+                yield record
+
     def list_contexts(self) -> None:
         """ Prints out representations for all the contexts in the network """
         for context_name in self.contexts:
@@ -0,0 +1,154 @@
+"""
+Equivalence classes of the terms related by asserted Equiv propositions, kept per context in a
+union-find structure, so that whether two terms are equivalent, and which terms are in a class,
+need not be found by following the equiv slot's path.
+"""
+
+# =====================================
+# -------------- IMPORTS --------------
+# =====================================
+
+from .Context import ContextError
+from .Node import Molecular
+
+# =====================================
+# ------------ UNION-FIND -------------
+# =====================================
+
+class UnionFind:
+    """ Disjoint sets of nodes, with path compression and union by size. Nodes never added
+        are each in a set of their own. """
+
+    def __init__(self) -> None:
+        self.parent = {} # Maps nodes to their parent; roots are their own parent
+        self.members = {} # Maps roots to the set of nodes in their class
+
+    def find(self, node):
+        """ The node standing for node's class. """
+        root = node
+        parent = self.parent.get(root)
+        while parent is not None and parent is not root:
+            root = parent
+            parent = self.parent[root]
+        # Points every node on the way straight at the root
+        while node is not root and node in self.parent:
+            parent = self.parent[node]
+            self.parent[node] = root
+            node = parent
+        return root
+
+    def union(self, node, other) -> None:
+        """ Merges the classes of the two nodes. """
+        root = self.find(node)
+        other_root = self.find(other)
+        if root is other_root:
+            return
+        members = self.members.get(root) or {root}
+        other_members = self.members.get(other_root) or {other_root}
+        if len(members) < len(other_members):
+            root, other_root = other_root, root
+            members, other_members = other_members, members
+        self.parent[root] = root
+        self.parent[other_root] = root
+        members |= other_members
+        self.members[root] = members
+        self.members.pop(other_root, None)
+
+    def union_all(self, nodes) -> None:
+        nodes = list(nodes)
+        for other in nodes[1:]:
+            self.union(nodes[0], other)
+
+    def same(self, node, other) -> bool:
+        return node is other or self.find(node) is self.find(other)
+
+    def class_of(self, node) -> set:
+        """ The nodes in node's class (a set shared with the structure; do not modify it). """
+        return self.members.get(self.find(node)) or {node}
+
+    def classes(self) -> list:
+        return list(self.members.values())
+
+class ContextEquivalence:
+    """ The union-find structure for one context, built from the Equiv propositions asserted in
+        it or in any context it inherits from. Unions are added as Equiv propositions are
+        asserted; if a belief is removed from the context or one of its parents, the structure
+        is built again when next used. """
+
+    def __init__(self, context) -> None:
+        self.context = context
+        self.classes = None # The UnionFind, once built
+        self.revisions = None # The revisions of the context and its parents when built
+
+    def chain(self) -> list:
+        contexts = []
+        context = self.context
+        while context is not None:
+            contexts.append(context)
+            context = context.parent
+        return contexts
+
+    def get(self, caseframe, slot) -> UnionFind:
+        """ The up to date union-find structure. """
+        chain = self.chain()
+        revisions = [context.revision for context in chain]
+        if self.classes is None or revisions != self.revisions:
+            self.classes = UnionFind()
+            self.revisions = revisions
+            for context in chain:
+                for node in context.all_asserted():
+                    if is_equiv(node, caseframe):
+                        self.classes.union_all(node.follow_down_cable(slot))
+        return self.classes
+
+    def inherits_from(self, context) -> bool:
+        return any(ancestor is context for ancestor in self.chain())
+
+def is_equiv(node, caseframe) -> bool:
+    return isinstance(node, Molecular) and node.frame.caseframe is caseframe
+
+# =====================================
+# --------------- MIXIN ---------------
+# =====================================
+
+class EquivalenceMixin:
+    """ Provides equivalence classes of terms to Network """
+
+    def __init__(self) -> None:
+        if type(self) is EquivalenceMixin:
+            raise NotImplementedError("Mixins can't be instantiated.")
+        self.equivalences = {} # Maps contexts to their ContextEquivalence
+        # atms is defined by ContextMixin, which is initialized first
+        self.atms.belief_hooks.append(self._equivalence_add_belief)
+
+    def _equivalence(self, context_name: str = None) -> UnionFind:
+        context = self.current_context if context_name is None else self.contexts.get(context_name)
+        if context is None:
+            raise ContextError("ERROR: Context \"{}\" does not exist.".format(context_name))
+        equivalence = self.equivalences.get(context)
+        if equivalence is None:
+            equivalence = self.equivalences[context] = ContextEquivalence(context)
+        return equivalence.get(self.find_caseframe('Equiv'), self.find_slot('equiv'))
+
+    def equivalent(self, term: str, other_term: str, context_name: str = None) -> bool:
+        """ True if asserted Equiv propositions in the named (or current) context, or the
+            contexts it inherits from, make the two terms equivalent. """
+        return self._equivalence(context_name).same(self.find_term(term), self.find_term(other_term))
+
+    def equivalence_class(self, term: str, context_name: str = None) -> set:
+        """ The set of nodes equivalent to the term (including it) in the named (or current) context. """
+        return set(self._equivalence(context_name).class_of(self.find_term(term)))
+
+    def equivalence_classes(self, context_name: str = None) -> list:
+        """ The sets of nodes made equivalent by Equiv propositions in the named (or current) context. """
+        return [set(members) for members in self._equivalence(context_name).classes()]
+
+    def _equivalence_add_belief(self, context, node) -> None:
+        """ Adds the unions of a newly asserted Equiv proposition to the structures of the
+            contexts which inherit it. Structures not built yet will read it when they are. """
+        if not self.equivalences or 'Equiv' not in self.caseframes or not is_equiv(node, self.caseframes['Equiv']):
+            return
+        fillers = node.follow_down_cable(self.find_slot('equiv'))
+        for equivalence in self.equivalences.values():
+            if equivalence.classes is not None and equivalence.inherits_from(context):
+                equivalence.classes.union_all(fillers)
@@ -0,0 +1,472 @@
+"""
+Write-ahead journal of the operations applied to a network. A journal is a directory holding
+a snapshot and a sequence of numbered segment files. Each segment is an append-only list of
+records, one per define_*, same_frame, set_current_context, assert_wft or retraction call
+(and per query which built new nodes), each framed by its length and a crc32 so that a record torn by a crash is detected and dropped.
+Recovery loads the snapshot and replays only the segments written after it. A follower, in
+another process, does the same and then keeps applying records as the primary writes them.
+"""
+
+# =====================================
+# -------------- IMPORTS --------------
+# =====================================
+
+import os
+import io
+import struct
+import threading
+from zlib import crc32
+from functools import wraps
+from inspect import signature
+from contextlib import redirect_stdout
+from re import match
+from .SNError import SNError
+
+# =====================================
+# -------------- GLOBALS --------------
+# =====================================
+
+class JournalError(SNError):
+    pass
+
+SEGMENT_MAGIC = b'SNEPSJNL'
+SNAPSHOT_NAME = 'snapshot.snet'
+SEGMENT_PREFIX = 'journal-'
+SEGMENT_SUFFIX = '.log'
+
+SEGMENT_HEADER = struct.Struct('<8sQ') # Magic, generation
+RECORD_HEADER = struct.Struct('<II') # Payload length, crc32 of payload
+
+JOURNALED_OPS = set() # Names of the network methods which may be replayed
+
+def segment_path(directory: str, generation: int) -> str:
+    return os.path.join(directory, "{}{:08d}{}".format(SEGMENT_PREFIX, generation, SEGMENT_SUFFIX))
+
+def segment_generations(directory: str) -> list:
+    """ The generations of the segments in a journal directory, in order. """
+    generations = []
+    for file_name in os.listdir(directory):
+        if file_name.startswith(SEGMENT_PREFIX) and file_name.endswith(SEGMENT_SUFFIX):
+            number = file_name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]
+            if number.isdigit():
+                generations.append(int(number))
+    return sorted(generations)
+
+def write_durably(path: str, data: bytes) -> None:
+    """ Replaces a file with new contents, so that a crash leaves either the old or the new file. """
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+    sync_directory(os.path.dirname(path))
+
+def sync_directory(directory: str) -> None:
+    """ Makes renames and new files in a directory durable, where the platform allows it. """
+    try:
+        descriptor = os.open(directory or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+def counters() -> list:
+    """ The global counters used to name new nodes. """
+    # Imported here to avoid circular imports, since Node uses journaled
+    from .Node import Molecular, Arbitrary, Indefinite
+    from .wft.vars.UniqueRep import VarRep
+    return [Molecular.counter, Arbitrary.counter, Indefinite.counter, VarRep.var_num]
+
+def set_counters(values: list) -> None:
+    from .Node import Molecular, Arbitrary, Indefinite
+    from .wft.vars.UniqueRep import VarRep
+    Molecular.counter, Arbitrary.counter, Indefinite.counter, VarRep.var_num = values
+
+# =====================================
+# -------------- RECORDS --------------
+# =====================================
+
+def encode_value(value, out: bytearray) -> None:
+    """ Appends a tagged argument value: None, bool, int, float, str, node or list. """
+    if value is None:
+        out += b'N'
+    elif value is True or value is False:
+        out += b'T' if value else b'F'
+    elif isinstance(value, int):
+        out += b'i' + struct.pack('<q', value)
+    elif isinstance(value, float):
+        out += b'f' + struct.pack('<d', value)
+    elif isinstance(value, str):
+        encoded = value.encode('utf-8')
+        out += b's' + struct.pack('<I', len(encoded)) + encoded
+    elif isinstance(value, (list, tuple, set)):
+        out += b'l' + struct.pack('<I', len(value))
+        for item in value:
+            encode_value(item, out)
+    elif hasattr(value, 'up_cableset'):
+        # Nodes are written by name
+        encoded = value.name.encode('utf-8')
+        out += b'n' + struct.pack('<I', len(encoded)) + encoded
+    else:
+        raise JournalError("ERROR: Cannot journal a value of type {}.".format(type(value).__name__))
+
+def decode_value(data: bytes, position: int, net):
+    """ Returns the value starting at position, and the position after it. """
+    tag = data[position:position + 1]
+    position += 1
+    if tag == b'N':
+        return None, position
+    if tag == b'T' or tag == b'F':
+        return tag == b'T', position
+    if tag == b'i':
+        return struct.unpack_from('<q', data, position)[0], position + 8
+    if tag == b'f':
+        return struct.unpack_from('<d', data, position)[0], position + 8
+    if tag == b's' or tag == b'n':
+        length = struct.unpack_from('<I', data, position)[0]
+        position += 4
+        value = data[position:position + length].decode('utf-8')
+        if tag == b's':
+            return value, position + length
+        node = net.nodes.get(value)
+        if node is None:
+            raise JournalError("ERROR: The journal refers to node {}, which replaying it did not build.".format(value))
+        return node, position + length
+    if tag == b'l':
+        length = struct.unpack_from('<I', data, position)[0]
+        position += 4
+        values = []
+        for _ in range(length):
+            value, position = decode_value(data, position, net)
+            values.append(value)
+        return values, position
+    raise JournalError("ERROR: Unknown journal value tag {!r}.".format(tag))
+
+def encode_record(op: str, args: list, naming: list) -> bytes:
+    """ A framed record: length, crc32, then the operation name, its arguments, and the
+        naming counters as they were before the operation, so that replaying it names
+        new nodes the same way even if other nodes were built in between (e.g. by queries). """
+    payload = bytearray()
+    encode_value(op, payload)
+    encode_value(args, payload)
+    encode_value(naming, payload)
+    return RECORD_HEADER.pack(len(payload), crc32(payload)) + bytes(payload)
+
+def read_records(file, net):
+    """ Yields (op, args, naming counters) for each complete record from the file's current
+        position, leaving the file positioned after the last complete record. A partially
+        written or corrupt record, which is where a crash (or a writer) left off, is not read. """
+    while True:
+        offset = file.tell()
+        header = file.read(RECORD_HEADER.size)
+        if len(header) == RECORD_HEADER.size:
+            length, checksum = RECORD_HEADER.unpack(header)
+            payload = file.read(length)
+            if len(payload) == length and crc32(payload) == checksum:
+                op, position = decode_value(payload, 0, net)
+                args, position = decode_value(payload, position, net)
+                naming, _ = decode_value(payload, position, net)
+                yield op, args, naming
+                continue
+        file.seek(offset)
+        return
+
+def open_segment(directory: str, generation: int):
+    """ Opens a segment for reading, positioned after its header. """
+    file = open(segment_path(directory, generation), 'rb')
+    magic, stored_generation = SEGMENT_HEADER.unpack(file.read(SEGMENT_HEADER.size))
+    if magic != SEGMENT_MAGIC or stored_generation != generation:
+        file.close()
+        raise JournalError("ERROR: {} is not journal segment {}.".format(file.name, generation))
+    return file
+
+# =====================================
+# -------------- JOURNAL --------------
+# =====================================
+
+class Journal:
+    """ Appends records to the newest segment of a journal directory. Records are buffered
+        and written with a single fsync once group_size of them are pending, or on flush. """
+
+    def __init__(self, directory: str, generation: int, group_size: int = 64) -> None:
+        self.directory = directory
+        self.group_size = group_size
+        self.pending = []
+        self.generation = None
+        self.file = None
+        self._open_segment(generation)
+
+    def _open_segment(self, generation: int) -> None:
+        self.generation = generation
+        self.file = open(segment_path(self.directory, generation), 'wb')
+        self.file.write(SEGMENT_HEADER.pack(SEGMENT_MAGIC, generation))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        sync_directory(self.directory)
+
+    def append(self, op: str, args: list, naming: list) -> None:
+        """ Adds the record of an operation which has just been applied. """
+        self.pending.append(encode_record(op, args, naming))
+        if len(self.pending) >= self.group_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """ Writes and fsyncs every pending record. """
+        if self.pending:
+            self.file.write(b''.join(self.pending))
+            self.pending = []
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def rotate(self) -> None:
+        """ Flushes the current segment and starts the next one. """
+        self.flush()
+        self.file.close()
+        self._open_segment(self.generation + 1)
+
+    def close(self) -> None:
+        self.flush()
+        self.file.close()
+
+def journaled(method):
+    """ Records each successful outermost call of a network method in the network's journal.
+        Calls made by other journaled methods are not recorded, since replaying the outer
+        call repeats them. """
+    JOURNALED_OPS.add(method.__name__)
+    method_signature = signature(method)
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        depth = self._journal_depth
+        if depth == 0 and self.read_only:
+            raise JournalError("ERROR: The network is a read-only follower.")
+        journal = self.journal if depth == 0 else None
+        if journal is not None:
+            arguments = method_signature.bind(self, *args, **kwargs)
+            arguments.apply_defaults()
+            values = list(arguments.arguments.values())[1:]
+            naming = counters()
+        self._journal_depth = depth + 1
+        try:
+            result = method(self, *args, **kwargs)
+        finally:
+            self._journal_depth = depth
+        if journal is not None:
+            journal.append(method.__name__, values, naming)
+        return result
+    return wrapper
+
+def journaled_build(method):
+    """ Like journaled, for network methods which build nodes without otherwise changing the
+        network, such as parsing the wft of a query. An outermost call is only recorded if it
+        added nodes, so that replaying the journal gives those nodes the names they have here
+        and later records can refer to them. Followers may call these methods; the nodes they
+        build are their own (see _move_local_nodes). """
+    JOURNALED_OPS.add(method.__name__)
+    method_signature = signature(method)
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        depth = self._journal_depth
+        journal = self.journal if depth == 0 else None
+        if journal is None:
+            return method(self, *args, **kwargs)
+        arguments = method_signature.bind(self, *args, **kwargs)
+        arguments.apply_defaults()
+        values = list(arguments.arguments.values())[1:]
+        naming = counters()
+        size = len(self.nodes)
+        self._journal_depth = depth + 1
+        try:
+            result = method(self, *args, **kwargs)
+        finally:
+            self._journal_depth = depth
+        if len(self.nodes) != size:
+            journal.append(method.__name__, values, naming)
+        return result
+    return wrapper
+
+def install_snapshot(directory: str, data: bytes, generation: int) -> None:
+    """ Writes a compacted snapshot, then deletes the segments it includes. The newest of
+        those is kept until the next compaction, so that a follower still reading it can
+        move on to the next segment. """
+    write_durably(os.path.join(directory, SNAPSHOT_NAME), data)
+    for old_generation in segment_generations(directory):
+        if old_generation < generation - 1:
+            os.remove(segment_path(directory, old_generation))
+
+# =====================================
+# --------------- MIXIN ---------------
+# =====================================
+
+class JournalMixin:
+    """ Provides a write-ahead journal, recovery and compaction to Network """
+
+    def __init__(self) -> None:
+        if type(self) is JournalMixin:
+            raise NotImplementedError("Mixins can't be instantiated.")
+
+        self.journal = None
+        self.journal_generation = 0 # First journal segment not included in a loaded snapshot
+        self._journal_depth = 0
+        self._compaction = None # Background compaction thread
+        self.read_only = False # True for followers, which only apply another network's journal
+        self._following = None # Open segment of the journal being followed
+        self._local_nodes = [] # Nodes a follower built itself, e.g. while parsing queries
+
+    def attach_journal(self, directory: str, group_size: int = 64) -> None:
+        """ Starts journaling to an empty (or new) directory. The current state of the network
+            is written as the initial snapshot. """
+        if self.journal is not None:
+            raise JournalError("ERROR: The network already has a journal.")
+        os.makedirs(directory, exist_ok=True)
+        if segment_generations(directory) or os.path.exists(os.path.join(directory, SNAPSHOT_NAME)):
+            raise JournalError("ERROR: {} already holds a journal. Use Network.recover.".format(directory))
+        write_durably(os.path.join(directory, SNAPSHOT_NAME), self.snapshot_bytes(journal_generation=1))
+        self.journal = Journal(directory, 1, group_size)
+
+    def flush_journal(self) -> None:
+        """ Writes and fsyncs any journal records still buffered. """
+        if self.journal is not None:
+            self.journal.flush()
+
+    def detach_journal(self) -> None:
+        """ Flushes and closes the journal, waiting for any compaction to finish. """
+        self.wait_for_compaction()
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    def compact_journal(self, background: bool = True):
+        """ Folds the journal into a new snapshot. The network is serialized immediately and new
+            records go to a fresh segment; writing the snapshot and removing the segments it
+            replaces happens in a background thread, which is returned. """
+        if self.journal is None:
+            raise JournalError("ERROR: The network has no journal.")
+        self.wait_for_compaction()
+        self.journal.flush()
+        generation = self.journal.generation + 1
+        data = self.snapshot_bytes(journal_generation=generation)
+        self.journal.rotate()
+        if not background:
+            install_snapshot(self.journal.directory, data, generation)
+            return None
+        self._compaction = threading.Thread(target=install_snapshot, daemon=True,
+                                            args=(self.journal.directory, data, generation))
+        self._compaction.start()
+        return self._compaction
+
+    def wait_for_compaction(self) -> None:
+        if self._compaction is not None:
+            self._compaction.join()
+            self._compaction = None
+
+    @classmethod
+    def recover(cls, directory: str, group_size: int = 64):
+        """ Rebuilds a network from a journal directory by loading its snapshot and replaying
+            the segments written since. Journaling then continues in a new segment. """
+        net = cls.load(os.path.join(directory, SNAPSHOT_NAME))
+        generation = net.journal_generation
+        for segment_generation in segment_generations(directory):
+            if segment_generation >= generation:
+                with open_segment(directory, segment_generation) as file:
+                    net.replay(file)
+                generation = segment_generation + 1
+        net.journal = Journal(directory, generation, group_size)
+        return net
+
+    def replay(self, file) -> int:
+        """ Applies the complete journal records remaining in an open segment file.
+            Returns the number of records applied. """
+        applied = 0
+        with redirect_stdout(io.StringIO()):
+            for op, args, naming in read_records(file, self):
+                if applied == 0:
+                    self._move_local_nodes()
+                self.apply_record(op, args, naming)
+                applied += 1
+        return applied
+
+    def apply_record(self, op: str, args: list, naming: list) -> None:
+        """ Repeats one journaled operation. """
+        if op not in JOURNALED_OPS:
+            raise JournalError("ERROR: Unknown journal operation {}.".format(op))
+        set_counters(naming)
+        self._journal_depth += 1
+        try:
+            getattr(self, op)(*args)
+        finally:
+            self._journal_depth -= 1
+
+    # Following
+    # =========
+
+    @classmethod
+    def follow(cls, directory: str):
+        """ Opens a read-only copy of the network journaled in directory by another process.
+            poll() then applies whatever the primary has written since. """
+        while True:
+            net = cls.load(os.path.join(directory, SNAPSHOT_NAME))
+            net.read_only = True
+            net.node_hooks.append(net._note_local_node)
+            net.reuse_hooks.append(net._adopt_local_node)
+            try:
+                net._following = open_segment(directory, net.journal_generation)
+            except FileNotFoundError:
+                continue # Compacted between reading the snapshot and opening the segment
+            net.poll()
+            return net
+
+    def poll(self) -> int:
+        """ Applies the complete records added to the followed journal since the last poll,
+            moving on to newer segments as the primary rotates them. Returns the number applied. """
+        if self._following is None:
+            raise JournalError("ERROR: The network is not following a journal.")
+        directory = os.path.dirname(self._following.name)
+        generation = self.journal_generation
+        applied = self.replay(self._following)
+        while any(newer > generation for newer in segment_generations(directory)):
+            # The primary flushes a segment before starting the next, so read what remains first
+            applied += self.replay(self._following)
+            try:
+                next_segment = open_segment(directory, generation + 1)
+            except FileNotFoundError:
+                raise JournalError("ERROR: Segment {} of {} was compacted before the follower read it. "
+                                   "Use Network.follow again.".format(generation + 1, directory))
+            self._following.close()
+            self._following = next_segment
+            generation += 1
+            self.journal_generation = generation
+            applied += self.replay(self._following)
+        return applied
+
+    def unfollow(self) -> None:
+        if self._following is not None:
+            self._following.close()
+            self._following = None
+
+    def _note_local_node(self, node) -> None:
+        if self.read_only and self._journal_depth == 0:
+            self._local_nodes.append(node)
+
+    def _move_local_nodes(self) -> None:
+        """ Renames the generated names of nodes a follower built itself, since the primary
+            may give those names to its own new nodes. """
+        for node in self._local_nodes:
+            if match(r'^(wft|arb|ind)\d+$', node.name) and self.nodes.get(node.name) is node:
+                self.rename_node(node, node.name + "_local")
+        self._local_nodes = []
+
+    def _adopt_local_node(self, node) -> None:
+        """ When a record being applied builds a wft which the follower had already built
+            itself, the primary named a new node there, so the follower's node takes that name. """
+        # Imported here to avoid circular imports, since Node uses journaled
+        from .Node import Molecular
+        if self._journal_depth > 0 and isinstance(node, Molecular) and node.name.endswith("_local"):
+            self.rename_node(node, "wft" + str(Molecular.counter))
+            Molecular.counter += 1
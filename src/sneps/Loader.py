@@ -0,0 +1,239 @@
+"""
+Streaming loader for .sneps knowledge base files. A file is a sequence of top-level terms,
+which may span several lines and end where their parentheses balance. Terms whose head is the
+name of a network definition function (e.g. define_slot(owner, Entity, min=1)) are run as
+directives; every other term is asserted. Text from a ';' to the end of a line is a comment.
+"""
+
+# =====================================
+# -------------- IMPORTS --------------
+# =====================================
+
+from collections import namedtuple
+from re import match, compile
+from time import monotonic
+from .SNError import SNError
+
+# =====================================
+# -------------- GLOBALS --------------
+# =====================================
+
+class LoaderError(SNError):
+    pass
+
+# Network functions which may be called from a .sneps file
+DIRECTIVES = {'define_type', 'define_slot', 'define_caseframe', 'same_frame', 'define_context',
+              'set_current_context', 'define_path', 'define_term', 'retract_wft'}
+
+COMMENT = ';'
+
+# The start of a term in the first column of a line, e.g. Isa( or define_slot(
+TERM_HEAD = compile(r'[A-Za-z_][A-Za-z0-9_]*\s*\(')
+
+FailedTerm = namedtuple('FailedTerm', ['line', 'text', 'message'])
+
+# =====================================
+# ------------- SPLITTING -------------
+# =====================================
+
+def split_terms(lines):
+    """ Yields (line number, text, balanced) for each top-level term in an iterable of lines. A
+        term ends where its brackets balance, or at the end of a line if it has none open. A term
+        left open by a blank line, or by a line starting with a new term's head in its first
+        column, ends there unbalanced, so that one missing bracket only loses its own term. """
+    term = []
+    start = None
+    depth = 0
+    for line_number, line in enumerate(lines, 1):
+        if depth > 0 and (not line.strip() or TERM_HEAD.match(line)):
+            yield start, ''.join(term).strip(), False
+            term, start, depth = [], None, 0
+        quoted = False
+        escaped = False
+        for char in line:
+            if quoted:
+                term.append(char)
+                if escaped:
+                    escaped = False
+                elif char == '\\':
+                    escaped = True
+                elif char == '"':
+                    quoted = False
+                continue
+            if char == COMMENT:
+                break
+            if not term and char.isspace():
+                continue
+            if start is None:
+                start = line_number
+            term.append(char)
+            if char == '"':
+                quoted = True
+            elif char in '([{':
+                depth += 1
+            elif char in ')]}':
+                depth -= 1
+                if depth <= 0:
+                    yield start, ''.join(term).strip(), depth == 0
+                    term, start, depth = [], None, 0
+        if depth == 0 and term and ''.join(term).strip():
+            yield start, ''.join(term).strip(), True
+            term, start = [], None
+        elif term:
+            term.append(' ')
+    if term and ''.join(term).strip():
+        yield start, ''.join(term).strip(), depth == 0
+
+def split_arguments(text: str) -> list:
+    """ Splits text at the commas which are not inside brackets or quotes. """
+    parts = []
+    depth = 0
+    quoted = False
+    escaped = False
+    current = []
+    for char in text:
+        if quoted:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                quoted = False
+        elif char == '"':
+            quoted = True
+        elif char in '([{':
+            depth += 1
+        elif char in ')]}':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            parts.append(''.join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    if ''.join(current).strip():
+        parts.append(''.join(current).strip())
+    return parts
+
+def parse_value(text: str):
+    """ A directive argument: a [list], a "string", an integer, None, or any other text as is
+        (so that paths like compose(!, equiv) need no quotes). """
+    if text.startswith('[') and text.endswith(']'):
+        return [parse_value(part) for part in split_arguments(text[1:-1])]
+    if len(text) >= 2 and text.startswith('"') and text.endswith('"'):
+        return text[1:-1].encode('latin-1', 'backslashreplace').decode('unicode_escape')
+    if match(r'^-?\d+$', text):
+        return int(text)
+    if text == 'None':
+        return None
+    return text
+
+def parse_directive(text: str):
+    """ Returns (name, args, kwargs) if text is a directive, otherwise None. """
+    head = match(r'^([A-Za-z_][A-Za-z0-9_]*)\s*\(', text)
+    if head is None or head.group(1) not in DIRECTIVES:
+        return None
+    if not text.endswith(')'):
+        raise LoaderError("ERROR: Directive {} is missing its closing parenthesis.".format(head.group(1)))
+    args = []
+    kwargs = {}
+    for part in split_arguments(text[head.end():-1]):
+        keyword = match(r'^([A-Za-z_][A-Za-z0-9_]*)\s*=', part)
+        if keyword:
+            kwargs[keyword.group(1)] = parse_value(part[keyword.end():].strip())
+        else:
+            args.append(parse_value(part))
+    return head.group(1), args, kwargs
+
+# =====================================
+# -------------- REPORT ---------------
+# =====================================
+
+class LoadReport:
+    """ Progress and outcome of loading a file. """
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self.terms = 0 # Top-level terms read
+        self.asserted = 0
+        self.directives = 0
+        self.errors = [] # FailedTerms
+        self.started = monotonic()
+        self.seconds = 0.0
+
+    @property
+    def rate(self) -> float:
+        """ Terms read per second. """
+        return self.terms / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self) -> str:
+        return "{}: {} terms ({} asserted, {} directives, {} errors) in {:.2f}s, {:.0f} terms/s".format(
+            self.source, self.terms, self.asserted, self.directives, len(self.errors), self.seconds, self.rate)
+
+# =====================================
+# --------------- MIXIN ---------------
+# =====================================
+
+class LoaderMixin:
+    """ Provides loading of .sneps files to Network """
+
+    def __init__(self) -> None:
+        if type(self) is LoaderMixin:
+            raise NotImplementedError("Mixins can't be instantiated.")
+
+    def load_sneps(self, source, batch_size: int = 500, progress=None, progress_every: int = 10000) -> LoadReport:
+        """ Reads a .sneps file (a path, or any iterable of lines) as a stream. Assertions are
+            asserted in batches; errors are collected with their line numbers instead of stopping
+            the load. progress, if given, is called with the LoadReport every progress_every terms. """
+        if isinstance(source, str):
+            with open(source) as file:
+                return self._load_lines(file, source, batch_size, progress, progress_every)
+        return self._load_lines(source, getattr(source, 'name', '<stream>'), batch_size, progress, progress_every)
+
+    def _load_lines(self, lines, source: str, batch_size: int, progress, progress_every: int) -> LoadReport:
+        report = LoadReport(source)
+        batch = [] # (line number, wft string) pairs waiting to be asserted
+
+        def flush():
+            if not batch:
+                return
+            failed = self.assert_wfts([wft_str for _, wft_str in batch])
+            for i, message in failed:
+                report.errors.append(FailedTerm(batch[i][0], batch[i][1], message))
+            report.asserted += len(batch) - len(failed)
+            batch.clear()
+
+        for line_number, text, balanced in split_terms(lines):
+            report.terms += 1
+            if not balanced:
+                message = "ERROR: Unbalanced brackets in the term starting on line {}.".format(line_number)
+                report.errors.append(FailedTerm(line_number, text, message))
+                continue
+            try:
+                directive = parse_directive(text)
+            except LoaderError as e:
+                report.errors.append(FailedTerm(line_number, text, str(e)))
+                continue
+
+            if directive is None:
+                batch.append((line_number, text))
+                if len(batch) >= batch_size:
+                    flush()
+            else:
+                # Directives take effect in order, so earlier assertions go first
+                flush()
+                name, args, kwargs = directive
+                try:
+                    getattr(self, name)(*args, **kwargs)
+                    report.directives += 1
+                except (SNError, TypeError, ValueError) as e:
+                    report.errors.append(FailedTerm(line_number, text, str(e)))
+
+            if progress is not None and report.terms % progress_every == 0:
+                report.seconds = monotonic() - report.started
+                progress(report)
+
+        flush()
+        report.seconds = monotonic() - report.started
+        if progress is not None:
+            progress(report)
+        return report
@@ -0,0 +1,257 @@
+"""
+Streaming import of RDF N-Triples files. Each predicate in a user-supplied mapping names a
+caseframe and the slots its subject and object fill, e.g. {"rdf:type": "Isa(member, class)"}.
+Subjects and objects become base terms, and the molecular nodes for the triples are built
+directly in batches, without the wft parser.
+"""
+
+# =====================================
+# -------------- IMPORTS --------------
+# =====================================
+
+from re import compile
+from time import monotonic
+from .SNError import SNError
+from .Caseframe import Frame, Fillers
+from .Node import Base, Molecular
+from .Journal import journaled
+from .Loader import FailedTerm
+
+# =====================================
+# -------------- GLOBALS --------------
+# =====================================
+
+class NTriplesError(SNError):
+    pass
+
+DEFAULT_PREFIXES = {
+    'rdf': 'http://www.w3.org/1999/02/22-rdf-syntax-ns#',
+    'rdfs': 'http://www.w3.org/2000/01/rdf-schema#',
+    'owl': 'http://www.w3.org/2002/07/owl#',
+    'xsd': 'http://www.w3.org/2001/XMLSchema#',
+}
+
+# An IRI, a blank node or a literal (with an optional datatype or language)
+TERM = r'<([^>]*)>|_:([A-Za-z0-9_.\-]+)|"((?:[^"\\]|\\.)*)"(?:\^\^<[^>]*>|@[A-Za-z0-9\-]+)?'
+TRIPLE = compile(r'^\s*(?:' + TERM + r')\s+<([^>]*)>\s+(?:' + TERM + r')\s*\.\s*(?:#.*)?$')
+ILLEGAL_NAME_CHARACTERS = compile(r'[^A-Za-z0-9_]')
+RESERVED_NAME = compile(r'^(wft|arb|ind)\d+$') # Generated node names
+MAPPED_FRAME = compile(r'^\s*([A-Za-z][A-Za-z0-9_]*)\s*\(\s*([A-Za-z][A-Za-z0-9_]*)\s*,\s*([A-Za-z][A-Za-z0-9_]*)\s*\)\s*$')
+
+# =====================================
+# -------------- MAPPING --------------
+# =====================================
+
+def expand_iri(name: str, prefixes: dict) -> str:
+    """ Expands a prefixed name like rdf:type to a full IRI. Other names are returned as is. """
+    prefix, _, local = name.partition(':')
+    if prefix in prefixes and not local.startswith('//'):
+        return prefixes[prefix] + local
+    return name
+
+def parse_mapping(mapping: dict, prefixes: dict) -> dict:
+    """ Maps full predicate IRIs to (caseframe name, subject slot name, object slot name).
+        Mapping values are strings like "Isa(member, class)" or such tuples. """
+    parsed = {}
+    for predicate, target in mapping.items():
+        if isinstance(target, str):
+            target_match = MAPPED_FRAME.match(target)
+            if target_match is None:
+                raise NTriplesError("ERROR: Cannot read the mapping \"{}\". Use the form Caseframe(subject_slot, object_slot).".format(target))
+            target = target_match.groups()
+        parsed[expand_iri(predicate, prefixes)] = tuple(target)
+    return parsed
+
+def check_target(caseframe, slot_names: list) -> None:
+    """ Raises an NTriplesError unless the named slots are slots of the caseframe, and every
+        other slot of the caseframe may be left empty. """
+    caseframe_slots = [slot.name for slot in caseframe.slots]
+    for slot_name in slot_names:
+        if slot_name not in caseframe_slots:
+            raise NTriplesError("ERROR: Caseframe {} has no slot {}.".format(caseframe.name, slot_name))
+    for slot in caseframe.slots:
+        if slot.name not in slot_names and slot.min >= 1:
+            raise NTriplesError("ERROR: Caseframe {} needs a filler for slot {}, which triples mapped to it cannot fill.".format(
+                caseframe.name, slot.name))
+
+def local_name(iri: str) -> str:
+    """ The part of an IRI after its last '#', '/' or ':', made into a legal term name. """
+    iri = iri.rstrip('#/:')
+    name = ILLEGAL_NAME_CHARACTERS.sub('_', iri[max(iri.rfind(separator) for separator in '#/:') + 1:])
+    if not name[:1].isalpha() or not name[:1].isascii():
+        name = 'n' + name
+    if RESERVED_NAME.match(name):
+        name = 't_' + name
+    return name
+
+# =====================================
+# -------------- REPORT ---------------
+# =====================================
+
+class ImportReport:
+    """ Progress and outcome of importing an N-Triples file. """
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self.triples = 0 # Triples read
+        self.built = 0 # Triples whose node was built or found
+        self.skipped = 0 # Triples with an unmapped predicate or a literal object
+        self.errors = [] # FailedTerms
+        self.started = monotonic()
+        self.seconds = 0.0
+
+    @property
+    def rate(self) -> float:
+        """ Triples read per second. """
+        return self.triples / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self) -> str:
+        return "{}: {} triples ({} built, {} skipped, {} errors) in {:.2f}s, {:.0f} triples/s".format(
+            self.source, self.triples, self.built, self.skipped, len(self.errors), self.seconds, self.rate)
+
+# =====================================
+# --------------- MIXIN ---------------
+# =====================================
+
+class NTriplesMixin:
+    """ Provides importing of N-Triples files to Network """
+
+    def __init__(self) -> None:
+        if type(self) is NTriplesMixin:
+            raise NotImplementedError("Mixins can't be instantiated.")
+        self.iri_names = {} # Maps imported IRIs and blank node labels to term names
+        self.iri_terms = set() # The term names in iri_names
+
+    def import_ntriples(self, source, mapping: dict, prefixes: dict = None, asserted: bool = True,
+                        batch_size: int = 10000, progress=None, progress_every: int = 100000) -> ImportReport:
+        """ Reads an N-Triples file (a path, or any iterable of lines) as a stream. Each triple whose
+            predicate is in mapping is built as a node of the mapped caseframe, asserted in the current
+            context if asserted is set. Triples with other predicates or literal objects are skipped.
+            progress, if given, is called with the ImportReport every progress_every triples. """
+        prefixes = dict(DEFAULT_PREFIXES, **(prefixes or {}))
+        targets = parse_mapping(mapping, prefixes)
+        for caseframe_name, subject_slot, object_slot in targets.values():
+            check_target(self.find_caseframe(caseframe_name), [subject_slot, object_slot])
+
+        if isinstance(source, str):
+            with open(source, encoding='utf-8') as file:
+                return self._import_lines(file, source, targets, asserted, batch_size, progress, progress_every)
+        return self._import_lines(source, getattr(source, 'name', '<stream>'), targets, asserted,
+                                  batch_size, progress, progress_every)
+
+    def _import_lines(self, lines, source: str, targets: dict, asserted: bool, batch_size: int,
+                      progress, progress_every: int) -> ImportReport:
+        report = ImportReport(source)
+        batches = {} # Maps mapping targets to lists of (line number, text, [subject, object])
+
+        def flush(target):
+            batch = batches.pop(target, None)
+            if not batch:
+                return
+            caseframe_name, subject_slot, object_slot = target
+            failed = self.build_frames(caseframe_name, [subject_slot, object_slot],
+                                       [names for _, _, names in batch], asserted)
+            for i, message in failed:
+                report.errors.append(FailedTerm(batch[i][0], batch[i][1], message))
+            report.built += len(batch) - len(failed)
+
+        for line_number, line in enumerate(lines, 1):
+            text = line.strip()
+            if not text or text.startswith('#'):
+                continue
+            report.triples += 1
+            triple = TRIPLE.match(text)
+            if triple is None:
+                report.errors.append(FailedTerm(line_number, text, "ERROR: Not an N-Triples statement."))
+                continue
+            subject_iri, subject_blank, subject_literal, predicate, object_iri, object_blank, object_literal = triple.groups()
+            if subject_literal is not None:
+                report.errors.append(FailedTerm(line_number, text, "ERROR: A literal cannot be a subject."))
+                continue
+            target = targets.get(predicate)
+            if target is None or object_literal is not None:
+                report.skipped += 1
+                continue
+
+            batch = batches.setdefault(target, [])
+            batch.append((line_number, text, [self._intern(subject_iri, subject_blank),
+                                              self._intern(object_iri, object_blank)]))
+            if len(batch) >= batch_size:
+                flush(target)
+
+            if progress is not None and report.triples % progress_every == 0:
+                report.seconds = monotonic() - report.started
+                progress(report)
+
+        for target in list(batches):
+            flush(target)
+        report.seconds = monotonic() - report.started
+        if progress is not None:
+            progress(report)
+        return report
+
+    def _intern(self, iri: str, blank: str) -> str:
+        """ The term name for an IRI or blank node label, chosen the first time it is seen.
+            Different IRIs with the same local name are given numbered names; a term defined
+            other than by an import is used for the first IRI with its name. """
+        key = iri if iri is not None else '_:' + blank
+        name = self.iri_names.get(key)
+        if name is None:
+            name = local_name(iri) if iri is not None else 'blank_' + local_name(blank)
+            base, number = name, 1
+            while name in self.iri_terms:
+                number += 1
+                name = "{}_{}".format(base, number)
+            self.iri_names[key] = name
+            self.iri_terms.add(name)
+        return name
+
+    @journaled
+    def build_frames(self, caseframe_name: str, slot_names: list, rows: list, asserted: bool = True) -> list:
+        """ Builds (or finds) a node of the caseframe for each row, a list with the name of the
+            term filling each of the named slots. Missing terms are defined as base terms once the
+            row's frame is built. Other slots of the caseframe are left empty, so they must allow
+            no fillers. Returns a list of (index, error message) for the rows which could not be built. """
+        caseframe = self.find_caseframe(caseframe_name)
+        check_target(caseframe, slot_names)
+        positions = [[slot.name for slot in caseframe.slots].index(slot_name) for slot_name in slot_names]
+        entity = self.sem_hierarchy.get_type("Entity")
+        context = self.current_context
+        errors = []
+        for i, names in enumerate(rows):
+            try:
+                filler_set = [Fillers() for _ in caseframe.slots]
+                new_terms = {}
+                for position, name in zip(positions, names):
+                    term = self.nodes.get(name)
+                    if term is None:
+                        term = new_terms.get(name)
+                    if term is None:
+                        # As define_term does, for a name already known to be legal
+                        term = new_terms[name] = Base(name, entity)
+                    if name in new_terms:
+                        # Typed for the slot here, so that the frame does not retype a term
+                        # the network does not have yet
+                        slot_type = caseframe.slots[position].sem_type
+                        if term.sem_type is not slot_type and not slot_type.subtype(term.sem_type):
+                            term.sem_type = self.sem_hierarchy.respecify(name, term.sem_type, slot_type)
+                    filler_set[position].nodes.add(term)
+                frame = Frame(caseframe, filler_set)
+                # The new terms are only added once the frame is known to be legal
+                for term in new_terms.values():
+                    self.add_node(term)
+                node = None
+                for existing in self.nodes_with_frame(frame):
+                    if type(existing) is Molecular and existing.has_frame(frame):
+                        node = self.reuse_node(existing)
+                        break
+                if node is None:
+                    node = Molecular(frame)
+                    self.add_node(node)
+            except SNError as e:
+                errors.append((i, str(e)))
+                continue
+            if asserted:
+                context.add_hypothesis(node)
+        self.commit_store()
+        return errors
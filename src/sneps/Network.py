@@ -14,13 +14,23 @@ from .Slot import SlotMixin, AdjRule
 from .Node import NodeMixin
 from .Path import PathMixin
 from .Caseframe import CaseframeMixin
+from .Persistence import PersistenceMixin
+from .Journal import JournalMixin, journaled, journaled_build
+from .Loader import LoaderMixin
+from .Store import StoreMixin
+from .NTriples import NTriplesMixin
+from .PathSlot import PathSlotMixin
+from .Equivalence import EquivalenceMixin
 from .wft.WftParse import wft_parser
+from .SNError import SNError
 
 # =====================================
 # -------------- NETWORK --------------
 # =====================================
 
-class Network(SlotMixin, CaseframeMixin, SemanticMixin, NodeMixin, ContextMixin, VisualizationMixin, PathMixin):
+class Network(SlotMixin, CaseframeMixin, SemanticMixin, NodeMixin, ContextMixin, VisualizationMixin, PathMixin,
+              PersistenceMixin, JournalMixin, LoaderMixin, StoreMixin, NTriplesMixin, PathSlotMixin,
+              EquivalenceMixin):
     """ The Network class is the main class of the semantic network module, and provides this
         functionality to SNePS.
         Currently, SNePS itself (excluding SNIP, SNEBR, etc.) is close to a finished project.
@@ -28,6 +38,8 @@ class Network(SlotMixin, CaseframeMixin, SemanticMixin, NodeMixin, ContextMixin,
         and variable uniqueness fails on reflexive donkey statements, as discussed in the various
         SNePS-related papers in this repository, and provided in our demo folder. """
 
+    verbose = True # Whether functions print what they do. See set_verbosity.
+
     def __init__(self) -> None:
 
         # Initialize the mixins to get instance variables
@@ -123,6 +135,12 @@ class Network(SlotMixin, CaseframeMixin, SemanticMixin, NodeMixin, ContextMixin,
         # self.caseframes['thnor'].add_alias('thnot')
 
 
+    def set_verbosity(self, verbose: bool) -> None:
+        """ Turns printed output from asserting, retracting, parsing and inference on or off.
+            With output off, nothing is formatted, and results are only returned. """
+        self.verbose = bool(verbose)
+
+    @journaled
     def assert_wft(self, wft_str: str, inf: bool = False) -> None:
         """ Asserts a provided. This is one of the main ways to interact with the sneps system. """
         # NOTE: Currently inf does nothing. In the future, perhaps it can be used to trigger
@@ -133,5 +151,39 @@ class Network(SlotMixin, CaseframeMixin, SemanticMixin, NodeMixin, ContextMixin,
 
         # Adds wft as asserted hypothesis in current context
         if wft is not None:
-            print(wft.name + "! :", wft)
+            if self.verbose:
+                print(wft.name + "! :", wft)
             self.current_context.add_hypothesis(wft)
+
+    @journaled
+    def assert_wfts(self, wft_strs: list) -> list:
+        """ Asserts many wfts in the current context without printing each one.
+            Returns a list of (index, error message) for the wfts which could not be asserted. """
+        errors = []
+        for i, wft_str in enumerate(wft_strs):
+            try:
+                wft = wft_parser(wft_str, self, raise_errors=True)
+            except SNError as e:
+                errors.append((i, str(e)))
+                continue
+            if wft is not None:
+                self.current_context.add_hypothesis(wft)
+        return errors
+
+    @journaled
+    def retract_wft(self, wft_str: str) -> set:
+        """ Removes a hypothesis from the current context, along with any derived beliefs
+            which no longer hold without it. Returns the set of removed derived beliefs. """
+        wft = wft_parser(wft_str, self)
+        if wft is None:
+            return set()
+        removed = self.retract(wft)
+        if self.verbose:
+            print(wft.name + " retracted :", wft)
+        return removed
+
+    @journaled_build
+    def build_wft(self, wft_str: str, raise_errors: bool = False):
+        """ Returns the node of a wft, building it if necessary, without asserting it.
+            Queries build their wfts this way, so that a journal records the nodes they add. """
+        return wft_parser(wft_str, self, raise_errors)
@@ -2,10 +2,12 @@ from __future__ import annotations
 from .Caseframe import Frame
 from .Slot import Slot
 from .SNError import SNError
+from .Journal import journaled
 from .SemanticType import SemanticType
 from re import match
 from .wft.vars.UniqueRep import *
 from typing import Set
+from collections import namedtuple
 
 # =====================================
 # -------------- GLOBALS --------------
@@ -14,6 +16,9 @@ from typing import Set
 class NodeError(SNError):
     pass
 
+# Yielded by NodeMixin.iter_terms
+TermRecord = namedtuple('TermRecord', ['name', 'kind', 'sem_type', 'asserted', 'node'])
+
 # =====================================
 # --------------- NODE ----------------
 # =====================================
@@ -139,7 +144,7 @@ class Arbitrary(Variable):
         """ Gives an arb# name and stores in the given network. """
         self.name = 'arb' + str(self.counter)
         Arbitrary.counter += 1
-        current_network.nodes[self.name] = self
+        current_network.add_node(self)
 
     def wft_rep(self, simplify=None) -> str:
         """ String representation """
@@ -168,7 +173,7 @@ class Indefinite(Variable):
         """ Gives an arb# name and stores in the given network. """
         self.name = 'ind' + str(self.counter)
         Indefinite.counter += 1
-        current_network.nodes[self.name] = self
+        current_network.add_node(self)
 
     def wft_rep(self, simplify=None) -> str:
         """ String representation """
@@ -422,9 +427,58 @@ class NodeMixin:
         if type(self) is NodeMixin:
             raise NotImplementedError("Mixins can't be instantiated.")
         self.nodes = {}
-
+        self.frame_index = {} # Maps frame keys to the molecular nodes with that frame
+        self.variable_nodes = [] # Arbitrary and indefinite nodes
+        self.node_hooks = [] # Functions called with each node added to the network
+        self.reuse_hooks = [] # Functions called with each existing node a new wft turns out to be
+        self.rename_hooks = [] # Functions called with each renamed node and its old name
+        self.node_store = None # NodeStore holding self.nodes, if the network uses one (see Store.py)
+
+    def add_node(self, node: Node) -> None:
+        """ Stores a new node in the network and notifies anything indexing the network's nodes. """
+        self.nodes[node.name] = node
+        self.index_node(node)
+        for hook in self.node_hooks:
+            hook(node)
+
+    def index_node(self, node: Node) -> None:
+        """ Adds a node to the indexes used to find existing nodes while building wfts. """
+        if isinstance(node, Molecular) and self.node_store is not None:
+            return # The store indexes nodes by frame itself
+        if isinstance(node, Molecular):
+            self.frame_index.setdefault(node.frame.key(), []).append(node)
+        elif isinstance(node, Variable):
+            self.variable_nodes.append(node)
+
+    def nodes_with_frame(self, frame: Frame) -> list:
+        """ Returns the molecular nodes (differing in min, max or bound) with the given frame. """
+        if self.node_store is not None:
+            return self.node_store.with_frame(frame)
+        return self.frame_index.get(frame.key(), [])
+
+    def rename_node(self, node: Node, name: str) -> None:
+        """ Gives a node a new name, and notifies anything indexing nodes by name. """
+        old_name = node.name
+        del self.nodes[old_name]
+        node.name = name
+        self.nodes[name] = node
+        for hook in self.rename_hooks:
+            hook(node, old_name)
+
+    def reuse_node(self, node: Node) -> Node:
+        """ Returns an existing node which a wft being built turned out to be. """
+        for hook in self.reuse_hooks:
+            hook(node)
+        return node
+
+    @journaled
     def define_term(self, name, sem_type_name="Entity") -> None:
         """ Creates a base node by the given name and semantic type. """
+        self._define_term(name, sem_type_name)
+
+    def _define_term(self, name, sem_type_name="Entity") -> None:
+        """ define_term, without journaling. Used by the wft parser, since terms it defines
+            are defined again when the operation which parsed them is replayed. """
 
         if match(r'^(arb|ind)\d+$', name) or not match(r'^[A-Za-z][A-Za-z0-9_]*$', name):
             raise NodeError("ERROR: The term name '{}' is not allowed".format(name))
@@ -434,11 +488,20 @@ class NodeMixin:
             node = self.nodes[name]
             current_type = node.sem_type
             new_type = self.sem_hierarchy.get_type(sem_type_name)
-            node.sem_type = self.sem_hierarchy.respecify(name, current_type, new_type)
+            self.sem_hierarchy.retype(node, self.sem_hierarchy.respecify(name, current_type, new_type))
         else:
             # Creation of new node
             sem_type = self.sem_hierarchy.get_type(sem_type_name)
-            self.nodes[name] = Base(name, sem_type)
+            self.add_node(Base(name, sem_type))
+
+    def iter_terms(self, filter=None):
+        """ Yields a TermRecord for each node in the network (for which filter(record) is true,
+            if filter is given). asserted is whether the node is asserted in the current context. """
+        for node in self.nodes.values():
+            record = TermRecord(node.name, type(node).__name__, node.sem_type.name,
+                                node in self.current_context, node)
+            if filter is None or filter(record):
+                yield record
 
     def list_terms(self) -> None:
         """ Prints representations of each Node in the Network """
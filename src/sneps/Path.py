@@ -1,11 +1,29 @@
 from typing import List
+from collections import OrderedDict
+from threading import local, Lock
+from .Journal import journaled
+
+class EvaluationState(local):
+    """ What path evaluation in the current thread is in the middle of, kept per thread so that
+        paths followed in different threads at once do not see each other's state. """
+
+    def __init__(self) -> None:
+        # Sets collecting the nodes whose up cables are followed while closures are computed.
+        # See ClosureCache.
+        self.recording = []
+        # Materialized slots whose own paths are being followed. See PathSlot.
+        self.computing = set()
+
+evaluation = EvaluationState()
 
 # =====================================
 # --------------- PATH ----------------
 # =====================================
 
 class Path:
-    """ Superclass for all paths """
+    """ Superclass for all paths. Paths are evaluated a frontier at a time: derive takes a dict
+        mapping nodes to bitmasks of the sources they were reached from, and returns the same
+        for the nodes reached by following the path, so that many sources share one sweep. """
 
     def __init__(self):
         self.converse = False # Set to true if path should be followed in reverse
@@ -14,6 +32,23 @@ class Path:
         # A converse within a converse is read forward
         self.converse = not self.converse
 
+    def wrap_converse(self, path_str: str) -> str:
+        """ String representations include the converse, so that they can be parsed back. """
+        return "converse({})".format(path_str) if self.converse else path_str
+
+    def derivable(self, start_node, parent_converse: bool = False):
+        """ Returns a set of all nodes which might be derived by following this path. """
+        return set(self.derive({start_node: 1}, parent_converse))
+
+    def derivable_from(self, start_nodes, parent_converse: bool = False):
+        """ Returns the set of all nodes which might be derived by following this path from
+            any of the start nodes. """
+        return set(self.derive(dict.fromkeys(start_nodes, 1), parent_converse))
+
+def merge_masks(derived: dict, node, mask: int) -> None:
+    """ Adds source bits to a node's mask in derived. """
+    derived[node] = derived.get(node, 0) | mask
+
 class ComposedPaths(Path):
     """ A composed list of path objects, following one after another """
 
@@ -21,68 +56,145 @@ class ComposedPaths(Path):
         self.paths = paths
         super().__init__()
 
-    def derivable(self, start_node, parent_converse: bool = False):
-        """ Returns a set of all nodes which might be derived by following this path. """
-
+    def derive(self, masks: dict, parent_converse: bool = False) -> dict:
         # Exclusive or for whether to use converse
         converse = self.converse != parent_converse
 
         # Backward if in converse
         paths = reversed(self.paths) if converse else self.paths
 
-        # Follow paths consecutively
-        derived = set([start_node])
+        # Follow paths consecutively, a whole frontier at a time
         for path in paths:
-            temp_derived = set()
-            for next_node in derived:
-                # Store all nodes derived by following the next path
-                temp_derived.update(path.derivable(next_node, converse))
-            derived = temp_derived
-        return derived
+            masks = path.derive(masks, converse)
+            if not masks:
+                break
+        return masks
+
+    def iterate(self, start_node, parent_converse: bool = False):
+        """ Yields the nodes derived from start_node one at a time, following each path as soon as
+            the one before it yields a node not yielded before. """
+        converse = self.converse != parent_converse
+        paths = list(reversed(self.paths) if converse else self.paths)
+        seen = [set() for _ in paths] # The nodes each path has yielded in this evaluation
+
+        def follow(node, i):
+            for next_node in paths[i].iterate(node, converse):
+                if next_node in seen[i]:
+                    continue
+                seen[i].add(next_node)
+                if i == len(paths) - 1:
+                    yield next_node
+                else:
+                    yield from follow(next_node, i + 1)
+        return follow(start_node, 0)
 
     def __str__(self) -> str:
-        return "compose({})".format(", ".join([str(path) for path in self.paths]))
+        return self.wrap_converse("compose({})".format(", ".join([str(path) for path in self.paths])))
 
 class AndPaths(ComposedPaths):
     """ A composed list of path objects, following one after another """
 
-    def derivable(self, start_node, parent_converse: bool = False):
-        """ Returns a set of all nodes which might be derived by following this path. """
+    def __init__(self, paths: List[Path], network=None):
+        super().__init__(paths)
+        self.network = network # Holds the path planner, if given
 
+    def derive(self, masks: dict, parent_converse: bool = False) -> dict:
         # Exclusive or for whether to use converse
         converse = self.converse != parent_converse
-
-        # Follow each of the paths
-        derived = set()
-        first  = True
-        for path in self.paths:
-            if first:
-                derived = path.derivable(start_node, converse)
-                first = False
+        planner = None if self.network is None else self.network.path_planner
+
+        # Start nodes may share source bits, so each is given its own bit while the paths
+        # are intersected, and its sources' bits are put back afterwards
+        starts = list(masks)
+        sources = masks
+        if len(starts) > 1:
+            masks = {start_node: 1 << i for i, start_node in enumerate(starts)}
+
+        # A node is derived from a source if every path derives it from that source.
+        # The cheapest path is followed first, and evaluation stops once nothing is left.
+        derived = None
+        for path in (self.paths if planner is None else planner.order(self.paths, converse, len(masks))):
+            if derived is None:
+                derived = path.derive(masks, converse)
             else:
-                # Store the intersection of the derived nodes from each path
-                derived.intersection_update(path.derivable(start_node, converse))
+                # Sources which no longer derive anything need not be followed
+                live = 0
+                for mask in derived.values():
+                    live |= mask
+                masks = {node: mask & live for node, mask in masks.items() if mask & live}
+                if planner is not None and planner.backward_cheaper(path, converse, len(masks), len(derived)):
+                    branch = derive_backward(path, converse, masks, derived)
+                else:
+                    branch = path.derive(masks, converse)
+                derived = {node: mask & branch[node] for node, mask in derived.items()
+                           if node in branch and mask & branch[node]}
+            if not derived:
+                break
+        if not derived:
+            return {}
+        if len(starts) > 1:
+            for node, bits in derived.items():
+                mask = 0
+                while bits:
+                    bit = bits & -bits
+                    mask |= sources[starts[bit.bit_length() - 1]]
+                    bits ^= bit
+                derived[node] = mask
         return derived
 
+    def iterate(self, start_node, parent_converse: bool = False):
+        """ Yields the nodes derived from start_node one at a time. Only the first path is
+            followed lazily; the others are evaluated first, to check its nodes against. """
+        converse = self.converse != parent_converse
+        others = [path.derivable(start_node, converse) for path in self.paths[1:]]
+        if all(others):
+            for node in self.paths[0].iterate(start_node, converse):
+                if all(node in derived for derived in others):
+                    yield node
+
     def __str__(self) -> str:
-        return "and({})".format(", ".join([str(path) for path in self.paths]))
+        return self.wrap_converse("and({})".format(", ".join([str(path) for path in self.paths])))
+
+def derive_backward(path: Path, converse: bool, masks: dict, candidates) -> dict:
+    """ Which of the candidates path derives from the start nodes in masks, found by following
+        path in converse from the candidates, a bit per candidate. """
+    candidates = list(candidates)
+    derived = {}
+    for node, bits in path.derive({candidate: 1 << i for i, candidate in enumerate(candidates)}, not converse).items():
+        mask = masks.get(node)
+        if not mask:
+            continue
+        while bits:
+            bit = bits & -bits
+            candidate = candidates[bit.bit_length() - 1]
+            derived[candidate] = derived.get(candidate, 0) | mask
+            bits ^= bit
+    return derived
 
 class OrPaths(ComposedPaths):
-    def derivable(self, start_node, parent_converse: bool = False):
-        """ Returns a set of all nodes which might be derived by following this path. """
-
+    def derive(self, masks: dict, parent_converse: bool = False) -> dict:
         # Exclusive or for whether to use converse
         converse = self.converse != parent_converse
 
-        # Follow each of the paths
-        derived = set()
+        # Store the union of the derived nodes from each path
+        derived = {}
         for path in self.paths:
-            # Store the union of the derived nodes from each path
-            derived.update(path.derivable(start_node, converse))
+            for node, mask in path.derive(masks, converse).items():
+                merge_masks(derived, node, mask)
         return derived
 
+    def iterate(self, start_node, parent_converse: bool = False):
+        """ Yields the nodes derived from start_node by each path in turn, once each. """
+        converse = self.converse != parent_converse
+        seen = set()
+        for path in self.paths:
+            for node in path.iterate(start_node, converse):
+                if node not in seen:
+                    seen.add(node)
+                    yield node
+
     def __str__(self) -> str:
-        return "or({})".format(", ".join([str(path) for path in self.paths]))
+        return self.wrap_converse("or({})".format(", ".join([str(path) for path in self.paths])))
 
 class ModPath(Path):
     """ Performs some modification on a single path """
@@ -94,105 +206,558 @@ class ModPath(Path):
 class KPlusPath(ModPath):
     """ Follows one or more instances of the given path """
 
-    def derivable(self, start_node, parent_converse: bool = False):
-        """ Returns a set of all nodes which might be derived by following this path. """
+    def __init__(self, path: Path, network=None):
+        super().__init__(path)
+        self.network = network # Holds the closure cache, if given
+        self.cacheable = not depends_on_context(path) # Closures which depend on a context are not cached
 
+    def derive(self, masks: dict, parent_converse: bool = False) -> dict:
         # Exclusive or for whether to use converse
         converse = self.converse != parent_converse
 
-        # Traverse path until every node derivable located
-        derived = set()
-        next = set([start_node])
-        while next != set():
-            # Get new nodes from traversing the path another time
-            temp_next = set()
-            [temp_next.update(self.path.derivable(next_node, converse)) for next_node in next]
-            next = temp_next
-
-            # Ensures derivations not repeated - prevents infinite recursion
-            next = next - derived
-            derived.update(next)
+        if self.network is None or not self.cacheable:
+            return self.closure(masks, converse)
+
+        # Cached closures are reused, and the other start nodes are followed together
+        cache = self.network.closure_cache
+        derived = {}
+        missing = {}
+        for start_node, mask in masks.items():
+            reached = cache.get(self, converse, start_node)
+            if reached is None:
+                missing[start_node] = mask
+                continue
+            for node in reached:
+                derived[node] = derived.get(node, 0) | mask
+        if len(missing) == 1:
+            (start_node, mask), = missing.items()
+            missing = dict.fromkeys(cache.compute(self, converse, start_node), mask)
+        elif missing:
+            missing = self.closure(missing, converse)
+        for node, mask in missing.items():
+            derived[node] = derived.get(node, 0) | mask
         return derived
 
+    def closure(self, masks: dict, converse: bool) -> dict:
+        """ Traverses the path until every node is derived from every source which reaches it.
+            Only the source bits new to a node are followed again (semi-naive evaluation). """
+        derived = {}
+        next = self.path.derive(masks, converse)
+        while next:
+            delta = {}
+            for node, mask in next.items():
+                new_bits = mask & ~derived.get(node, 0)
+                if new_bits:
+                    derived[node] = derived.get(node, 0) | new_bits
+                    delta[node] = new_bits
+            next = self.path.derive(delta, converse) if delta else {}
+        return derived
+
+    def iterate(self, start_node, parent_converse: bool = False):
+        """ Yields the nodes derived from start_node breadth first, each as soon as it is found. """
+        converse = self.converse != parent_converse
+        if self.network is not None and self.cacheable:
+            reached = self.network.closure_cache.get(self, converse, start_node)
+            if reached is not None:
+                yield from reached
+                return
+        seen = set()
+        frontier = [start_node]
+        while frontier:
+            next_frontier = []
+            for node in frontier:
+                for next_node in self.path.iterate(node, converse):
+                    if next_node not in seen:
+                        seen.add(next_node)
+                        next_frontier.append(next_node)
+                        yield next_node
+            frontier = next_frontier
+
     def __str__(self) -> str:
-        return "kplus({})".format(self.path)
+        return self.wrap_converse("kplus({})".format(self.path))
 
 class KStarPath(KPlusPath):
     """ Follows zero or more instances of the given path """
 
-    def derivable(self, start_node, parent_converse=False):
-        """ Returns a set of all nodes which might be derived by following this path. """
-
-        # KPlus paths, plus the starting node (the starting node represents zero traversals)
-        derived = super().derivable(start_node, self.converse != parent_converse)
-        derived.add(start_node)
+    def derive(self, masks: dict, parent_converse: bool = False) -> dict:
+        # KPlus paths, plus the starting nodes (the starting nodes represent zero traversals)
+        derived = super().derive(masks, parent_converse)
+        for node, mask in masks.items():
+            merge_masks(derived, node, mask)
         return derived
 
+    def iterate(self, start_node, parent_converse: bool = False):
+        """ Yields start_node, then the nodes derived from it by one or more instances. """
+        yield start_node
+        for node in super().iterate(start_node, parent_converse):
+            if node is not start_node:
+                yield node
+
     def __str__(self) -> str:
-        return "kstar({})".format(self.path)
+        return self.wrap_converse("kstar({})".format(self.path))
 
 class IRPath(ModPath):
     """ Follows paths provided end node is not start node """
 
-    def derivable(self, start_node, parent_converse=False):
-        """ Returns a set of all nodes which might be derived by following this path. """
-        derived = self.path.derivable(start_node, self.converse != parent_converse)
+    def derive(self, masks: dict, parent_converse: bool = False) -> dict:
+        converse = self.converse != parent_converse
 
-        # Ignores any paths that return to where they began
-        derived.discard(start_node)
+        # Each start node is followed on its own, so that it can be told apart from the nodes it derives
+        derived = {}
+        for start_node, start_mask in masks.items():
+            for node, mask in self.path.derive({start_node: start_mask}, converse).items():
+                # Ignores any paths that return to where they began
+                if node is not start_node:
+                    merge_masks(derived, node, mask)
         return derived
 
+    def iterate(self, start_node, parent_converse: bool = False):
+        """ Yields the nodes derived from start_node, other than start_node. """
+        for node in self.path.iterate(start_node, self.converse != parent_converse):
+            if node is not start_node:
+                yield node
+
     def __str__(self) -> str:
-        return "irreflexive-restrict({})".format(self.path)
+        return self.wrap_converse("irreflexive-restrict({})".format(self.path))
 
 class BasePath(Path):
     """ Atomic path existing on a single non-repeated slot """
 
-    def __init__(self, slot, backward=False):
+    def __init__(self, slot, backward=False, context=None):
         self.slot = slot # The single slot to follow
         self.backward = backward # Whether to folow an upcable instead
+        self.context = context # The context whose virtual cables are followed, if bound
         super().__init__()
 
-    def derivable(self, start_node, parent_converse=False):
-        """ Returns a set of all nodes which might be derived by following this path. """
-        # Follows the single cable up or down
-        if (self.converse != parent_converse) == self.backward:
-            return start_node.follow_down_cable(self.slot)
-        else:
-            return start_node.follow_up_cable(self.slot)
+    def derive(self, masks: dict, parent_converse: bool = False) -> dict:
+        # Follows the single cable up or down from every node of the frontier
+        down = (self.converse != parent_converse) == self.backward
+        state = evaluation
+        virtual = self.slot.virtual
+        if virtual is not None and self.slot in state.computing:
+            # A materialized slot's own paths only follow its real cables
+            virtual = None
+
+        # Real down cables never change, but up cables and virtual cables may be added
+        recording = state.recording
+        if recording and (not down or virtual is not None):
+            for touched in recording:
+                touched.update(masks)
+        derived = {}
+        for start_node, mask in masks.items():
+            targets = start_node.follow_down_cable(self.slot) if down else start_node.follow_up_cable(self.slot)
+            for node in targets:
+                derived[node] = derived.get(node, 0) | mask
+            if virtual is not None:
+                for node in virtual.follow(start_node, down, self.context):
+                    derived[node] = derived.get(node, 0) | mask
+        return derived
+
+    def iterate(self, start_node, parent_converse: bool = False):
+        """ Yields the nodes at the other end of the single cable. """
+        return iter(follow_cable(start_node, self.slot, (self.converse != parent_converse) == self.backward, self.context))
 
     def __str__(self) -> str:
-        return self.slot.name + ("-" if self.backward else "")
+        return self.wrap_converse(self.slot.name + ("-" if self.backward else ""))
+
+def follow_cable(node, slot, down: bool, context=None) -> set:
+    """ The nodes reached by following the cables on slot from node, down or up, including
+        the slot's virtual cables in the given (or current) context if it is materialized. """
+    targets = node.follow_down_cable(slot) if down else node.follow_up_cable(slot)
+    if slot.virtual is not None and slot not in evaluation.computing:
+        targets = targets | slot.virtual.follow(node, down, context)
+    return targets
 
 class AssertedPath(Path):
-    """ Ensures the starting node provided is asserted within the current context """
+    """ Ensures the starting node provided is asserted: in the beliefs bound to the path by
+        bind_context, or else in the current context when the node is checked """
 
-    def __init__(self, current_network):
+    def __init__(self, current_network, members=None):
         self.current_network = current_network
+        self.members = members # The beliefs ! checks against, if bound
+        super().__init__()
 
-    def derivable(self, start_node, parent_converse: bool = False):
-        """ Returns a set of all nodes which might be derived by following this path. """
+    def beliefs(self):
+        """ The beliefs to check against, as a container of nodes. """
+        return self.current_network.current_context if self.members is None else self.members
 
-        # If asserted, returns a set containing the starting_node
-        if start_node in self.current_network.current_context:
-            return set([start_node])
-        # Otherwise returns the empty set
-        else:
-            return set()
+    def derive(self, masks: dict, parent_converse: bool = False) -> dict:
+        # Keeps the starting nodes which are asserted
+        members = self.beliefs()
+        recording = evaluation.recording
+        if recording:
+            for touched in recording:
+                touched.update(masks)
+        return {node: mask for node, mask in masks.items() if node in members}
+
+    def iterate(self, start_node, parent_converse: bool = False):
+        """ Yields the starting node if it is asserted. """
+        if start_node in self.beliefs():
+            yield start_node
 
     def __str__(self) -> str:
         return "!"
 
+def has_asserted(path: Path) -> bool:
+    """ True if the path contains !, so that what it derives depends on a context. """
+    if isinstance(path, AssertedPath):
+        return True
+    if isinstance(path, ComposedPaths):
+        return any(has_asserted(subpath) for subpath in path.paths)
+    if isinstance(path, ModPath):
+        return has_asserted(path.path)
+    return False
+
+def depends_on_context(path: Path) -> bool:
+    """ True if what the path derives may depend on a context: it contains !, or follows a
+        slot defined by paths, whose virtual cables (once materialized) are derived in one. """
+    if isinstance(path, BasePath):
+        return bool(path.slot.paths) or path.slot.virtual is not None
+    if isinstance(path, ComposedPaths):
+        return any(depends_on_context(subpath) for subpath in path.paths)
+    if isinstance(path, ModPath):
+        return depends_on_context(path.path)
+    return has_asserted(path)
+
+def bind_context(path: Path, context, members=None) -> None:
+    """ Makes the path follow the virtual cables of materialized slots in context, and every
+        ! in it check against members (a snapshot of context's beliefs, or any container of
+        nodes; context itself if not given), instead of whichever context is current. """
+    if isinstance(path, BasePath):
+        path.context = context
+    elif isinstance(path, AssertedPath):
+        path.members = context if members is None else members
+    elif isinstance(path, ComposedPaths):
+        for subpath in path.paths:
+            bind_context(subpath, context, members)
+    elif isinstance(path, ModPath):
+        bind_context(path.path, context, members)
+
+# =====================================
+# ----------- CLOSURE CACHE -----------
+# =====================================
+
+class Closure:
+    """ The nodes derived by following a kplus path from one start node, and the nodes whose
+        up cables were followed to derive them. A new molecular node can only add to the
+        closure if one of its fillers was touched. """
+
+    __slots__ = ('reached', 'touched', 'stale')
+
+    def __init__(self, reached: set, touched: set) -> None:
+        self.reached = reached
+        self.touched = touched
+        self.stale = False
+
+    def size(self) -> int:
+        return len(self.reached) + len(self.touched)
+
+class ClosureCache:
+    """ Caches kplus and kstar closures, per (subpath, direction) and start node, for subpaths
+        which do not depend on a context (see depends_on_context). Only closures followed from
+        a single start node are cached, since many start nodes share one sweep more cheaply
+        than they would fill the cache. When a molecular node is added, the closures which
+        touched one of its fillers are marked stale, and are extended from what they had
+        already reached when next used. Least recently used closures are evicted once more
+        than max_nodes nodes are held. """
+
+    def __init__(self, max_nodes: int = 1000000) -> None:
+        self.max_nodes = max_nodes
+        self.entries = OrderedDict() # Maps (subpath, converse, start node) to Closures
+        self.index = {} # Maps touched nodes to the keys of the closures which touched them
+        self.size = 0 # Nodes held by all closures
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.touches = 0 # Incremented whenever closures may have been made stale
+        # Held while the cache is read or changed, but not while closures are followed, so
+        # that paths can be followed in several threads at once
+        self.lock = Lock()
+
+    def get(self, path: KPlusPath, converse: bool, start_node):
+        """ The set of nodes derived by following path from start_node, if cached. Stale
+            closures are extended first. """
+        key = (str(path.path), converse, start_node)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stale = entry.stale
+            generation = self.touches
+            if not stale:
+                self.hits += 1
+                self.entries.move_to_end(key)
+        if stale:
+            entry = self._extend(path, converse, key, entry, generation)
+        self._depend(entry)
+        return entry.reached
+
+    def compute(self, path: KPlusPath, converse: bool, start_node) -> set:
+        """ Computes, caches and returns the set of nodes derived by following path from start_node. """
+        generation = self.touches
+        touched = set()
+        recording = evaluation.recording
+        recording.append(touched)
+        try:
+            reached = set(path.closure({start_node: 1}, converse))
+        finally:
+            recording.pop()
+        entry = Closure(reached, touched)
+        self._store((str(path.path), converse, start_node), entry, generation)
+        self._depend(entry)
+        return reached
+
+    def _store(self, key: tuple, entry: Closure, generation: int) -> None:
+        """ Caches a closure in place of any cached for the key. generation is the number of
+            touches when it began to be followed: if nodes were touched since, it may already
+            be stale. """
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self._unindex(key, old)
+                self.size -= old.size()
+            entry.stale = generation != self.touches
+            self.entries[key] = entry
+            self.size += entry.size()
+            for node in entry.touched:
+                self.index.setdefault(node, set()).add(key)
+            self._shrink()
+
+    def _depend(self, entry: Closure) -> None:
+        # An enclosing closure depends on everything this one touched
+        for touched in evaluation.recording:
+            touched.update(entry.touched)
+
+    def _extend(self, path: KPlusPath, converse: bool, key: tuple, entry: Closure, generation: int) -> Closure:
+        """ Follows the path one more time from a stale closure's nodes, and continues from the
+            nodes that were not reached before. Closures only grow as nodes are added. Returns
+            the extended closure, which replaces entry in the cache. """
+        touched = set(entry.touched)
+        recording = evaluation.recording
+        recording.append(touched)
+        try:
+            step = path.path.derive(dict.fromkeys(entry.reached | {key[2]}, 1), converse)
+            new_nodes = {node: 1 for node in step if node not in entry.reached}
+            reached = entry.reached | set(new_nodes)
+            if new_nodes:
+                reached.update(path.closure(new_nodes, converse))
+        finally:
+            recording.pop()
+        extended = Closure(reached, touched)
+        self._store(key, extended, generation)
+        return extended
+
+    def _unindex(self, key: tuple, entry: Closure) -> None:
+        for node in entry.touched:
+            keys = self.index.get(node)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.index[node]
+
+    def add(self, node) -> None:
+        """ Marks stale the closures which touched a filler of a newly added node. """
+        frame = getattr(node, 'frame', None)
+        if frame is None:
+            return
+        if self.entries:
+            self.touch(filler for fillers in frame.filler_set for filler in fillers.nodes)
+        else:
+            # A closure being followed may still have touched a filler
+            self.touches += 1
+
+    def touch(self, nodes) -> None:
+        """ Marks stale the closures which touched any of the nodes. """
+        with self.lock:
+            self.touches += 1
+            for node in nodes:
+                for key in self.index.get(node, ()):
+                    self.entries[key].stale = True
+
+    def _shrink(self) -> None:
+        while self.size > self.max_nodes and self.entries:
+            key, entry = self.entries.popitem(last=False)
+            self._unindex(key, entry)
+            self.size -= entry.size()
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """ Forgets every cached closure. """
+        with self.lock:
+            self.entries.clear()
+            self.index.clear()
+            self.size = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+# =====================================
+# ------------- AUTOMATON -------------
+# =====================================
+
+class PathAutomaton:
+    """ A path compiled to a nondeterministic automaton, whose states are positions within the
+        path. A move follows one slot's cables, checks that a node is asserted, or, for and and
+        irreflexive-restrict (which are not regular), follows a whole subpath. Moves can be
+        made forward from a start node or backward from an end node, so that connect can
+        search from both ends at once. """
+
+    def __init__(self, path: Path) -> None:
+        self.moves = [] # Lists, per state, of (kind, argument, next state)
+        self.back_moves = [] # The same moves, listed by next state and pointing back
+        self.start = self._state()
+        self.accept = self._compile(path, False, self.start)
+
+    def _state(self) -> int:
+        self.moves.append([])
+        self.back_moves.append([])
+        return len(self.moves) - 1
+
+    def _move(self, state: int, kind: str, argument, next_state: int = None) -> int:
+        if next_state is None:
+            next_state = self._state()
+        self.moves[state].append((kind, argument, next_state))
+        self.back_moves[next_state].append((kind, argument, state))
+        return next_state
+
+    def _compile(self, path: Path, parent_converse: bool, state: int) -> int:
+        """ Adds moves following path from state, and returns the state they end in. """
+        converse = path.converse != parent_converse
+        if isinstance(path, BasePath):
+            return self._move(state, 'down' if converse == path.backward else 'up', path)
+        if isinstance(path, AssertedPath):
+            return self._move(state, 'asserted', path)
+        if isinstance(path, OrPaths):
+            end = self._state()
+            for subpath in path.paths:
+                self._move(self._compile(subpath, converse, state), 'empty', None, end)
+            return end
+        if isinstance(path, AndPaths) or isinstance(path, IRPath):
+            return self._move(state, 'path', (path, parent_converse))
+        if isinstance(path, ComposedPaths):
+            for subpath in (reversed(path.paths) if converse else path.paths):
+                state = self._compile(subpath, converse, state)
+            return state
+        if isinstance(path, KPlusPath):
+            # Entering through a fresh state keeps the loop from reaching states before it
+            loop = self._move(state, 'empty', None)
+            end = self._compile(path.path, converse, loop)
+            self._move(end, 'empty', None, loop)
+            if isinstance(path, KStarPath):
+                self._move(loop, 'empty', None, end)
+            return end
+        raise SNePSPathError("ERROR: Cannot compile the path {}.".format(path))
+
+    @staticmethod
+    def _follow(kind: str, argument, node, backward: bool):
+        """ The nodes one move leads to from node, in either direction. """
+        if kind == 'down':
+            return follow_cable(node, argument.slot, not backward, argument.context)
+        if kind == 'up':
+            return follow_cable(node, argument.slot, backward, argument.context)
+        if kind == 'asserted':
+            return (node,) if node in argument.beliefs() else ()
+        if kind == 'path':
+            path, parent_converse = argument
+            return path.derive({node: 1}, parent_converse != backward)
+        return (node,)
+
+    def connect(self, start_node, end_node):
+        """ Searches forward from start_node and backward from end_node, a layer at a time from
+            whichever side has the smaller frontier, until the searches meet. Returns the nodes
+            along a connecting path from start_node to end_node, or None if there is none. """
+        sides = [({(self.start, start_node): None}, self.moves), ({(self.accept, end_node): None}, self.back_moves)]
+        frontiers = [[(self.start, start_node)], [(self.accept, end_node)]]
+        for side in (0, 1):
+            meeting = self._close(side, frontiers[side], sides)
+            if meeting is not None:
+                return self._witness(meeting, sides)
+        while frontiers[0] and frontiers[1]:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            visited, moves = sides[side]
+            next_frontier = []
+            for state, node in frontiers[side]:
+                for kind, argument, next_state in moves[state]:
+                    if kind == 'empty':
+                        continue
+                    for next_node in self._follow(kind, argument, node, side == 1):
+                        key = (next_state, next_node)
+                        if key not in visited:
+                            visited[key] = (state, node)
+                            next_frontier.append(key)
+                            if key in sides[1 - side][0]:
+                                return self._witness(key, sides)
+            meeting = self._close(side, next_frontier, sides)
+            if meeting is not None:
+                return self._witness(meeting, sides)
+            frontiers[side] = next_frontier
+        return None
+
+    def _close(self, side: int, frontier: list, sides: list):
+        """ Adds to frontier the states reached by empty moves. Returns a state and node
+            reached by both sides, if any. """
+        visited, moves = sides[side]
+        other = sides[1 - side][0]
+        for state, node in frontier:
+            if (state, node) in other:
+                return (state, node)
+        i = 0
+        while i < len(frontier):
+            state, node = frontier[i]
+            i += 1
+            for kind, _, next_state in moves[state]:
+                key = (next_state, node)
+                if kind == 'empty' and key not in visited:
+                    visited[key] = (state, node)
+                    frontier.append(key)
+                    if key in other:
+                        return key
+        return None
+
+    @staticmethod
+    def _witness(meeting: tuple, sides: list) -> list:
+        """ The nodes along the path through meeting, from the start node to the end node. """
+        forward = []
+        key = meeting
+        while key is not None:
+            forward.append(key[1])
+            key = sides[0][0][key]
+        forward.reverse()
+        key = sides[1][0][meeting]
+        while key is not None:
+            forward.append(key[1])
+            key = sides[1][0][key]
+        # Empty moves and ! checks stay on a node
+        return [node for i, node in enumerate(forward) if i == 0 or node is not forward[i - 1]]
+
 # =====================================
 # --------------- MIXIN ---------------
 # =====================================
 
 # This is here instead of at the top of the file to avoid circular imports.
 from .path.PathParse import path_parser, SNePSPathError
+from .Context import ContextError
+from .PathPlan import PathStatistics, PathPlanner, optimize
+from .PathMatrix import has_scipy, relation_by_matrices, relation_by_chunks
 
 class PathMixin:
     """ Provides functions related to paths to Network """
 
+    optimize_paths = True # Whether paths are rewritten by optimize before they are followed
+
+    def __init__(self) -> None:
+        if type(self) is PathMixin:
+            raise NotImplementedError("Mixins can't be instantiated.")
+        self.closure_cache = ClosureCache()
+        self.path_statistics = PathStatistics()
+        self.path_planner = PathPlanner(self.path_statistics)
+        # node_hooks and rename_hooks are defined by NodeMixin, which is initialized first
+        self.node_hooks.append(self.closure_cache.add)
+        self.node_hooks.append(self.path_statistics.add)
+        self.rename_hooks.append(self.path_statistics.rename)
+
+    @journaled
     def define_path(self, slot_str: str, path_str: str):
         """ The slot slot_str exists between two nodes when the path path_str
             can be followed from one to the other """
@@ -201,12 +766,87 @@ class PathMixin:
             slot = self.find_slot(slot_str)
             slot.add_path(path)
 
-    def paths_from(self, terms: List[str], path_str: str):
-        """ Given a starting list of node names and a path, follows the path from
-            each of the nodes and returns the set of nodes derived """
+    def parse_path(self, path_str: str, context_name: str = None) -> Path:
+        """ Parses a path to be followed, rewritten into its normal form if optimize_paths is set.
+            It follows materialized slots in the named (or current) context, and its ! checks
+            against a snapshot, taken now, of that context's beliefs, so changing the current
+            context while it is followed does not change what it derives. """
         path = path_parser(path_str, self)
-        derived = set()
+        if path is None:
+            return None
+        if self.optimize_paths:
+            path = optimize(path)
+        context = self._path_context(context_name)
+        bind_context(path, context, context.snapshot() if has_asserted(path) else None)
+        return path
+
+    def _path_context(self, context_name: str = None):
+        context = self.current_context if context_name is None else self.contexts.get(context_name)
+        if context is None:
+            raise ContextError("ERROR: Context \"{}\" does not exist.".format(context_name))
+        return context
+
+    def paths_from(self, terms: List[str], path_str: str, context_name: str = None):
+        """ Given a starting list of node names and a path, follows the path from
+            each of the nodes and returns the set of nodes derived. ! checks against
+            the named (or current) context. """
+        path = self.parse_path(path_str, context_name)
+        return path.derivable_from(self.find_term(term) for term in terms)
+
+    def paths_from_iter(self, terms: List[str], path_str: str, context_name: str = None):
+        """ Like paths_from, but yields the nodes derived one at a time, as they are found, so that
+            callers can stop early or stream them without holding the whole set. The context's
+            beliefs are read when this is called, not when the first node is asked for. """
+        return self._iterate_path(terms, self.parse_path(path_str, context_name))
+
+    def _iterate_path(self, terms: List[str], path: Path):
+        seen = set()
         for term in terms:
-            start_node = self.find_term(term)
-            derived.update(path.derivable(start_node))
+            for node in path.iterate(self.find_term(term)):
+                if node not in seen:
+                    seen.add(node)
+                    yield node
+
+    def paths_from_each(self, terms: List[str], path_str: str, context_name: str = None) -> dict:
+        """ Like paths_from, but returns a dict mapping each of the node names to the set of
+            nodes derived from it. Every source is followed in the same sweep. """
+        path = self.parse_path(path_str, context_name)
+        masks = {}
+        for i, term in enumerate(terms):
+            merge_masks(masks, self.find_term(term), 1 << i)
+        derived = {term: set() for term in terms}
+        for node, mask in path.derive(masks).items():
+            while mask:
+                bit = mask & -mask
+                derived[terms[bit.bit_length() - 1]].add(node)
+                mask ^= bit
         return derived
+
+    def paths_from_all(self, path_str: str, context_name: str = None) -> dict:
+        """ Follows the path from every node at once, and returns a dict mapping the name of each
+            node from which the path derives something to the set of nodes derived. Uses sparse
+            matrices if SciPy is installed. """
+        path = self.parse_path(path_str, context_name)
+        nodes = list(self.nodes.values())
+        if has_scipy:
+            relation = relation_by_matrices(path, nodes)
+        else:
+            if self.verbose:
+                print("paths_from_all is faster with SciPy installed (pip install scipy)")
+            relation = relation_by_chunks(path, nodes)
+        return {node.name: derived for node, derived in relation.items()}
+
+    def path_connects(self, start_term: str, end_term: str, path_str: str, witness: bool = False,
+                      context_name: str = None):
+        """ True if the path path_str can be followed from one node to the other. Searches from
+            both nodes at once and stops as soon as the searches meet. If witness is set, returns
+            the list of nodes along a connecting path instead, or None. """
+        path = self.parse_path(path_str, context_name)
+        connection = PathAutomaton(path).connect(self.find_term(start_term), self.find_term(end_term))
+        return connection if witness else connection is not None
+
+    def explain(self, path_str: str, terms: List[str] = None) -> str:
+        """ Describes how the path would be followed from the given node names (or from one
+            node), using the statistics kept for each slot. """
+        path = self.parse_path(path_str)
+        return self.path_planner.explain(path, len(terms) if terms else 1)
@@ -0,0 +1,139 @@
+"""
+Evaluation of a path from every node at once. Each slot's down cables become a sparse boolean
+matrix over the network's nodes, and the path becomes the matrix of the relation it derives:
+compose is a matrix product, or and and are element-wise, converse is a transpose, and kplus
+and kstar are semi-naive fixpoints. Without SciPy, the nodes are followed in chunks instead.
+"""
+
+# =====================================
+# -------------- IMPORTS --------------
+# =====================================
+
+""" SciPy is only needed to evaluate paths with matrices. """
+try:
+    import numpy as np
+    import scipy.sparse as sp
+    has_scipy = True
+except ModuleNotFoundError:
+    has_scipy = False
+
+from .Path import Path, BasePath, AssertedPath, ComposedPaths, AndPaths, OrPaths, KPlusPath, KStarPath, IRPath
+
+# =====================================
+# -------------- GLOBALS --------------
+# =====================================
+
+CHUNK_SIZE = 256 # Nodes followed together when SciPy is not installed
+
+# =====================================
+# -------------- MATRICES -------------
+# =====================================
+
+class RelationBuilder:
+    """ Builds the sparse matrix of the relation a path derives, over a fixed list of nodes. """
+
+    def __init__(self, nodes: list) -> None:
+        self.nodes = nodes
+        self.index = {node: i for i, node in enumerate(nodes)}
+        self.slots = {} # Maps (slot, context) to down cable matrices, built when first needed
+
+    def relation(self, path: Path):
+        """ The matrix whose (i, j) entry is set when path derives node j from node i. """
+        matrix = self._relation(path)
+        return matrix.T.tocsr() if path.converse else matrix
+
+    def _relation(self, path: Path):
+        n = len(self.nodes)
+        if isinstance(path, BasePath):
+            down = self.down(path.slot, path.context)
+            return down.T.tocsr() if path.backward else down
+        if isinstance(path, AssertedPath):
+            members = path.beliefs()
+            asserted = np.array([node in members for node in self.nodes], dtype=bool)
+            return sp.diags(asserted, dtype=bool, format='csr')
+        if isinstance(path, AndPaths):
+            matrix = None
+            for subpath in path.paths:
+                branch = self.relation(subpath)
+                matrix = branch if matrix is None else matrix.multiply(branch).tocsr()
+                if matrix.nnz == 0:
+                    break
+            return matrix
+        if isinstance(path, OrPaths):
+            matrix = sp.csr_matrix((n, n), dtype=bool)
+            for subpath in path.paths:
+                matrix = matrix + self.relation(subpath)
+            return matrix
+        if isinstance(path, ComposedPaths):
+            matrix = None
+            for subpath in path.paths:
+                step = self.relation(subpath)
+                matrix = step if matrix is None else (matrix @ step).tocsr()
+            return matrix
+        if isinstance(path, KPlusPath):
+            step = self.relation(path.path)
+            matrix = step
+            delta = step
+            while delta.nnz:
+                # Only pairs not derived before are followed again
+                next = (delta @ step).tocsr()
+                delta = (next > matrix).tocsr()
+                matrix = matrix + delta
+            if isinstance(path, KStarPath):
+                matrix = matrix + sp.identity(n, dtype=bool, format='csr')
+            return matrix.tocsr()
+        if isinstance(path, IRPath):
+            matrix = self.relation(path.path).tolil()
+            matrix.setdiag(False)
+            matrix = matrix.tocsr()
+            matrix.eliminate_zeros()
+            return matrix
+        raise TypeError("Cannot evaluate the path {} with matrices.".format(path))
+
+    def down(self, slot, context=None):
+        """ The matrix whose (i, j) entry is set when node i has a down cable on slot to node j,
+            including its virtual cables in the given (or current) context. """
+        matrix = self.slots.get((slot, context))
+        if matrix is None:
+            rows = []
+            columns = []
+            for i, node in enumerate(self.nodes):
+                frame = getattr(node, 'frame', None)
+                if frame is None:
+                    continue
+                for frame_slot, fillers in zip(frame.caseframe.slots, frame.filler_set):
+                    if frame_slot is slot:
+                        for filler in fillers.nodes:
+                            rows.append(i)
+                            columns.append(self.index[filler])
+            if slot.virtual is not None:
+                for node, targets in slot.virtual.relation(context).down.items():
+                    for target in targets:
+                        rows.append(self.index[node])
+                        columns.append(self.index[target])
+            n = len(self.nodes)
+            matrix = sp.csr_matrix((np.ones(len(rows), dtype=bool), (rows, columns)), shape=(n, n), dtype=bool)
+            self.slots[(slot, context)] = matrix
+        return matrix
+
+def relation_by_matrices(path: Path, nodes: list) -> dict:
+    """ Maps each node from which path derives something to the set of nodes it derives. """
+    matrix = RelationBuilder(nodes).relation(path).tocsr()
+    derived = {}
+    for i in range(len(nodes)):
+        start, end = matrix.indptr[i], matrix.indptr[i + 1]
+        if start < end:
+            derived[nodes[i]] = set(nodes[j] for j in matrix.indices[start:end])
+    return derived
+
+def relation_by_chunks(path: Path, nodes: list) -> dict:
+    """ As relation_by_matrices, following the path from CHUNK_SIZE nodes at a time, a bit per node. """
+    derived = {}
+    for chunk_start in range(0, len(nodes), CHUNK_SIZE):
+        chunk = nodes[chunk_start:chunk_start + CHUNK_SIZE]
+        for node, mask in path.derive({start_node: 1 << i for i, start_node in enumerate(chunk)}).items():
+            while mask:
+                bit = mask & -mask
+                derived.setdefault(chunk[bit.bit_length() - 1], set()).add(node)
+                mask ^= bit
+    return derived
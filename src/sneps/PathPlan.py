@@ -0,0 +1,282 @@
+"""
+Rewriting of parsed paths into an equivalent normal form, statistics about the cables of each
+slot, and a planner which uses them to estimate how many nodes following a path derives and at
+what cost. The planner decides at evaluation time which branch of an and path to follow first,
+and whether to check the others forward from the start nodes or in converse from the nodes
+already derived.
+"""
+
+# =====================================
+# -------------- IMPORTS --------------
+# =====================================
+
+from .Path import Path, BasePath, AssertedPath, ComposedPaths, AndPaths, OrPaths, KPlusPath, KStarPath, IRPath
+
+# =====================================
+# ------------- REWRITING -------------
+# =====================================
+
+def optimize(path: Path, parent_converse: bool = False) -> Path:
+    """ Returns a path deriving the same nodes, with converse pushed down into the direction of
+        each slot, nested compose, or and and flattened, duplicate or and and branches removed,
+        nested kplus and kstar collapsed, and irreflexive-restrict dropped where the path
+        inside it can never return to where it began. """
+    converse = path.converse != parent_converse
+    if isinstance(path, BasePath):
+        return BasePath(path.slot, backward=path.backward != converse, context=path.context)
+    if isinstance(path, AssertedPath):
+        return AssertedPath(path.current_network, path.members)
+    if isinstance(path, ComposedPaths):
+        kind = type(path)
+        paths = []
+        for subpath in (reversed(path.paths) if converse and kind is ComposedPaths else path.paths):
+            subpath = optimize(subpath, converse)
+            paths.extend(subpath.paths if type(subpath) is kind else [subpath])
+        if kind is not ComposedPaths:
+            # Branches are sets: the first of each repeated branch is kept
+            unique = {}
+            for subpath in paths:
+                unique.setdefault(str(subpath), subpath)
+            paths = list(unique.values())
+        if len(paths) == 1:
+            return paths[0]
+        return AndPaths(paths, path.network) if kind is AndPaths else kind(paths)
+    if isinstance(path, KPlusPath):
+        inner = optimize(path.path, converse)
+        star = isinstance(path, KStarPath)
+        while isinstance(inner, KPlusPath):
+            # kstar(kplus(p)), kplus(kstar(p)) and kstar(kstar(p)) are all kstar(p)
+            star = star or isinstance(inner, KStarPath)
+            inner = inner.path
+        return (KStarPath if star else KPlusPath)(inner, path.network)
+    if isinstance(path, IRPath):
+        inner = optimize(path.path, converse)
+        return inner if irreflexive(inner) else IRPath(inner)
+    return path
+
+def direction(path: Path):
+    """ 'down' if the path only follows down cables (and follows at least one), 'up' if it only
+        follows up cables, and None otherwise. For paths made by optimize. """
+    if isinstance(path, BasePath):
+        if path.slot.paths or path.slot.virtual is not None:
+            # Virtual cables follow the slot's paths, which may lead either way
+            return None
+        return 'up' if path.backward else 'down'
+    if isinstance(path, AndPaths) or isinstance(path, IRPath):
+        return None
+    if isinstance(path, ComposedPaths):
+        directions = set(direction(subpath) for subpath in path.paths if not isinstance(subpath, AssertedPath))
+        if isinstance(path, OrPaths) and any(isinstance(subpath, AssertedPath) for subpath in path.paths):
+            return None
+        return directions.pop() if len(directions) == 1 else None
+    if isinstance(path, KStarPath):
+        return None
+    if isinstance(path, KPlusPath):
+        return direction(path.path)
+    return None
+
+def irreflexive(path: Path) -> bool:
+    """ True if the path can never derive the node it starts from. A node's fillers all existed
+        before it, so a path only ever going down (or up) cables cannot return to its start. """
+    if isinstance(path, IRPath):
+        return True
+    if isinstance(path, AndPaths):
+        return any(irreflexive(subpath) for subpath in path.paths)
+    if isinstance(path, OrPaths):
+        return all(irreflexive(subpath) for subpath in path.paths)
+    return direction(path) is not None
+
+# =====================================
+# ------------ STATISTICS -------------
+# =====================================
+
+class SlotStatistics:
+    """ Counts of the down cables on one slot. Fan-out down is per molecular node with the
+        slot filled, and fan-out up is per node filling the slot. """
+
+    __slots__ = ('edges', 'sources', 'targets', 'max_down', 'max_up')
+
+    def __init__(self) -> None:
+        self.edges = 0 # Down cables (molecular node, filler) on the slot
+        self.sources = 0 # Molecular nodes with the slot filled
+        self.targets = 0 # Distinct nodes filling the slot
+        self.max_down = 0
+        self.max_up = 0
+
+    @property
+    def down_fanout(self) -> float:
+        return self.edges / self.sources if self.sources else 0.0
+
+    @property
+    def up_fanout(self) -> float:
+        return self.edges / self.targets if self.targets else 0.0
+
+    def __str__(self) -> str:
+        return "{} edges, fan-out down {:.2f} (max {}), up {:.2f} (max {})".format(
+            self.edges, self.down_fanout, self.max_down, self.up_fanout, self.max_up)
+
+class PathStatistics:
+    """ SlotStatistics for every slot, updated as nodes are added. """
+
+    def __init__(self) -> None:
+        self.slots = {} # Maps slot names to SlotStatistics
+        self.nodes = 0 # Nodes added
+        self.up_counts = {} # Maps (slot name, filler name) to the number of up cables
+
+    def slot(self, slot_name: str) -> SlotStatistics:
+        statistics = self.slots.get(slot_name)
+        if statistics is None:
+            statistics = self.slots[slot_name] = SlotStatistics()
+        return statistics
+
+    def add(self, node) -> None:
+        """ Counts the down cables of a newly added node. """
+        self.nodes += 1
+        frame = getattr(node, 'frame', None)
+        if frame is None:
+            return
+        for slot, fillers in zip(frame.caseframe.slots, frame.filler_set):
+            if not fillers.nodes:
+                continue
+            statistics = self.slot(slot.name)
+            statistics.edges += len(fillers.nodes)
+            statistics.sources += 1
+            statistics.max_down = max(statistics.max_down, len(fillers.nodes))
+            for filler in fillers.nodes:
+                key = (slot.name, filler.name)
+                count = self.up_counts.get(key, 0) + 1
+                self.up_counts[key] = count
+                if count == 1:
+                    statistics.targets += 1
+                statistics.max_up = max(statistics.max_up, count)
+
+    def rename(self, node, old_name: str) -> None:
+        """ Moves the up cable counts of a renamed node. """
+        for slot_name in self.slots:
+            count = self.up_counts.pop((slot_name, old_name), None)
+            if count is not None:
+                self.up_counts[(slot_name, node.name)] = count
+
+    def __str__(self) -> str:
+        return "\n".join("{}: {}".format(slot_name, statistics) for slot_name, statistics in sorted(self.slots.items()))
+
+# =====================================
+# -------------- PLANNER --------------
+# =====================================
+
+ASSERTED_FRACTION = 0.5 # Guessed fraction of nodes which pass a ! check
+KLEENE_STEPS = 10 # Steps of a closure estimated before assuming it has converged
+
+class PathPlanner:
+    """ Estimates the number of nodes a path derives from a number of start nodes, and the
+        number of cables followed to derive them. """
+
+    def __init__(self, statistics: PathStatistics) -> None:
+        self.statistics = statistics
+
+    def estimate(self, path: Path, parent_converse: bool, starts: float) -> tuple:
+        """ Returns (estimated nodes derived, estimated cost). """
+        converse = path.converse != parent_converse
+        limit = max(self.statistics.nodes, 1)
+        if isinstance(path, BasePath):
+            statistics = self.statistics.slots.get(path.slot.name)
+            if statistics is None:
+                return 0.0, starts
+            down = converse == path.backward
+            fanout = statistics.down_fanout if down else statistics.up_fanout
+            derived = min(starts * fanout, limit)
+            return derived, starts + derived
+        if isinstance(path, AssertedPath):
+            return starts * ASSERTED_FRACTION, starts
+        if isinstance(path, AndPaths):
+            estimates = [self.estimate(subpath, converse, starts) for subpath in path.paths]
+            return min(derived for derived, _ in estimates), sum(cost for _, cost in estimates)
+        if isinstance(path, OrPaths):
+            estimates = [self.estimate(subpath, converse, starts) for subpath in path.paths]
+            return min(sum(derived for derived, _ in estimates), limit), sum(cost for _, cost in estimates)
+        if isinstance(path, ComposedPaths):
+            cost = 0.0
+            for subpath in (reversed(path.paths) if converse else path.paths):
+                starts, step_cost = self.estimate(subpath, converse, starts)
+                cost += step_cost
+            return starts, cost
+        if isinstance(path, KPlusPath):
+            derived = 0.0
+            cost = 0.0
+            frontier = starts
+            for _ in range(KLEENE_STEPS):
+                frontier, step_cost = self.estimate(path.path, converse, frontier)
+                frontier = min(frontier, limit - derived)
+                cost += step_cost
+                derived += frontier
+                if frontier < 1:
+                    break
+            if isinstance(path, KStarPath):
+                derived = min(derived + starts, limit)
+            return derived, cost
+        if isinstance(path, IRPath):
+            return self.estimate(path.path, converse, starts)
+        return starts, starts
+
+    def order(self, paths: list, converse: bool, starts: int) -> list:
+        """ The branches of an and path, cheapest first. """
+        return sorted(paths, key=lambda path: self.estimate(path, converse, starts)[1])
+
+    def backward_cheaper(self, path: Path, converse: bool, starts: int, candidates: int) -> bool:
+        """ True if following path in converse from the candidates costs less than following
+            it from the start nodes. """
+        return self.estimate(path, not converse, candidates)[1] < self.estimate(path, converse, starts)[1]
+
+    def explain(self, path: Path, starts: int = 1) -> str:
+        """ Describes the plan for following path from a number of start nodes, with the
+            estimated nodes derived and cost of each part. """
+        lines = []
+        self._explain(path, False, starts, 0, lines)
+        return "\n".join(lines)
+
+    def _explain(self, path: Path, parent_converse: bool, starts: float, depth: int, lines: list, how: str = '') -> float:
+        converse = path.converse != parent_converse
+        derived, cost = self.estimate(path, parent_converse, starts)
+        lines.append("{}{}{}  (from {:.1f}: derives {:.1f}, cost {:.1f})".format(
+            "  " * depth, how, self._label(path, converse), starts, derived, cost))
+        if isinstance(path, AndPaths):
+            candidates = None
+            for i, subpath in enumerate(self.order(path.paths, converse, starts)):
+                if candidates is None:
+                    candidates = self._explain(subpath, converse, starts, depth + 1, lines, "1. forward: ")
+                elif self.backward_cheaper(subpath, converse, starts, candidates):
+                    # Checked in converse from the nodes derived so far
+                    candidates = min(candidates, self._explain(subpath, not converse, candidates, depth + 1, lines,
+                                                               "{}. converse: ".format(i + 1)))
+                else:
+                    candidates = min(candidates, self._explain(subpath, converse, starts, depth + 1, lines,
+                                                               "{}. forward: ".format(i + 1)))
+        elif isinstance(path, ComposedPaths) and not isinstance(path, OrPaths):
+            for subpath in (reversed(path.paths) if converse else path.paths):
+                starts = self._explain(subpath, converse, starts, depth + 1, lines)
+        elif isinstance(path, OrPaths):
+            for subpath in path.paths:
+                self._explain(subpath, converse, starts, depth + 1, lines)
+        elif isinstance(path, (KPlusPath, IRPath)):
+            self._explain(path.path, converse, starts, depth + 1, lines)
+        return derived
+
+    @staticmethod
+    def _label(path: Path, converse: bool) -> str:
+        if isinstance(path, BasePath):
+            return path.slot.name + ("-" if converse != path.backward else "")
+        if isinstance(path, AssertedPath):
+            return "!"
+        if isinstance(path, AndPaths):
+            return "and"
+        if isinstance(path, OrPaths):
+            return "or"
+        if isinstance(path, ComposedPaths):
+            return "compose" + (" (reversed)" if converse else "")
+        if isinstance(path, KStarPath):
+            return "kstar"
+        if isinstance(path, KPlusPath):
+            return "kplus"
+        if isinstance(path, IRPath):
+            return "irreflexive-restrict"
+        return str(path)
@@ -0,0 +1,251 @@
+"""
+Materialized path-based slots. A slot defined by paths (see define_path) exists between two
+nodes when one of its paths can be followed from one to the other. Materializing the slot
+stores that relation as virtual cables, which paths follow along with the slot's real cables,
+and keeps them up to date as nodes are added and asserted. Since ! makes the relation depend
+on the context, it is kept for each context paths follow the slot in.
+"""
+
+# =====================================
+# -------------- IMPORTS --------------
+# =====================================
+
+from threading import RLock
+from .SNError import SNError
+from .Path import OrPaths, evaluation, bind_context
+
+# =====================================
+# -------------- GLOBALS --------------
+# =====================================
+
+class PathSlotError(SNError):
+    pass
+
+CHUNK_SIZE = 256 # Start nodes followed together, a bit each
+
+NO_NODES = frozenset()
+
+# =====================================
+# ---------- VIRTUAL CABLES -----------
+# =====================================
+
+class VirtualCables:
+    """ The relation a slot's paths derive in one context, stored as virtual down cables (and
+        the matching up cables) between nodes. Start nodes are followed in chunks, recording the
+        nodes whose cables or assertion each chunk looked at. Since every path operator only
+        derives more as nodes and assertions are added, a new node or assertion only re-derives
+        the chunks which looked at one of the nodes involved (and follows the path from new
+        nodes), and only the pairs not derived before are added. Removing a belief from the
+        context recomputes the relation when it is next used. The sets of nodes the cables lead
+        to are replaced rather than changed, so paths followed in other threads can read them
+        while the relation is brought up to date. """
+
+    def __init__(self, materialized, path, context) -> None:
+        self.materialized = materialized # The MaterializedSlot this is the relation of in context
+        self.net = materialized.net
+        self.slot = materialized.slot
+        self.path = path # The paths of the slot, as one path, bound to context
+        self.context = context # The context the relation is derived in
+        self.down = {} # Maps nodes to the nodes their virtual down cables reach
+        self.up = {} # Maps nodes to the nodes with virtual down cables to them
+        self.chunks = [] # Lists of start nodes
+        self.chunk_touched = [] # The nodes each chunk looked at
+        self.index = {} # Maps touched nodes to the chunks which touched them
+        self.pending_chunks = set() # Chunks to follow again
+        self.pending_nodes = [] # New nodes to follow the path from
+        self.revision = None # The context's revision when the relation was derived
+        self.pairs = 0
+
+    def current(self) -> bool:
+        """ True if the virtual cables are up to date. """
+        return self.revision == self.context.revision and not self.pending_chunks and not self.pending_nodes
+
+    def build(self) -> None:
+        """ Derives the whole relation. """
+        self.revision = self.context.revision
+        self.pending_nodes = list(self.net.nodes.values())
+        self._apply()
+
+    def _apply(self) -> None:
+        """ Follows the path again from pending chunks, and from pending nodes in new chunks. """
+        pending_nodes, self.pending_nodes = self.pending_nodes, []
+        for start in range(0, len(pending_nodes), CHUNK_SIZE):
+            self.chunks.append(pending_nodes[start:start + CHUNK_SIZE])
+            self.chunk_touched.append(set())
+            self.pending_chunks.add(len(self.chunks) - 1)
+        added = []
+        computing = evaluation.computing
+        computing.add(self.slot)
+        try:
+            while self.pending_chunks:
+                added.extend(self._follow_chunk(self.pending_chunks.pop()))
+        finally:
+            computing.discard(self.slot)
+        if not added:
+            return
+        down_added = {}
+        up_added = {}
+        for start_node, node in added:
+            down_added.setdefault(start_node, set()).add(node)
+            up_added.setdefault(node, set()).add(start_node)
+        for cables, cables_added in ((self.down, down_added), (self.up, up_added)):
+            for node, nodes in cables_added.items():
+                cables[node] = cables.get(node, NO_NODES) | nodes
+        self.pairs += len(added)
+        self.net.virtual_cables_added(self.slot, self.context, added)
+
+    def _follow_chunk(self, i: int) -> list:
+        """ Follows the path from chunk i, and returns the pairs not derived before. """
+        chunk = self.chunks[i]
+        for node in self.chunk_touched[i]:
+            chunks = self.index.get(node)
+            if chunks is not None:
+                chunks.discard(i)
+        # Only this chunk's nodes are recorded, even if a path being followed elsewhere led here
+        touched = set()
+        outer = evaluation.recording
+        evaluation.recording = [touched]
+        try:
+            derived = self.path.derive({start_node: 1 << j for j, start_node in enumerate(chunk)}, False)
+        finally:
+            evaluation.recording = outer
+        self.chunk_touched[i] = touched
+        for node in touched:
+            self.index.setdefault(node, set()).add(i)
+
+        added = []
+        for node, mask in derived.items():
+            while mask:
+                bit = mask & -mask
+                start_node = chunk[bit.bit_length() - 1]
+                mask ^= bit
+                if node not in self.down.get(start_node, NO_NODES):
+                    added.append((start_node, node))
+        return added
+
+    def touch(self, nodes) -> None:
+        """ Marks for following again the chunks which looked at any of the nodes. """
+        for node in nodes:
+            self.pending_chunks.update(self.index.get(node, ()))
+
+    def add_node(self, node) -> None:
+        """ A new node: its fillers' up cables changed, and the path may be followed from it. """
+        self.pending_nodes.append(node)
+        frame = getattr(node, 'frame', None)
+        if frame is not None:
+            self.touch(filler for fillers in frame.filler_set for filler in fillers.nodes)
+
+    def follow(self, node, down: bool) -> set:
+        """ The nodes the virtual cables on node lead to, down or up. """
+        return (self.down if down else self.up).get(node, NO_NODES)
+
+    def __len__(self) -> int:
+        return self.pairs
+
+class MaterializedSlot:
+    """ The virtual cables of a slot, as one VirtualCables for each context its relation has
+        been needed in. A context's relation is derived the first time a path follows the slot
+        there, and then kept up to date. Relations are only changed while the network's
+        virtual_lock is held. """
+
+    def __init__(self, net, slot) -> None:
+        self.net = net
+        self.slot = slot
+        self.relations = {} # Maps contexts to their VirtualCables
+
+    def relation(self, context=None) -> VirtualCables:
+        """ The up to date relation in the given (or current) context. """
+        if context is None:
+            context = self.net.current_context
+        relation = self.relations.get(context)
+        if relation is not None and relation.current():
+            return relation
+        with self.net.virtual_lock:
+            relation = self.relations.get(context)
+            if relation is None or relation.revision != context.revision:
+                if relation is None:
+                    # Each context's relation has its own parse of the paths, bound to that context
+                    paths = [self.net.parse_path(str(path)) for path in self.slot.paths]
+                    path = paths[0] if len(paths) == 1 else OrPaths(paths)
+                    bind_context(path, context)
+                else:
+                    path = relation.path
+                # Derived whole before it replaces the old relation, which paths followed
+                # in other threads meanwhile keep reading
+                relation = VirtualCables(self, path, context)
+                relation.build()
+                self.relations[context] = relation
+            elif not relation.current():
+                relation._apply()
+            return relation
+
+    def follow(self, node, down: bool, context=None) -> set:
+        """ The nodes the virtual cables on node lead to in the given (or current) context. """
+        return self.relation(context).follow(node, down)
+
+    def touch(self, nodes, context) -> None:
+        with self.net.virtual_lock:
+            relation = self.relations.get(context)
+            if relation is not None:
+                relation.touch(nodes)
+
+    def add_node(self, node) -> None:
+        with self.net.virtual_lock:
+            for relation in self.relations.values():
+                relation.add_node(node)
+
+    def add_belief(self, context, node) -> None:
+        self.touch((node,), context)
+
+# =====================================
+# --------------- MIXIN ---------------
+# =====================================
+
+class PathSlotMixin:
+    """ Provides materializing of path-based slots to Network """
+
+    def __init__(self) -> None:
+        if type(self) is PathSlotMixin:
+            raise NotImplementedError("Mixins can't be instantiated.")
+        self.virtual_cables = {} # Maps slot names to MaterializedSlots
+        self.virtual_lock = RLock() # Held while virtual cables are derived
+        # node_hooks and atms are defined by mixins which are initialized first
+        self.node_hooks.append(self._virtual_add_node)
+        self.atms.belief_hooks.append(self._virtual_add_belief)
+
+    def materialize_slot(self, slot_name: str, context_name: str = None) -> VirtualCables:
+        """ Stores the relation the paths of the slot derive as virtual cables, which paths
+            following the slot then use along with its real cables. The relation is derived in
+            each context the slot is followed in; it is derived now in the named (or current)
+            context, and returned. Once a belief is removed, a new relation replaces it. """
+        slot = self.find_slot(slot_name)
+        if not slot.paths:
+            raise PathSlotError("ERROR: Slot {} has no paths. See define_path.".format(slot_name))
+        context = self._path_context(context_name)
+        materialized = MaterializedSlot(self, slot)
+        slot.virtual = materialized
+        self.virtual_cables[slot.name] = materialized
+        return materialized.relation(context)
+
+    def dematerialize_slot(self, slot_name: str) -> None:
+        """ Drops the virtual cables of a slot. """
+        slot = self.find_slot(slot_name)
+        slot.virtual = None
+        self.virtual_cables.pop(slot.name, None)
+
+    def virtual_cables_added(self, slot, context, pairs: list) -> None:
+        """ Called with the pairs of nodes newly joined by a slot's virtual cables in context.
+            The relations of other materialized slots in that context which looked at them
+            are brought up to date. """
+        nodes = set(node for pair in pairs for node in pair)
+        for materialized in self.virtual_cables.values():
+            if materialized.slot is not slot:
+                materialized.touch(nodes, context)
+
+    def _virtual_add_node(self, node) -> None:
+        for materialized in self.virtual_cables.values():
+            materialized.add_node(node)
+
+    def _virtual_add_belief(self, context, node) -> None:
+        for materialized in self.virtual_cables.values():
+            materialized.add_belief(context, node)
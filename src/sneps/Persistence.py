@@ -0,0 +1,468 @@
+"""
+Binary snapshots of whole networks. A snapshot is a table of interned strings followed
+by one flat array of integers, in which every type, slot, caseframe, node and context is
+written as a fixed sequence of values, and every reference is a string or node index.
+Loading reads both arrays at once and rebuilds the objects directly, without parsing any wfts.
+"""
+
+# =====================================
+# -------------- IMPORTS --------------
+# =====================================
+
+from array import array
+from sys import byteorder
+from .SNError import SNError
+from .SemanticType import SemanticType
+from .Slot import Slot, AdjRule
+from .Caseframe import Caseframe, Frame, Fillers
+from .Context import Context
+from .Node import Base, Molecular, Arbitrary, Indefinite, AndOrNode, ThreshNode, ImplNode, UpCable
+from .wft.vars.UniqueRep import UniqueRep, VarRep
+
+# =====================================
+# -------------- GLOBALS --------------
+# =====================================
+
+class PersistenceError(SNError):
+    pass
+
+MAGIC = b'SNEPSNET'
+VERSION = 2 # Version 2 added the journal generation
+NONE = -1
+
+# Node kinds, in the order written to the file
+NODE_KINDS = [Base, Arbitrary, Indefinite, Molecular, AndOrNode, ThreshNode, ImplNode]
+
+# =====================================
+# -------------- WRITER ---------------
+# =====================================
+
+class SnapshotWriter:
+    """ Accumulates the string table and integer array of a snapshot. """
+
+    def __init__(self) -> None:
+        self.strings = []
+        self.string_ids = {}
+        self.ints = array('q')
+
+    def string(self, value: str) -> None:
+        """ Writes the index of an interned string (or NONE). """
+        if value is None:
+            self.ints.append(NONE)
+            return
+        index = self.string_ids.get(value)
+        if index is None:
+            index = len(self.strings)
+            self.string_ids[value] = index
+            self.strings.append(value)
+        self.ints.append(index)
+
+    def int(self, value: int) -> None:
+        self.ints.append(NONE if value is None else value)
+
+    def ints_list(self, values) -> None:
+        """ Writes a length-prefixed list of integers. """
+        values = list(values)
+        self.ints.append(len(values))
+        self.ints.extend(values)
+
+    def strings_list(self, values) -> None:
+        values = list(values)
+        self.ints.append(len(values))
+        for value in values:
+            self.string(value)
+
+    def bitset(self, value: int) -> None:
+        """ Writes an arbitrarily large non-negative int as the positions of its set bits,
+            since hypothesis sets are sparse. """
+        positions = []
+        while value:
+            low = value & -value
+            positions.append(low.bit_length() - 1)
+            value ^= low
+        self.ints_list(positions)
+
+    def to_bytes(self) -> bytes:
+        blob = bytearray()
+        offsets = array('q', [0])
+        for value in self.strings:
+            blob += value.encode('utf-8')
+            offsets.append(len(blob))
+        header = MAGIC + array('q', [VERSION, 0 if byteorder == 'little' else 1,
+                                     len(self.strings), len(blob), len(self.ints)]).tobytes()
+        return header + offsets.tobytes() + bytes(blob) + self.ints.tobytes()
+
+# =====================================
+# -------------- READER ---------------
+# =====================================
+
+class SnapshotReader:
+    """ Reads back what SnapshotWriter wrote, in the same order. """
+
+    def __init__(self, data: bytes) -> None:
+        if data[:len(MAGIC)] != MAGIC:
+            raise PersistenceError("ERROR: Not a SNePS network snapshot.")
+        position = len(MAGIC)
+        header = array('q')
+        header.frombytes(data[position:position + 40])
+        position += 40
+        swap = header[1] != (0 if byteorder == 'little' else 1)
+        if swap:
+            header.byteswap()
+        version, _, num_strings, blob_length, num_ints = header
+        if not 1 <= version <= VERSION:
+            raise PersistenceError("ERROR: Unsupported snapshot version {}.".format(version))
+
+        offsets = array('q')
+        offsets.frombytes(data[position:position + 8 * (num_strings + 1)])
+        position += 8 * (num_strings + 1)
+        blob = data[position:position + blob_length]
+        position += blob_length
+        self.ints = array('q')
+        self.ints.frombytes(data[position:position + 8 * num_ints])
+        if swap:
+            offsets.byteswap()
+            self.ints.byteswap()
+
+        self.strings = [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(num_strings)]
+        self.position = 0
+        self.version = version
+
+    def int(self):
+        value = self.ints[self.position]
+        self.position += 1
+        return None if value == NONE else value
+
+    def string(self):
+        index = self.int()
+        return None if index is None else self.strings[index]
+
+    def ints_list(self) -> list:
+        length = self.ints[self.position]
+        start = self.position + 1
+        self.position = start + length
+        return self.ints[start:self.position].tolist()
+
+    def strings_list(self) -> list:
+        return [self.strings[index] for index in self.ints_list()]
+
+    def bitset(self) -> int:
+        value = 0
+        for position in self.ints_list():
+            value |= 1 << position
+        return value
+
+# =====================================
+# --------------- MIXIN ---------------
+# =====================================
+
+class PersistenceMixin:
+    """ Provides saving and loading of whole networks to Network """
+
+    def __init__(self) -> None:
+        if type(self) is PersistenceMixin:
+            raise NotImplementedError("Mixins can't be instantiated.")
+
+    def save(self, path: str) -> None:
+        """ Writes a binary snapshot of the network to the given file. """
+        with open(path, 'wb') as file:
+            file.write(self.snapshot_bytes())
+
+    def snapshot_bytes(self, journal_generation: int = 0) -> bytes:
+        """ Returns the binary snapshot of the network. journal_generation is the first
+            journal segment whose records the snapshot does not include. """
+        out = SnapshotWriter()
+        out.int(journal_generation)
+
+        # Global counters, so that names given after loading do not collide
+        out.int(Molecular.counter)
+        out.int(Arbitrary.counter)
+        out.int(Indefinite.counter)
+        out.int(VarRep.var_num)
+
+        # Semantic types
+        types = list(self.sem_hierarchy.sem_types.values())
+        out.int(len(types))
+        for sem_type in types:
+            out.string(sem_type.name)
+            out.strings_list(parent.name for parent in sem_type.parents)
+
+        # Slots
+        out.int(len(self.slots))
+        for slot in self.slots.values():
+            out.string(slot.name)
+            out.string(slot.sem_type.name)
+            out.string(slot.docstring)
+            out.int(slot.pos_adj.value)
+            out.int(slot.neg_adj.value)
+            out.int(slot.min)
+            out.int(slot.max)
+            out.strings_list(str(path) for path in slot.paths)
+
+        # Caseframes
+        caseframes = list(self.caseframes.values())
+        caseframe_ids = {caseframe: i for i, caseframe in enumerate(caseframes)}
+        out.int(len(caseframes))
+        for caseframe in caseframes:
+            out.string(caseframe.name)
+            out.string(caseframe.sem_type.name)
+            out.string(caseframe.docstring)
+            out.strings_list(slot.name for slot in caseframe.slots)
+            out.strings_list(sorted(caseframe.aliases))
+        for caseframe in caseframes:
+            out.ints_list(caseframe_ids[other] for other in caseframe.adj_to)
+            out.ints_list(caseframe_ids[other] for other in caseframe.adj_from)
+
+        # Nodes: a header for each node first, so that the contents can refer to any node
+        nodes = list(self.nodes.values())
+        node_ids = {node: i for i, node in enumerate(nodes)}
+        out.int(len(nodes))
+        for node in nodes:
+            out.int(NODE_KINDS.index(type(node)))
+            out.string(node.name)
+            out.string(node.sem_type.name)
+        for node in nodes:
+            if isinstance(node, Molecular):
+                out.int(caseframe_ids[node.frame.caseframe])
+                for fillers in node.frame.filler_set:
+                    out.ints_list(node_ids[filler] for filler in fillers.nodes)
+                if isinstance(node, ImplNode):
+                    out.int(node.bound)
+                elif isinstance(node, (AndOrNode, ThreshNode)):
+                    out.int(node.min)
+                    out.int(node.max)
+            elif isinstance(node, (Arbitrary, Indefinite)):
+                out.ints_list(node_ids[restriction] for restriction in node.restriction_set)
+                if isinstance(node, Indefinite):
+                    out.ints_list(node_ids[dependency] for dependency in node.dependency_set
+                                  if dependency in node_ids)
+
+        # Variable uniqueness representations
+        variables = [node for node in nodes if isinstance(node, (Arbitrary, Indefinite))]
+        rep_ids = {node.var_rep: i for i, node in enumerate(variables)}
+        for node in variables:
+            out.string(node.var_rep.name)
+            out.int(len(node.var_rep.restriction_reps))
+            for rep in node.var_rep.restriction_reps:
+                self._write_unique_rep(out, rep)
+            out.ints_list(rep_ids[rep] for rep in node.var_rep.dependency_reps if rep in rep_ids)
+
+        # Contexts, parents first
+        contexts = self._contexts_parents_first()
+        out.int(len(contexts))
+        for context in contexts:
+            out.string(context.name)
+            out.string(context.docstring)
+            out.string(None if context.parent is None else context.parent.name)
+            out.ints_list(node_ids[node] for node in context.hyps)
+            out.ints_list(node_ids[node] for node in context.ders if node in node_ids)
+        out.string(self.current_context.name)
+
+        # Hypothesis bits, labels and justifications
+        atms = self.atms
+        hyps = sorted(atms.hyp_bits, key=atms.hyp_bits.get)
+        out.ints_list(node_ids[node] for node in hyps)
+        # Labels which only hold the node's own hypothesis bit are rebuilt from the bits
+        labelled = [node for node in atms.labels if node in node_ids and
+                    atms.labels[node] != [atms.hyp_bits.get(node)]]
+        out.int(len(labelled))
+        for node in labelled:
+            out.int(node_ids[node])
+            out.int(len(atms.labels[node]))
+            for env in atms.labels[node]:
+                out.bitset(env)
+        justifications = {justification for consequences in atms.consequences.values()
+                          for justification in consequences}
+        justifications = [(node, premises) for node, premises in justifications
+                          if node in node_ids and all(premise in node_ids for premise in premises)]
+        out.int(len(justifications))
+        for node, premises in justifications:
+            out.int(node_ids[node])
+            out.ints_list(node_ids[premise] for premise in premises)
+
+        return out.to_bytes()
+
+    @classmethod
+    def load(cls, path: str):
+        """ Builds a new network from a snapshot written by save. """
+        with open(path, 'rb') as file:
+            return cls.from_snapshot_bytes(file.read())
+
+    @classmethod
+    def from_snapshot_bytes(cls, data: bytes):
+        """ Builds a new network from the bytes returned by snapshot_bytes. """
+        net = cls.__new__(cls)
+        for base in cls.__bases__:
+            base.__init__(net)
+        net.restore_snapshot_bytes(data)
+        return net
+
+    def restore_snapshot_bytes(self, data: bytes) -> None:
+        """ Fills this (freshly initialized) network with the contents of a snapshot. """
+        inp = SnapshotReader(data)
+        self.journal_generation = inp.int() if inp.version >= 2 else 0
+
+        Molecular.counter = max(Molecular.counter, inp.int())
+        Arbitrary.counter = max(Arbitrary.counter, inp.int())
+        Indefinite.counter = max(Indefinite.counter, inp.int())
+        VarRep.var_num = max(VarRep.var_num, inp.int())
+
+        # Semantic types
+        hierarchy = self.sem_hierarchy
+        type_parents = []
+        for _ in range(inp.int()):
+            name = inp.string()
+            if name not in hierarchy.sem_types:
+                hierarchy.sem_types[name] = SemanticType(name)
+            type_parents.append((hierarchy.sem_types[name], inp.strings_list()))
+        for sem_type, parent_names in type_parents:
+            for parent_name in parent_names:
+                parent = hierarchy.sem_types[parent_name]
+                sem_type.add_parent(parent)
+                parent.add_child(sem_type)
+
+        # Slots (paths are attached once every slot exists)
+        slot_paths = []
+        for _ in range(inp.int()):
+            name = inp.string()
+            sem_type = hierarchy.get_type(inp.string())
+            docstring = inp.string()
+            pos_adj = AdjRule(inp.int()).name
+            neg_adj = AdjRule(inp.int()).name
+            min_fillers = inp.int()
+            max_fillers = inp.int()
+            self.slots[name] = Slot(name, sem_type, docstring, pos_adj, neg_adj, min_fillers, max_fillers)
+            slot_paths.append((name, inp.strings_list()))
+        for name, paths in slot_paths:
+            for path_str in paths:
+                self.define_path(name, path_str)
+
+        # Caseframes
+        caseframes = []
+        for _ in range(inp.int()):
+            name = inp.string()
+            sem_type = hierarchy.get_type(inp.string())
+            docstring = inp.string()
+            slots = [self.slots[slot_name] for slot_name in inp.strings_list()]
+            caseframe = Caseframe(name, sem_type, hierarchy, docstring, slots)
+            caseframe.aliases = set(inp.strings_list())
+            self.caseframes[name] = caseframe
+            caseframes.append(caseframe)
+        for caseframe in caseframes:
+            caseframe.adj_to = set(caseframes[i] for i in inp.ints_list())
+            caseframe.adj_from = set(caseframes[i] for i in inp.ints_list())
+
+        # Node shells
+        nodes = []
+        for _ in range(inp.int()):
+            node = object.__new__(NODE_KINDS[inp.int()])
+            node.name = inp.string()
+            node.sem_type = hierarchy.get_type(inp.string())
+            node.up_cableset = set()
+            node.unique_rep = None
+            nodes.append(node)
+
+        # Node contents
+        for node in nodes:
+            if isinstance(node, Molecular):
+                caseframe = caseframes[inp.int()]
+                filler_set = [Fillers([nodes[i] for i in inp.ints_list()]) for _ in caseframe.slots]
+                frame = object.__new__(Frame)
+                frame.caseframe = caseframe
+                frame.filler_set = filler_set
+                node.frame = frame
+                if isinstance(node, ImplNode):
+                    node.bound = inp.int()
+                elif isinstance(node, (AndOrNode, ThreshNode)):
+                    node.min = inp.int()
+                    node.max = inp.int()
+                for slot, fillers in zip(caseframe.slots, filler_set):
+                    for filler in fillers.nodes:
+                        filler.up_cableset.add(UpCable(node, slot))
+            elif isinstance(node, (Arbitrary, Indefinite)):
+                node.restriction_set = set(nodes[i] for i in inp.ints_list())
+                if isinstance(node, Indefinite):
+                    node.dependency_set = set(nodes[i] for i in inp.ints_list())
+
+        # Variable uniqueness representations
+        variables = [node for node in nodes if isinstance(node, (Arbitrary, Indefinite))]
+        dependencies = []
+        for node in variables:
+            var_rep = object.__new__(VarRep)
+            var_rep.name = inp.string()
+            var_rep.restriction_reps = set(self._read_unique_rep(inp) for _ in range(inp.int()))
+            var_rep.dependency_names = set()
+            node.var_rep = var_rep
+            dependencies.append(inp.ints_list())
+        for node, dependency_ids in zip(variables, dependencies):
+            node.var_rep.dependency_reps = set(variables[i].var_rep for i in dependency_ids)
+
+        for node in nodes:
+            self.add_node(node)
+
+        # Contexts
+        self.contexts = {}
+        for _ in range(inp.int()):
+            name = inp.string()
+            docstring = inp.string()
+            parent_name = inp.string()
+            parent = None if parent_name is None else self.contexts[parent_name]
+            context = Context(name, docstring, parent, self.atms)
+            context.hyps = set(nodes[i] for i in inp.ints_list())
+            context.ders = set(nodes[i] for i in inp.ints_list())
+            self.contexts[name] = context
+        self.default_context = self.contexts["default"]
+        self.current_context = self.contexts[inp.string()]
+
+        # Hypothesis bits, labels and justifications
+        atms = self.atms
+        for i in inp.ints_list():
+            atms.hyp_bit(nodes[i])
+        for _ in range(inp.int()):
+            node = nodes[inp.int()]
+            atms.labels[node] = []
+            envs = [inp.bitset() for _ in range(inp.int())]
+            atms._update(node, envs)
+        for _ in range(inp.int()):
+            node = nodes[inp.int()]
+            premises = tuple(nodes[i] for i in inp.ints_list())
+            for premise in premises:
+                atms.consequences.setdefault(premise, []).append((node, premises))
+        for context in self.contexts.values():
+            for node in context.hyps:
+                context.hyp_mask |= atms.hyp_bits.get(node, 0)
+
+    def _contexts_parents_first(self) -> list:
+        ordered = []
+        placed = set()
+        def place(context):
+            if context not in placed:
+                if context.parent is not None:
+                    place(context.parent)
+                placed.add(context)
+                ordered.append(context)
+        for context in self.contexts.values():
+            place(context)
+        return ordered
+
+    def _write_unique_rep(self, out: SnapshotWriter, rep: UniqueRep) -> None:
+        out.string(rep.name)
+        out.string(rep.caseframe_name)
+        out.int(rep.min)
+        out.int(rep.max)
+        out.int(rep.bound)
+        out.int(len(rep.children))
+        for group in rep.children:
+            out.int(len(group))
+            for child in group:
+                self._write_unique_rep(out, child)
+
+    def _read_unique_rep(self, inp: SnapshotReader) -> UniqueRep:
+        rep = object.__new__(UniqueRep)
+        rep.name = inp.string()
+        rep.caseframe_name = inp.string()
+        rep.min = inp.int()
+        rep.max = inp.int()
+        rep.bound = inp.int()
+        rep.children = [[self._read_unique_rep(inp) for _ in range(inp.int())] for _ in range(inp.int())]
+        return rep
@@ -1,7 +1,9 @@
 from math import inf
 from .SNError import SNError
+from .Journal import journaled
 from re import match
 from typing import List
+from collections import namedtuple
 
 # =====================================
 # ------------- GLOBALS ---------------
@@ -10,6 +12,9 @@ from typing import List
 class SemError(SNError):
     pass
 
+# Yielded by SemanticMixin.iter_types
+TypeRecord = namedtuple('TypeRecord', ['name', 'parents', 'children'])
+
 # =====================================
 # ---------- SEMANTIC TYPE ------------
 # =====================================
@@ -54,6 +59,7 @@ class SemanticHierarchy:
         self.root_node = SemanticType("Entity")
         self.sem_types = {} # Maps strings to SemanticType objects
         self.sem_types["Entity"] = self.root_node
+        self.retype_hooks = [] # Functions called with each node whose type changes, and its old type
 
     def add_type(self, type_name: str, parent_names: List[str] = None) -> None:
         """ Adds a new semantic type to the hierarchy. This will be another function called by users. """
@@ -176,7 +182,16 @@ class SemanticHierarchy:
         """ Respecifies a node to a new type so it can fit in a slot for that type node """
         filler_type = node.sem_type
         if filler_type is not slot_type and not slot_type.subtype(filler_type):
-                node.sem_type = self.respecify(node.name, filler_type, slot_type)
+                self.retype(node, self.respecify(node.name, filler_type, slot_type))
+
+    def retype(self, node, new_type: SemanticType) -> None:
+        """ Gives a node a new type, and notifies anything counting nodes by type. """
+        old_type = node.sem_type
+        if new_type is old_type:
+            return
+        node.sem_type = new_type
+        for hook in self.retype_hooks:
+            hook(node, old_type)
 
     def __str__(self) -> str:
         return ", ".join(self.sem_types.keys())
@@ -194,6 +209,7 @@ class SemanticMixin:
 
         self.sem_hierarchy = SemanticHierarchy()
 
+    @journaled
     def define_type(self, name: str, parent_names: List[str] = None) -> None:
         """ Adds a term to the semantic hierarchy. This is another important
             function for interacting with SNePS. """
@@ -204,6 +220,14 @@ class SemanticMixin:
         parent_names = [] if parent_names is None else parent_names
         self.sem_hierarchy.add_type(name, parent_names)
 
+    def iter_types(self, filter=None):
+        """ Yields a TypeRecord for each semantic type (for which filter(record) is true, if given). """
+        for sem_type in self.sem_hierarchy.sem_types.values():
+            record = TypeRecord(sem_type.name, tuple(parent.name for parent in sem_type.parents),
+                                tuple(child.name for child in sem_type.children))
+            if filter is None or filter(record):
+                yield record
+
     def list_types(self) -> None:
         """ Prints a string representation of each type in the semantic hierarchy. """
         print("[{}]".format(self.sem_hierarchy))
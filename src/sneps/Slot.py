@@ -1,7 +1,9 @@
 from enum import Enum
 from .SNError import SNError
+from .Journal import journaled
 from .SemanticType import SemanticType
 from re import match
+from collections import namedtuple
 from .Path import Path
 
 # =====================================
@@ -11,6 +13,9 @@ from .Path import Path
 class SlotError(SNError):
     pass
 
+# Yielded by SlotMixin.iter_slots
+SlotRecord = namedtuple('SlotRecord', ['name', 'sem_type', 'docstring', 'pos_adj', 'neg_adj', 'min', 'max', 'paths'])
+
 class AdjRule(Enum):
     """ Enum allows us to use these names as shorthands in adjustment rules. """
     NONE = 0
@@ -39,6 +44,7 @@ class Slot:
         self.min = min
         self.max = max
         self.paths = set()
+        self.virtual = None # MaterializedSlot, if the slot's paths are materialized
 
     def add_path(self, path: Path) -> None:
         """ Adds a new path object on which the slot exists. """
@@ -77,6 +83,7 @@ class SlotMixin:
         else:
             raise SlotError("ERROR: The slot name '{}' does not exist".format(name))
 
+    @journaled
     def define_slot(self, name: str, sem_type_str: str, docstring="", pos_adj="NONE",
                     neg_adj="NONE", min=1, max=None, path='') -> None:
         """ Adds new slot to network """
@@ -95,6 +102,14 @@ class SlotMixin:
         # Adds any path which might have been provided to the slot
         self.define_path(name, path)
 
+    def iter_slots(self, filter=None):
+        """ Yields a SlotRecord for each slot (for which filter(record) is true, if given). """
+        for slot in self.slots.values():
+            record = SlotRecord(slot.name, slot.sem_type.name, slot.docstring, slot.pos_adj.name.lower(),
+                                slot.neg_adj.name.lower(), slot.min, slot.max, tuple(str(path) for path in slot.paths))
+            if filter is None or filter(record):
+                yield record
+
     def list_slots(self) -> None:
         """ Prints all slots in network """
         for slot_name in self.slots:
@@ -0,0 +1,393 @@
+"""
+SQLite-backed storage of a network's nodes, for networks larger than memory. Nodes, their
+frames and fillers, the up cables derived from the fillers, and the beliefs of each context
+are kept in a local database. Only a bounded cache of recently used nodes is kept in memory,
+along with any node still referenced from elsewhere. Variables are always kept in memory.
+
+The discrimination tree, path statistics and caseframe summary index nodes by name, so they
+keep no node in memory. Other indexes do refer to nodes, and keep the nodes they hold:
+- ATMS labels and justifications, for derived beliefs and the hypotheses they rest on
+- equivalence classes and unit propagation state, for the contexts they have been used in
+- the virtual cables of materialized slots
+- cached closures, which use_sqlite_store bounds to as many nodes as the node cache
+So memory stays bounded for a large network queried by paths and asks, but grows with the
+derived beliefs, equivalences and materialized relations kept about it.
+"""
+
+# =====================================
+# -------------- IMPORTS --------------
+# =====================================
+
+import sqlite3
+from collections import OrderedDict
+from collections.abc import MutableMapping, MutableSet
+from weakref import WeakValueDictionary
+from .SNError import SNError
+from .Caseframe import Frame, Fillers
+from .Node import Node, Base, Molecular, Variable, Arbitrary, Indefinite, AndOrNode, ThreshNode, ImplNode, UpCable
+
+# =====================================
+# -------------- GLOBALS --------------
+# =====================================
+
+class StoreError(SNError):
+    pass
+
+# Node kinds, as stored in the database
+NODE_KINDS = [Base, Arbitrary, Indefinite, Molecular, AndOrNode, ThreshNode, ImplNode]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS nodes (
+    name TEXT PRIMARY KEY,
+    kind INTEGER NOT NULL,
+    sem_type TEXT NOT NULL,
+    caseframe TEXT,
+    min INTEGER,
+    max INTEGER,
+    bound INTEGER,
+    frame_key TEXT
+);
+CREATE INDEX IF NOT EXISTS nodes_by_frame ON nodes (frame_key);
+CREATE TABLE IF NOT EXISTS fillers (
+    node TEXT NOT NULL,
+    slot INTEGER NOT NULL,
+    filler TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fillers_by_node ON fillers (node);
+CREATE INDEX IF NOT EXISTS fillers_by_filler ON fillers (filler);
+CREATE TABLE IF NOT EXISTS beliefs (
+    context TEXT NOT NULL,
+    derived INTEGER NOT NULL,
+    node TEXT NOT NULL,
+    PRIMARY KEY (context, derived, node)
+);
+"""
+
+def frame_text(frame: Frame) -> str:
+    """ A string which is equal for equal frames, used to find existing nodes by frame. """
+    return frame.caseframe.name + "(" + ";".join(",".join(sorted(node.name for node in fillers.nodes))
+                                                 for fillers in frame.filler_set) + ")"
+
+# =====================================
+# ------------- NODE STORE ------------
+# =====================================
+
+class NodeStore(MutableMapping):
+    """ Maps node names to nodes like Network.nodes, reading nodes from the database as needed.
+        The cache_size most recently used nodes are kept in memory; a node evicted from the
+        cache while still referenced elsewhere is found again through a weak map, so each
+        node has a single object at a time. """
+
+    def __init__(self, net, path: str, cache_size: int = 10000, commit_every: int = 1000) -> None:
+        self.net = net
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript("PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;" + SCHEMA)
+        if self.connection.execute("SELECT 1 FROM nodes LIMIT 1").fetchone() is not None:
+            raise StoreError("ERROR: The node store {} is not empty.".format(path))
+        self.cache_size = cache_size
+        self.commit_every = commit_every
+        self.cache = OrderedDict() # Recently used nodes, most recent last
+        self.live = WeakValueDictionary() # Every node object currently in memory
+        self.pinned = {} # Variables, which are never evicted
+        self.writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    # Mapping
+    # =======
+
+    def __getitem__(self, name: str) -> Node:
+        node = self.get(name)
+        if node is None:
+            raise KeyError(name)
+        return node
+
+    def get(self, name: str, default=None):
+        node = self.cache.get(name)
+        if node is not None:
+            self.cache.move_to_end(name)
+            self.hits += 1
+            return node
+        node = self.pinned.get(name) or self.live.get(name)
+        if node is None:
+            row = self.connection.execute("SELECT name, kind, sem_type, caseframe, min, max, bound "
+                                          "FROM nodes WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                return default
+            self.misses += 1
+            node = self._materialize(row)
+        else:
+            self.hits += 1
+        self._remember(node)
+        return node
+
+    def __contains__(self, name) -> bool:
+        return name in self.cache or name in self.pinned or name in self.live or \
+               self.connection.execute("SELECT 1 FROM nodes WHERE name = ?", (name,)).fetchone() is not None
+
+    def __setitem__(self, name: str, node: Node) -> None:
+        if name in self:
+            # Renaming is done by deleting and re-adding, so an existing name is an update
+            del self[name]
+        caseframe = frame_key = min_value = max_value = bound = None
+        if isinstance(node, Molecular):
+            caseframe = node.frame.caseframe.name
+            frame_key = frame_text(node.frame)
+            self.connection.executemany("INSERT INTO fillers VALUES (?, ?, ?)",
+                                        [(name, i, filler.name) for i, fillers in enumerate(node.frame.filler_set)
+                                         for filler in fillers.nodes])
+            for fillers in node.frame.filler_set:
+                for filler in fillers.nodes:
+                    filler.up_cableset.rows = None
+            min_value = getattr(node, 'min', None)
+            max_value = getattr(node, 'max', None)
+            bound = getattr(node, 'bound', None)
+        self.connection.execute("INSERT INTO nodes VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                (name, NODE_KINDS.index(type(node)), node.sem_type.name, caseframe,
+                                 min_value, max_value, bound, frame_key))
+        node.up_cableset = StoredUpCables(self, node)
+        if isinstance(node, Variable):
+            self.pinned[name] = node
+        self._remember(node)
+        self._wrote()
+
+    def __delitem__(self, name: str) -> None:
+        self.connection.execute("DELETE FROM nodes WHERE name = ?", (name,))
+        self.connection.execute("DELETE FROM fillers WHERE node = ?", (name,))
+        self.cache.pop(name, None)
+        self.pinned.pop(name, None)
+        self.live.pop(name, None)
+        self._wrote()
+
+    def __iter__(self):
+        # Names are read in pages so that the iteration does not hold a cursor open while nodes are added
+        last = ''
+        while True:
+            names = [name for (name,) in self.connection.execute(
+                "SELECT name FROM nodes WHERE name > ? ORDER BY name LIMIT 1000", (last,))]
+            if not names:
+                return
+            yield from names
+            last = names[-1]
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM nodes").fetchone()[0]
+
+    # Queries
+    # =======
+
+    def with_frame(self, frame: Frame) -> list:
+        """ The stored molecular nodes with the given frame. """
+        rows = self.connection.execute("SELECT name FROM nodes WHERE frame_key = ?", (frame_text(frame),))
+        return [self[name] for (name,) in rows.fetchall()]
+
+    def up_cables(self, name: str) -> list:
+        """ The (node name, slot position) of each node with the named node as a filler. """
+        return self.connection.execute("SELECT node, slot FROM fillers WHERE filler = ?", (name,)).fetchall()
+
+    def renamed(self, node: Node, old_name: str) -> None:
+        """ Updates the rows which refer to a renamed node by its old name. """
+        self.connection.execute("UPDATE fillers SET filler = ? WHERE filler = ?", (node.name, old_name))
+        self.connection.execute("UPDATE beliefs SET node = ? WHERE node = ?", (node.name, old_name))
+        for parent_name, _ in self.up_cables(node.name):
+            self.connection.execute("UPDATE nodes SET frame_key = ? WHERE name = ?",
+                                    (frame_text(self[parent_name].frame), parent_name))
+        node.up_cableset.name = node.name
+        if isinstance(node, Molecular):
+            for fillers in node.frame.filler_set:
+                for filler in fillers.nodes:
+                    filler.up_cableset.rows = None
+        self._wrote()
+
+    def retyped(self, node: Node, old_type) -> None:
+        """ Writes a node's new semantic type, so that it is kept once the node is evicted. """
+        self.connection.execute("UPDATE nodes SET sem_type = ? WHERE name = ?", (node.sem_type.name, node.name))
+        self._wrote()
+
+    def commit(self) -> None:
+        self.connection.commit()
+        self.writes = 0
+
+    def close(self) -> None:
+        self.commit()
+        self.connection.close()
+
+    def clear_cache(self) -> None:
+        """ Forgets every cached node which is not referenced elsewhere. """
+        self.cache.clear()
+
+    # Helpers
+    # =======
+
+    def _remember(self, node: Node) -> None:
+        self.live[node.name] = node
+        self.cache[node.name] = node
+        self.cache.move_to_end(node.name)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def _wrote(self) -> None:
+        self.writes += 1
+        if self.writes >= self.commit_every:
+            self.commit()
+
+    def _materialize(self, row) -> Node:
+        """ Builds the node object for a database row. Fillers are fetched through the store. """
+        name, kind, sem_type, caseframe_name, min_value, max_value, bound = row
+        node = object.__new__(NODE_KINDS[kind])
+        node.name = name
+        node.sem_type = self.net.sem_hierarchy.get_type(sem_type)
+        node.unique_rep = None
+        node.up_cableset = StoredUpCables(self, node)
+        if isinstance(node, Molecular):
+            caseframe = self.net.caseframes[caseframe_name]
+            fillers = [[] for _ in caseframe.slots]
+            for slot, filler in self.connection.execute(
+                    "SELECT slot, filler FROM fillers WHERE node = ?", (name,)).fetchall():
+                fillers[slot].append(self[filler])
+            frame = object.__new__(Frame)
+            frame.caseframe = caseframe
+            frame.filler_set = [Fillers(nodes) for nodes in fillers]
+            node.frame = frame
+            if isinstance(node, ImplNode):
+                node.bound = bound
+            elif isinstance(node, (AndOrNode, ThreshNode)):
+                node.min = min_value
+                node.max = max_value
+        return node
+
+class StoredUpCables:
+    """ The up cables of a stored node. Only the names of the nodes above are kept, read from
+        the fillers table when first used, so that a node does not keep them in memory. """
+
+    def __init__(self, store: NodeStore, node: Node) -> None:
+        self.store = store
+        self.name = node.name
+        self.rows = None # (node name, slot position) pairs, or None until read
+
+    def __iter__(self):
+        if self.rows is None:
+            self.rows = self.store.up_cables(self.name)
+        for parent_name, slot in self.rows:
+            parent = self.store[parent_name]
+            yield UpCable(parent, parent.frame.caseframe.slots[slot])
+
+    def __len__(self) -> int:
+        if self.rows is None:
+            self.rows = self.store.up_cables(self.name)
+        return len(self.rows)
+
+    def add(self, up_cable: UpCable) -> None:
+        """ Up cables are rows of the fillers table, written when the node above is stored. """
+        self.rows = None
+
+# =====================================
+# ------------ BELIEF SETS ------------
+# =====================================
+
+class StoredNodeSet(MutableSet):
+    """ The hypotheses or derived beliefs of a context, as rows of the beliefs table. """
+
+    def __init__(self, store: NodeStore, context_name: str, derived: bool, nodes=()) -> None:
+        self.store = store
+        self.context_name = context_name
+        self.derived = int(derived)
+        for node in nodes:
+            self.add(node)
+
+    @classmethod
+    def _from_iterable(cls, iterable):
+        # Results of set operations are ordinary sets
+        return set(iterable)
+
+    def __contains__(self, node) -> bool:
+        return self.store.connection.execute(
+            "SELECT 1 FROM beliefs WHERE context = ? AND derived = ? AND node = ?",
+            (self.context_name, self.derived, node.name)).fetchone() is not None
+
+    def __iter__(self):
+        names = self.store.connection.execute(
+            "SELECT node FROM beliefs WHERE context = ? AND derived = ?",
+            (self.context_name, self.derived)).fetchall()
+        for (name,) in names:
+            yield self.store[name]
+
+    def __len__(self) -> int:
+        return self.store.connection.execute(
+            "SELECT COUNT(*) FROM beliefs WHERE context = ? AND derived = ?",
+            (self.context_name, self.derived)).fetchone()[0]
+
+    def add(self, node) -> None:
+        self.store.connection.execute("INSERT OR IGNORE INTO beliefs VALUES (?, ?, ?)",
+                                      (self.context_name, self.derived, node.name))
+        self.store._wrote()
+
+    def discard(self, node) -> None:
+        self.store.connection.execute("DELETE FROM beliefs WHERE context = ? AND derived = ? AND node = ?",
+                                      (self.context_name, self.derived, node.name))
+        self.store._wrote()
+
+# =====================================
+# --------------- MIXIN ---------------
+# =====================================
+
+class StoreMixin:
+    """ Provides SQLite-backed node storage to Network """
+
+    def __init__(self) -> None:
+        if type(self) is StoreMixin:
+            raise NotImplementedError("Mixins can't be instantiated.")
+
+    def use_sqlite_store(self, path: str, cache_size: int = 10000) -> NodeStore:
+        """ Moves the network's nodes and beliefs into a new SQLite database at path, keeping at
+            most cache_size unreferenced nodes in memory from then on. Cached closures are
+            limited to cache_size nodes too. Nodes held by inference and by materialized slots
+            stay in memory (see the module docstring). """
+        if self.node_store is not None:
+            raise StoreError("ERROR: The network already uses a node store.")
+        store = NodeStore(self, path, cache_size)
+        for node in self.nodes.values():
+            if isinstance(node, Variable):
+                store[node.name] = node
+        # Fillers before the nodes they fill, so that up cables can be written with each node
+        for node in self._nodes_fillers_first():
+            if not isinstance(node, Variable):
+                store[node.name] = node
+        for context in self.contexts.values():
+            self.attach_context(store, context)
+        store.commit()
+        self.nodes = store
+        self.node_store = store
+        self.rename_hooks.append(store.renamed)
+        # Retypes both by the wft parser and by define_term respecifying a term
+        self.sem_hierarchy.retype_hooks.append(store.retyped)
+        self.frame_index = {}
+        self.closure_cache.max_nodes = min(self.closure_cache.max_nodes, cache_size)
+        self.closure_cache.clear()
+        return store
+
+    def attach_context(self, store: NodeStore, context) -> None:
+        """ Moves a context's beliefs into the store. """
+        context.hyps = StoredNodeSet(store, context.name, False, context.hyps)
+        context.ders = StoredNodeSet(store, context.name, True, context.ders)
+
+    def commit_store(self) -> None:
+        """ Commits pending writes to the node store. """
+        if self.node_store is not None:
+            self.node_store.commit()
+
+    def _nodes_fillers_first(self) -> list:
+        ordered = []
+        placed = set()
+        def place(node):
+            if node in placed:
+                return
+            placed.add(node)
+            if isinstance(node, Molecular):
+                for fillers in node.frame.filler_set:
+                    for filler in fillers.nodes:
+                        place(filler)
+            ordered.append(node)
+        for node in list(self.nodes.values()):
+            place(node)
+        return ordered
@@ -1,4 +1,7 @@
+from contextlib import contextmanager
+from xml.sax.saxutils import escape, quoteattr
 from .Node import Molecular, MinMaxOpNode, Variable, Indefinite
+from .SNError import SNError
 
 # =====================================
 # --------- OPTIONAL IMPORTS ----------
@@ -27,6 +30,106 @@ try:
 except ModuleNotFoundError:
     has_ng = False
 
+# =====================================
+# ------------- SUBGRAPH --------------
+# =====================================
+
+DIRECTIONS = ("down", "up", "restriction", "dependency")
+
+class Subgraph:
+    """ The nodes within some number of arcs of a set of seed nodes, and the arcs among them.
+        Built by VisualizationMixin.subgraph, and accepted by the visualizers and exporters. """
+
+    def __init__(self, seeds: list, radius: int, slots, directions) -> None:
+        self.seeds = seeds
+        self.radius = radius
+        self.slots = slots # Names of the slots whose cables are followed, or None for all
+        self.directions = directions
+        self.distances = {} # Maps nodes to their number of arcs from the nearest seed
+
+    def __iter__(self):
+        return iter(self.distances)
+
+    def __len__(self) -> int:
+        return len(self.distances)
+
+    def __contains__(self, node) -> bool:
+        return node in self.distances
+
+    def edges(self, node):
+        """ Yields (target node, label) for each arc from a node of the subgraph to another. """
+        slots = self.slots if "down" in self.directions or "up" in self.directions else ()
+        for target, label in node_edges(node, slots, "restriction" in self.directions,
+                                         "dependency" in self.directions):
+            if target in self.distances:
+                yield target, label
+
+    def neighbours(self, node):
+        """ The nodes one arc away from a node, in the subgraph's directions. """
+        if "down" in self.directions:
+            for target, _ in node_edges(node, self.slots, False, False):
+                yield target
+        if "up" in self.directions:
+            for up_cable in node.up_cableset:
+                if self.slots is None or up_cable.slot.name in self.slots:
+                    yield up_cable.node
+        if "restriction" in self.directions or "dependency" in self.directions:
+            for target, _ in node_edges(node, (), "restriction" in self.directions,
+                                        "dependency" in self.directions):
+                yield target
+
+# =====================================
+# -------------- SUMMARY --------------
+# =====================================
+
+class CaseframeSummary:
+    """ Counts of how a network's caseframes, slots and semantic types are populated, kept up to
+        date as nodes are added and retyped, so that drawing the summary costs nothing per node. """
+
+    def __init__(self) -> None:
+        self.frame_nodes = {} # Maps caseframe names to their number of nodes
+        self.type_nodes = {} # Maps semantic type names to their number of nodes
+        self.cables = {} # Maps (caseframe, slot, filler type) names to their number of cables
+        self.max_fillers = {} # Maps (caseframe, slot) names to the most fillers of any one node
+        self.caseframe_types = {} # Maps caseframe names to the semantic type of their nodes
+
+    def add(self, node) -> None:
+        """ Counts a new node. """
+        type_name = node.sem_type.name
+        self.type_nodes[type_name] = self.type_nodes.get(type_name, 0) + 1
+        if not isinstance(node, Molecular):
+            return
+        caseframe = node.frame.caseframe
+        self.frame_nodes[caseframe.name] = self.frame_nodes.get(caseframe.name, 0) + 1
+        self.caseframe_types[caseframe.name] = caseframe.sem_type.name
+        for slot, fillers in zip(caseframe.slots, node.frame.filler_set):
+            for filler in fillers.nodes:
+                key = (caseframe.name, slot.name, filler.sem_type.name)
+                self.cables[key] = self.cables.get(key, 0) + 1
+            key = (caseframe.name, slot.name)
+            self.max_fillers[key] = max(self.max_fillers.get(key, 0), len(fillers))
+
+    def retype(self, node, old_type) -> None:
+        """ Moves a node's counts from its old semantic type to its new one. """
+        self._count(self.type_nodes, old_type.name, -1)
+        self._count(self.type_nodes, node.sem_type.name, 1)
+        for up_cable in node.up_cableset:
+            caseframe = up_cable.node.frame.caseframe.name
+            self._count(self.cables, (caseframe, up_cable.slot.name, old_type.name), -1)
+            self._count(self.cables, (caseframe, up_cable.slot.name, node.sem_type.name), 1)
+
+    def _count(self, counts: dict, key, change: int) -> None:
+        counts[key] = counts.get(key, 0) + change
+        if counts[key] <= 0:
+            del counts[key]
+
+    def edges(self):
+        """ Yields (caseframe, slot, filler type, cables, average fillers per node, most fillers
+            of any node) for each slot of each caseframe and type of node filling it. """
+        for (caseframe, slot, type_name), count in self.cables.items():
+            yield (caseframe, slot, type_name, count, count / self.frame_nodes[caseframe],
+                   self.max_fillers[(caseframe, slot)])
+
 # =====================================
 # -------------- MIXIN ----------------
 # =====================================
@@ -37,9 +140,104 @@ class VisualizationMixin:
     def __init__(self) -> None:
         if type(self) is VisualizationMixin:
             raise NotImplementedError("Mixins can't be instantiated.")
+        self.summary = CaseframeSummary()
+        # node_hooks and sem_hierarchy are defined by mixins which are initialized first
+        self.node_hooks.append(self.summary.add)
+        self.sem_hierarchy.retype_hooks.append(self.summary.retype)
+
+    def display_summary(self) -> None:
+        """ Visual graph of caseframes and semantic types, with an arc for each slot from a
+            caseframe to the types of node filling it, labelled with cable counts and fan-out. """
+        if not has_nx:
+            print("In order to use this function, you must pip install networkx")
+            return
+        if not has_mpl:
+            print("In order to use this function, you must pip install matplotlib")
+            return
+
+        G = nx.DiGraph()
+        node_labels = {}
+        edge_labels = {}
+        for vertex, label in self._summary_vertices():
+            G.add_node(vertex)
+            node_labels[vertex] = label
+        for caseframe, type_name, label in self._summary_arcs():
+            source, target = "frame " + caseframe, "type " + type_name
+            if (source, target) in edge_labels:
+                edge_labels[(source, target)] += "\n" + label
+            else:
+                G.add_edge(source, target)
+                edge_labels[(source, target)] = label
+
+        pos = nx.circular_layout(G)
+        nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels, font_color='black')
+        nx.draw_networkx(G, pos, labels=node_labels, node_size=800, node_color='grey', alpha=0.8)
+        plt.subplots_adjust(left=0.0, right=1.0, top=1.0, bottom=0.0)
+        plt.show()
 
-    def display_graph(self) -> None:
-        """ Interactive visual graph opens in new window. """
+    def export_summary(self, file) -> None:
+        """ Writes the summary drawn by display_summary in the Graphviz DOT format to a file name
+            or an open text file. """
+        with _open_for_writing(file) as out:
+            out.write("digraph summary {\n")
+            for vertex, label in self._summary_vertices():
+                shape = "box" if vertex.startswith("frame ") else "ellipse"
+                out.write("  {} [label={}, shape={}];\n".format(dot_id(vertex), dot_id(label), shape))
+            for caseframe, type_name, label in self._summary_arcs():
+                out.write("  {} -> {} [label={}];\n".format(
+                    dot_id("frame " + caseframe), dot_id("type " + type_name), dot_id(label)))
+            out.write("}\n")
+
+    def _summary_vertices(self):
+        """ Yields (vertex id, label) for each populated caseframe and semantic type. """
+        summary = self.summary
+        for caseframe, count in summary.frame_nodes.items():
+            yield "frame " + caseframe, "{}: {} ({} nodes)".format(caseframe, summary.caseframe_types[caseframe], count)
+        for type_name, count in summary.type_nodes.items():
+            yield "type " + type_name, "{} ({} nodes)".format(type_name, count)
+
+    def _summary_arcs(self):
+        """ Yields (caseframe, filler type, label) for each arc of the summary. """
+        for caseframe, slot, type_name, count, mean, most in self.summary.edges():
+            yield caseframe, type_name, "{} x{}, {:.1f} per node (max {})".format(slot, count, mean, most)
+
+    def subgraph(self, seeds: list, radius: int = 1, slots: list = None, directions=DIRECTIONS) -> Subgraph:
+        """ Returns the nodes within radius arcs of the named seed nodes, found by following only
+            the given directions from each node: down its cables, up its up cables, or to its
+            restrictions or dependencies. slots limits the cables followed to the named slots. """
+        for direction in directions:
+            if direction not in DIRECTIONS:
+                raise SNError("ERROR: Unknown direction \"{}\". Use one of {}.".format(direction, ", ".join(DIRECTIONS)))
+        if slots is not None:
+            for slot_name in slots:
+                if slot_name not in self.slots:
+                    raise SNError("ERROR: Slot \"{}\" does not exist.".format(slot_name))
+            slots = set(slots)
+        seed_nodes = []
+        for name in seeds:
+            if name not in self.nodes:
+                raise SNError("ERROR: Term \"{}\" does not exist.".format(name))
+            seed_nodes.append(self.nodes[name])
+
+        subgraph = Subgraph(seed_nodes, radius, slots, tuple(directions))
+        frontier = []
+        for node in seed_nodes:
+            if node not in subgraph.distances:
+                subgraph.distances[node] = 0
+                frontier.append(node)
+        for distance in range(1, radius + 1):
+            next_frontier = []
+            for node in frontier:
+                for neighbour in subgraph.neighbours(node):
+                    if neighbour not in subgraph.distances:
+                        subgraph.distances[neighbour] = distance
+                        next_frontier.append(neighbour)
+            frontier = next_frontier
+        return subgraph
+
+    def display_graph(self, subgraph: Subgraph = None) -> None:
+        """ Interactive visual graph opens in new window. If a subgraph is given, only its nodes
+            and arcs are drawn. """
         # Ensure proper packages available and imported
         if not has_nx:
             print("In order to use this function, you must pip install networkx")
@@ -56,7 +254,7 @@ class VisualizationMixin:
         G = nx.DiGraph()
 
         # Draws each node in graph
-        for node in self.nodes.values():
+        for node in (self.nodes.values() if subgraph is None else subgraph):
             node_name = node.name
 
             # Name followed by ! if asserted in the current context
@@ -65,62 +263,25 @@ class VisualizationMixin:
             node_labels[node_name] = node_name
             G.add_node(node_name)
 
-            # Draws edges to other nodes to which node has arcs formed by slots (cables)
-            if isinstance(node, Molecular):
-                for i in range(len(node.frame.filler_set)):
-                    fillers = node.frame.filler_set[i]
-                    name = node.frame.caseframe.slots[i].name
-
-                    # Prints min and max with arc name
-                    if isinstance(node, MinMaxOpNode) and name in ["threshargs", "andorargs"]:
-                        name += " ({}, {})".format(node.min, node.max)
-
-                    # Nor wire (single down cable) displayed as not
-                    if name == "nor" and len(fillers) == 1:
-                        name = "not"
-
-                    for filler in fillers.nodes:
-                        filler_name = filler.name
-                        if filler in self.current_context:
-                            filler_name += '!'
-
-                        # If multiple down arcs go from one node to another, display them as one
-                        # edge with comma-separated arc names
-                        if (node_name, filler_name) in edge_labels:
-                            edge_labels[(node_name, filler_name)] += ", " + name
-                        else:
-                            G.add_edge(node_name, filler_name)
-                            edge_labels[(node_name, filler_name)] = name
-
-            # Draws edges to other nodes to which node has arcs formed by restrictions
-            if isinstance(node, Variable):
-                for restriction_node in node.restriction_set:
-                    restriction_name = restriction_node.name
-                    if restriction_node in self.current_context:
-                        restriction_name += '!'
-                    if (node_name, restriction_name) in edge_labels:
-                        edge_labels[(node_name, restriction_name)] += ", restriction"
-                    else:
-                        G.add_edge(node_name, restriction_name)
-                        edge_labels[(node_name, restriction_name)] = "restriction"
-
-                # Draws edges to other nodes to which node has arcs formed by dependencies
-                if isinstance(node, Indefinite):
-                    for dependency_node in node.dependency_set:
-                        dependency_name = dependency_node.name
-                        if dependency_node in self.current_context:
-                            dependency_name += '!'
-                        if (node_name, dependency_name) in edge_labels:
-                            edge_labels[(node_name, dependency_name)] += ", dependency"
-                        else:
-                            G.add_edge(node_name, dependency_name)
-                            edge_labels[(node_name, dependency_name)] = "dependency"
+            # Draws edges for the node's down cables, restrictions and dependencies
+            for target, name in (node_edges(node) if subgraph is None else subgraph.edges(node)):
+                target_name = target.name
+                if target in self.current_context:
+                    target_name += '!'
+
+                # If multiple down arcs go from one node to another, display them as one
+                # edge with comma-separated arc names
+                if (node_name, target_name) in edge_labels:
+                    edge_labels[(node_name, target_name)] += ", " + name
+                else:
+                    G.add_edge(node_name, target_name)
+                    edge_labels[(node_name, target_name)] = name
 
         # Layout on which to draw nodes
         pos = nx.circular_layout(G)
 
         # Draggable nodes in graph
-        if has_ng and self.nodes != {}:
+        if has_ng and len(G) > 0:
             # This is a buggy module.
             # If you want adjustable graphs, you have to do an assignment for some reason
             _ = ng.InteractiveGraph(G, pos, node_size=10, node_label_font_size=12.0, node_color='grey', alpha=0.8,
@@ -134,69 +295,138 @@ class VisualizationMixin:
         plt.subplots_adjust(left=0.0, right=1.0, top=1.0, bottom=0.0)
         plt.show()
 
-    def export_graph(self, file_name: str = "network") -> None:
-        """ Generates network.dot graphviz representation. """
-        # Ensure proper packages available and imported
-        if not has_nx:
-            print("In order to use this function, you must pip install networkx")
-            return
-        if not has_pydot:
-            print("In order to use this function, you must pip install pydot")
-
-        # Used to store the labels for nodes
-        node_labels = {}
-
-        # Stores graph variable
-        G = nx.MultiDiGraph()
+    def export_graph(self, file_name: str = "network", subgraph: Subgraph = None) -> None:
+        """ Generates network.dot graphviz representation, of the whole network or of a subgraph. """
+        self.export_dot(file_name + ".dot", nodes=subgraph)
 
-        # Draws each node in graph
-        for node in self.nodes.values():
-            node_name = node.name
-
-            # Name followed by ! if asserted in the current context
-            if node in self.current_context:
-                node_name += '!'
-            node_labels[node_name] = node_name
-            G.add_node(node_name)
+        # Print message to confirm graph exported
+        if self.verbose:
+            print("Graph exported to {}.dot".format(file_name))
+
+    def export_dot(self, file, nodes=None, context: str = None, caseframes=None) -> None:
+        """ Writes the network, or the nodes selected by the filters, in the Graphviz DOT format
+            to a file name or an open text file. See _selected_nodes for the filters; nodes may
+            also be a Subgraph, in which case only its arcs are written. """
+        with _open_for_writing(file) as out:
+            out.write("digraph network {\n")
+            for node, asserted, edges in self._export_nodes(nodes, context, caseframes):
+                out.write("  {} [label={}];\n".format(dot_id(node.name), dot_id(node.name + ('!' if asserted else ''))))
+                for target, label in edges:
+                    out.write("  {} -> {} [label={}];\n".format(dot_id(node.name), dot_id(target.name), dot_id(label)))
+            out.write("}\n")
+
+    def export_graphml(self, file, nodes=None, context: str = None, caseframes=None) -> None:
+        """ Writes the network, or the nodes selected by the filters, in the GraphML format
+            to a file name or an open text file. Filters are as for export_dot. """
+        with _open_for_writing(file) as out:
+            out.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                      '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+                      '  <key id="type" for="node" attr.name="type" attr.type="string"/>\n'
+                      '  <key id="sem_type" for="node" attr.name="sem_type" attr.type="string"/>\n'
+                      '  <key id="asserted" for="node" attr.name="asserted" attr.type="boolean"/>\n'
+                      '  <key id="label" for="edge" attr.name="label" attr.type="string"/>\n'
+                      '  <graph id="network" edgedefault="directed">\n')
+            for node, asserted, edges in self._export_nodes(nodes, context, caseframes):
+                out.write('    <node id={}><data key="type">{}</data><data key="sem_type">{}</data>'
+                          '<data key="asserted">{}</data></node>\n'.format(
+                              quoteattr(node.name), type(node).__name__, escape(node.sem_type.name),
+                              'true' if asserted else 'false'))
+                for target, label in edges:
+                    out.write('    <edge source={} target={}><data key="label">{}</data></edge>\n'.format(
+                        quoteattr(node.name), quoteattr(target.name), escape(label)))
+            out.write('  </graph>\n</graphml>\n')
+
+    def _export_nodes(self, nodes, context_name, caseframes):
+        """ Returns an iterator of (node, asserted, edges) for each selected node, then for each
+            node outside the selection which a selected node has an edge to, so that every edge
+            has both ends. Without filters, nodes are streamed and no node is kept in memory. """
+        context = self.current_context if context_name is None else self.contexts.get(context_name)
+        if context is None:
+            raise SNError("ERROR: Context \"{}\" does not exist.".format(context_name))
+        if caseframes is not None:
+            for name in caseframes:
+                if name not in self.caseframes:
+                    raise SNError("ERROR: Caseframe \"{}\" does not exist.".format(name))
+        filtered = nodes is not None or context_name is not None or caseframes is not None
+        selected = self._selected_nodes(nodes, context_name, caseframes)
+
+        if isinstance(nodes, Subgraph):
+            # A subgraph's arcs never leave it
+            return ((node, context.holds(node), list(nodes.edges(node))) for node in selected)
+
+        def generate():
+            names = set() # Names of the selected nodes written so far
+            outside = {} # Names of edge targets which may be outside the selection, in order
+            for node in selected:
+                edges = list(node_edges(node))
+                if filtered:
+                    names.add(node.name)
+                    outside.pop(node.name, None)
+                    for target, _ in edges:
+                        if target.name not in names:
+                            outside[target.name] = None
+                yield node, context.holds(node), edges
+            for name in outside:
+                if name not in names:
+                    node = self.nodes[name]
+                    yield node, context.holds(node), []
+        return generate()
+
+    def _selected_nodes(self, nodes, context_name, caseframes):
+        """ The nodes to export: those in nodes (node objects or names) if given, which are
+            asserted in the named context if given, and which are molecular nodes of one of the
+            named caseframes if given. """
+        selected = self.nodes.values() if nodes is None else \
+                   (self.nodes[node] if isinstance(node, str) else node for node in nodes)
+        if context_name is not None:
+            context = self.contexts[context_name]
+            selected = (node for node in selected if context.holds(node))
+        if caseframes is not None:
+            caseframes = set(self.caseframes[name] for name in caseframes)
+            selected = (node for node in selected if isinstance(node, Molecular) and node.frame.caseframe in caseframes)
+        return selected
 
-            # Draws edges to other nodes to which node has arcs formed by slots (cables)
-            if isinstance(node, Molecular):
-                for i in range(len(node.frame.filler_set)):
-                    fillers = node.frame.filler_set[i]
-                    name = node.frame.caseframe.slots[i].name
-
-                    # Prints min and max with arc name
-                    if isinstance(node, MinMaxOpNode) and name in ["threshargs", "andorargs"]:
-                        name += " ({}, {})".format(node.min, node.max)
-
-                    # Nor wire (single down cable) displayed as not
-                    if name == "nor" and len(fillers) == 1:
-                        name = "not"
-
-                    for filler in fillers.nodes:
-                        filler_name = filler.name
-                        if filler in self.current_context:
-                            filler_name += '!'
-                        G.add_edge(node_name, filler_name, label=name)
-
-            # Draws edges to other nodes to which node has arcs formed by restrictions
-            if isinstance(node, Variable):
-                for restriction_node in node.restriction_set:
-                    restriction_name = restriction_node.name
-                    if restriction_node in self.current_context:
-                        restriction_name += '!'
-                    G.add_edge(node_name, restriction_name, label="restriction")
-
-                # Draws edges to other nodes to which node has arcs formed by dependencies
-                if isinstance(node, Indefinite):
-                    for dependency_node in node.dependency_set:
-                        dependency_name = dependency_node.name
-                        if dependency_node in self.current_context:
-                            dependency_name += '!'
-                        G.add_edge(node_name, dependency_name, label="dependency")
-
-        # Writes graph to network.dot file
-        nx.nx_pydot.write_dot(G, file_name + ".dot")
+# =====================================
+# ------------- HELPERS ---------------
+# =====================================
 
-        # Print message to confirm graph exported
-        print("Graph exported to {}.dot".format(file_name))
+def node_edges(node, slots=None, restrictions: bool = True, dependencies: bool = True):
+    """ Yields (target node, label) for each arc leaving a node: its down cables (only those of
+        the named slots, if slots is given), restrictions and dependencies. """
+    if isinstance(node, Molecular):
+        for i in range(len(node.frame.filler_set)):
+            fillers = node.frame.filler_set[i]
+            name = node.frame.caseframe.slots[i].name
+            if slots is not None and name not in slots:
+                continue
+
+            # Prints min and max with arc name
+            if isinstance(node, MinMaxOpNode) and name in ["threshargs", "andorargs"]:
+                name += " ({}, {})".format(node.min, node.max)
+
+            # Nor wire (single down cable) displayed as not
+            if name == "nor" and len(fillers) == 1:
+                name = "not"
+
+            for filler in fillers.nodes:
+                yield filler, name
+    if isinstance(node, Variable):
+        if restrictions:
+            for restriction_node in node.restriction_set:
+                yield restriction_node, "restriction"
+        if dependencies and isinstance(node, Indefinite):
+            for dependency_node in node.dependency_set:
+                yield dependency_node, "dependency"
+
+def dot_id(text: str) -> str:
+    """ A quoted DOT identifier. """
+    return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+@contextmanager
+def _open_for_writing(file):
+    """ Opens a file name for writing, or passes an open file through without closing it. """
+    if isinstance(file, str):
+        with open(file, 'w', encoding='utf-8') as out:
+            yield out
+    else:
+        yield file
@@ -5,6 +5,7 @@ use them to build Python_SNePS paths. """
 # -------------- IMPORTS --------------
 # =====================================
 
+from threading import Lock
 from . import PathLex
 from ..ply import *
 from ..Network import *
@@ -22,6 +23,8 @@ class SNePSPathError(SNError):
 current_network = None
 tokens = PathLex.tokens
 producedPath = None
+parser = None # Built on first use
+parsing = Lock() # The parser, lexer and the globals above are shared, so one path is parsed at a time
 
 # =====================================
 # -------------- RULES ----------------
@@ -79,12 +82,12 @@ def p_KPath1(p):
     '''
     KPath :             KPlus LParen Path RParen
     '''
-    p[0] = KPlusPath(p[3])
+    p[0] = KPlusPath(p[3], current_network)
 def p_KPath2(p):
     '''
     KPath :             KStar LParen Path RParen
     '''
-    p[0] = KStarPath(p[3])
+    p[0] = KStarPath(p[3], current_network)
 
 # ==============================================================================
 
@@ -107,7 +110,7 @@ def p_MultiPath3(p):
     '''
     MultiPath :         And LParen Paths RParen
     '''
-    p[0] = AndPaths(p[3])
+    p[0] = AndPaths(p[3], current_network)
 
 # ==============================================================================
 
@@ -146,20 +149,23 @@ def path_parser(path, network):
     """ Uses lex and yacc to produce a Path instance from a string. """
 
     global current_network
-    current_network = network
-    path_parser = yacc.yacc()
-    if path != '':
-        try:
-            # Parse import as path
-            path_parser.parse(path, lexer=PathLex.path_lexer)
-
-            # Returns the produced path, with a string representation
-            global producedPath
-            return producedPath
-
-        except SNError as e:
-            if type(e) is not SNePSPathError:
-                print("PARSING FAILED:\n\t", end='')
-            raise SNePSPathError(e)
-    else:
-        return None
+    global parser
+    with parsing:
+        current_network = network
+        if parser is None:
+            parser = yacc.yacc(debug=False)
+        if path != '':
+            try:
+                # Parse import as path
+                parser.parse(path, lexer=PathLex.path_lexer)
+
+                # Returns the produced path, with a string representation
+                global producedPath
+                return producedPath
+
+            except SNError as e:
+                if type(e) is not SNePSPathError:
+                    print("PARSING FAILED:\n\t", end='')
+                raise SNePSPathError(e)
+        else:
+            return None
@@ -28,6 +28,7 @@ current_network = None
 variables = {}
 top_wft = None
 pause = 0
+parser = None # Built on first use
 
 # =====================================
 # -------------- RULES ----------------
@@ -162,7 +163,7 @@ def p_EveryStmt(p):
         raise SNePSVarError("Variable {} is not arbefinite!".format(arb.name))
 
     # If this node already exists, return it
-    for node in current_network.nodes.values():
+    for node in current_network.variable_nodes:
         if isinstance(node, Arbitrary) and node == arb:
             pause -= 1
             p[0] = node
@@ -190,7 +191,7 @@ def p_SomeStmt(p):
         raise SNePSVarError("Variable {} is not indefinite!".format(ind.name))
 
     # If this node already exists, return it
-    for node in current_network.nodes.values():
+    for node in current_network.variable_nodes:
         if isinstance(node, Indefinite) and node == ind:
             pause -= 1
             p[0] = node
@@ -223,7 +224,7 @@ def p_Var(p):
     p[0] = variables[p[1]]
 
     # Pausing stops redundant creation of nodes when this wft is already in the network
-    for node in current_network.nodes.values():
+    for node in current_network.variable_nodes:
         if isinstance(node, Variable) and node == p[0]:
             pause += 1
 
@@ -371,7 +372,7 @@ def p_AtomicName(p):
         p[0] = variables[p[1]]
     else:
         if pause == 0:
-            current_network.define_term(p[1])
+            current_network._define_term(p[1])
         p[0] = current_network.find_term(p[1])
 
 # ==============================================================================
@@ -425,14 +426,14 @@ def build_molecular(caseframe_name, filler_set):
     frame = Frame(caseframe, filler_set)
 
     # Checks if a node with this frame already exists
-    for node in current_network.nodes.values():
+    for node in current_network.nodes_with_frame(frame):
         if node.has_frame(frame):
-            return node
+            return current_network.reuse_node(node)
 
     # Builds, stores and returns a new node with this frame
     wftNode = Molecular(frame)
     if pause == 0:
-        current_network.nodes[wftNode.name] = wftNode
+        current_network.add_node(wftNode)
     return wftNode
 
 def build_thresh (caseframe_name, filler_set, min, max):
@@ -451,14 +452,14 @@ def build_thresh (caseframe_name, filler_set, min, max):
     frame = Frame(caseframe, filler_set)
 
     # Checks if a node with this frame and min, max pair already exists
-    for node in current_network.nodes.values():
+    for node in current_network.nodes_with_frame(frame):
         if node.has_frame(frame) and node.has_min_max(min, max):
-            return node
+            return current_network.reuse_node(node)
 
     # Builds, stores and returns a new node with this frame, min, and max
     wftNode = ThreshNode(frame, min, max)
     if pause == 0:
-        current_network.nodes[wftNode.name] = wftNode
+        current_network.add_node(wftNode)
     return wftNode
 
 def build_andor (caseframe_name, filler_set, min, max):
@@ -485,14 +486,14 @@ def build_andor (caseframe_name, filler_set, min, max):
     frame = Frame(caseframe, filler_set)
 
     # Checks if a node with this frame and min, max pair already exists
-    for node in current_network.nodes.values():
+    for node in current_network.nodes_with_frame(frame):
         if node.has_frame(frame) and node.has_min_max(min, max):
-            return node
+            return current_network.reuse_node(node)
 
     # Builds, stores and returns a new node with this frame, min, and max
     wftNode = AndOrNode(frame, min, max)
     if pause == 0:
-        current_network.nodes[wftNode.name] = wftNode
+        current_network.add_node(wftNode)
     return wftNode
 
 def build_impl(filler_set, bound):
@@ -504,14 +505,14 @@ def build_impl(filler_set, bound):
     frame = Frame(caseframe, filler_set)
 
     # Checks if a node with this frame and bound already exists
-    for node in current_network.nodes.values():
+    for node in current_network.nodes_with_frame(frame):
         if node.has_frame(frame) and node.has_bound(bound):
-            return node
+            return current_network.reuse_node(node)
 
     # Builds, stores and returns a new node with this frame and bound
     wftNode = ImplNode(frame, bound)
     if pause == 0:
-        current_network.nodes[wftNode.name] = wftNode
+        current_network.add_node(wftNode)
     return wftNode
 
 def new_restriction(variable, restriction):
@@ -532,23 +533,30 @@ def new_restriction(variable, restriction):
 # ------------ PARSER FN --------------
 # =====================================
 
-def wft_parser(wft: str, network):
-    """ Uses lex and yacc to produce a Node instance from a string """
+def wft_parser(wft: str, network, raise_errors: bool = False):
+    """ Uses lex and yacc to produce a Node instance from a string.
+        Errors are printed (and None returned), or raised if raise_errors is set. """
 
     global current_network
+    global parser
+    global variables
+    global top_wft
+    global pause
     current_network = network
 
-    wft_parser = yacc.yacc()
+    if parser is None:
+        parser = yacc.yacc(debug=False)
     if wft != '':
+        # A previous failed parse may have left these behind
+        top_wft = None
+        pause = 0
         try:
             # Store variables in array indexed by names
-            global variables
             variables = get_vars(wft, network)
 
             # Parse and store top-level wft created by string
             # (as opposed to sub-wfts it might create)
-            wft_parser.parse(wft, lexer=WftLex.wft_lexer)
-            global top_wft
+            parser.parse(wft, lexer=WftLex.wft_lexer)
             ret_top_wft = top_wft
 
             # Reset globals and return the wft
@@ -558,6 +566,11 @@ def wft_parser(wft: str, network):
 
         # Error messages
         except SNError as e:
+            variables = {}
+            if raise_errors:
+                raise
+            if not network.verbose:
+                return None
             if type(e) is not SNePSWftError and type(e) is not SNePSVarError:
                 print("PARSING FAILED:\n\t", end='')
             else:
@@ -33,6 +33,7 @@ current_network = None
 variables = {}
 var_names = {}
 incomplete_vars = set()
+var_parser = None # Built on first use
 
 # =====================================
 # -------------- RULES ----------------
@@ -341,7 +342,7 @@ def p_EveryStmt(p):
 
     # Checks if node already exists in network
     else:
-        for node in current_network.nodes.values():
+        for node in current_network.variable_nodes:
             if isinstance(node, Arbitrary) and node == new_var:
                 new_var = node
                 break
@@ -399,7 +400,7 @@ def p_SomeStmt(p):
 
     # Checks if node already exists in network
     else:
-        for node in current_network.nodes.values():
+        for node in current_network.variable_nodes:
             if isinstance(node, Indefinite) and node == new_var:
                 new_var = node
                 break
@@ -542,16 +543,23 @@ def get_vars(wft: str, network):
         then returns a dictionary in which variable names correspond to their nodes. """
 
     global current_network
+    global var_parser
     current_network = network
-    var_parser = yacc.yacc()
+    if var_parser is None:
+        var_parser = yacc.yacc(debug=False)
+
+    # Reset globals, which a previous failed parse may have left behind
+    global variables
+    global var_names
+    global incomplete_vars
+    variables = {}
+    var_names = {}
+    incomplete_vars = set()
 
     # First pass on wft string
     var_parser.parse(wft, lexer=WftLex.wft_lexer)
 
     # Reset globals
-    global variables
-    global var_names
-    global incomplete_vars
     ret_incomplete = incomplete_vars
     ret_variables = variables
     variables = {}
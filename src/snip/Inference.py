@@ -11,6 +11,9 @@ from ..sneps.Network import *
 from ..sneps.SemanticType import SemError
 from ..sneps.Node import Node, ImplNode, AndOrNode
 from .SNIPError import SNIPError
+from .Propagation import Propagator
+from .Search import Budget, CancellationToken, Answer, QueryResult, solve
+from .Unify import Matcher, has_variables
 
 # =====================================
 # -------------- GLOBALS --------------
@@ -30,9 +33,12 @@ class Inference:
         written so far serve as a demonstration of what inference can be performed
         with a more robust inference module in the future. """
 
-    def __init__(self, net: Network):
+    def __init__(self, net: Network, budget: Budget = None):
         self.net = net
         self.debug = False
+        self.budget = budget # Default limits for every query (None is unlimited)
+        self.propagators = {} # Maps contexts to their Propagator
+        self.matcher = Matcher.of(net) # Discrimination tree over the network's molecular nodes, shared per network
 
     def toggle_debug(self, debug: bool = None):
         """ In debug mode, SNIP prints the intermediate knowledge it uses while
@@ -43,74 +49,136 @@ class Inference:
             self.debug = not self.debug
 
     def _print_wft(self, wft: Node):
-        print("\tI know that {}! : {}".format(wft.name, wft))
+        if self.net.verbose:
+            print("\tI know that {}! : {}".format(wft.name, wft))
 
-    def ask(self, wft_str: str):
+    def ask(self, wft_str: str, budget: Budget = None):
         """ Checks if either (or both) a statement and the rejection of that statement
             (not(expr)) is asserted or can be derived in the current context. """
         # Positive expression
-        results = self.ask_if(wft_str, complete_ask=True)
+        results = self.ask_if(wft_str, complete_ask=True, budget=budget)
         # Negative expression
-        not_results = self.ask_if_not(wft_str, complete_ask=True)
+        not_results = self.ask_if_not(wft_str, complete_ask=True, budget=budget)
 
         # Combine, print, and return results
         results.update(not_results)
+        if not self.net.verbose:
+            return results
         if results == set():
             print("{}!")
         else:
             print(results, "!", sep='')
         return results
 
-    def ask_if(self, wft_str: str, complete_ask: bool = False):
+    def ask_if(self, wft_str: str, complete_ask: bool = False, budget: Budget = None):
         """ Checks if a positive statement is asserted or can be derived in the
             current context. """
-        print("Checking if {} . . .".format(wft_str))
+        if self.net.verbose:
+            print("Checking if {} . . .".format(wft_str))
+
+        result = self.query(wft_str, budget)
+        if result is None:
+            return set()
+
+        # Prints/returns results
+        results = set()
+        if result.answer is Answer.TRUE:
+            results.add(result.wft)
+        elif result.answer is Answer.UNKNOWN and self.net.verbose:
+            print("Unknown: search stopped early ({})".format(result.reason))
+        if not complete_ask and self.net.verbose:
+            print("{}!") if results == set() else print(results, "!", sep='')
+        return results
+
+    def ask_if_not(self, wft_str: str, complete_ask: bool = False, budget: Budget = None):
+        """ Gets the rejection of the provided term (not(expr)) and checks if it
+            is asserted or can be derived in the current context. """
+        return self.ask_if("not({})".format(wft_str), complete_ask, budget)
+
+    def query(self, wft_str: str, budget: Budget = None) -> QueryResult:
+        """ Checks if a positive statement is asserted or can be derived in the current
+            context, within the given budget (or the Inference's default budget).
+            Returns a QueryResult whose answer is TRUE, FALSE, or UNKNOWN if the budget
+            ran out, or None if the statement could not be parsed. """
 
         # Parse the statement
-        wft = wft_parser(wft_str, self.net)
+        wft = self.net.build_wft(wft_str)
         if wft is None:
-            return set()
+            return None
 
         # Ensure the stament is a proposition
         try:
             self.net.sem_hierarchy.assert_proposition(wft)
         except SemError as e:
-            print(e)
-            return set()
+            if self.net.verbose:
+                print(e)
+            return None
 
-        # Checks if statement true and prints/returns results
-        true = self._ask_if(wft)
-        results = set()
-        if true:
-            results.add(wft)
-        if not complete_ask:
-            print("{}!") if results == set() else print(results, "!", sep='')
-        return results
+        return solve(wft, self._goal, self.budget if budget is None else budget)
 
-    def ask_if_not(self, wft_str: str, complete_ask: bool = False):
-        """ Gets the rejection of the provided term (not(expr)) and checks if it
-            is asserted or can be derived in the current context. """
-        return self.ask_if("not({})".format(wft_str), complete_ask)
+    def unifiers(self, wft_str: str):
+        """ Returns a list of (node, substitution) pairs, one for each node in the network which
+            unifies with the given term. Substitutions map variable names to nodes, and only bind
+            variables to terms for which instances of the variable's restrictions are believed. """
+        wft = self.net.build_wft(wft_str)
+        if wft is None:
+            return []
+        context = self.net.current_context
+        return [(node, {var.name: value for var, value in subst.items()})
+                for node, subst, _ in self.matcher.match(wft, context.holds)]
+
+    def propagate(self):
+        """ Runs unit propagation over the believed andor and thresh nodes of the
+            current context, and returns the set of newly derived beliefs. """
+        derived = self._propagator().sync()
+        if self.debug:
+            for wft in derived:
+                self._print_wft(wft)
+        return derived
 
-    def _ask_if(self, wft: Node, ignore=None):
+    def _propagator(self) -> Propagator:
+        """ Returns the propagator for the current context, creating it if necessary. """
+        context = self.net.current_context
+        if context not in self.propagators:
+            self.propagators[context] = Propagator(self.net, context)
+        return self.propagators[context]
+
+    def _ask_if(self, wft: Node, budget: Budget = None):
         """ Checks if provided node is asserted or can be derived via one of the inference methods. """
+        return solve(wft, self._goal, self.budget if budget is None else budget).answer is Answer.TRUE
+
+    def _goal(self, wft: Node, ignore):
+        """ Generator which tries each inference method on the provided node.
+            Yields (subgoal, ignore) pairs and is sent back whether each subgoal was derived. """
 
-        # Prevents recursion
-        if ignore is None:
-             ignore = set()
+        # Prevents cycles
         if wft in ignore:
             return False
         ignore.add(wft)
 
+        # Beliefs asserted in the context, or derived in any context from hypotheses
+        # this context shares, need no further inference. They are not copied into the
+        # context's derived beliefs, where nothing would remove them once their support goes.
+        context = self.net.current_context
+        if context.holds(wft):
+            return True
+
         # Check using different inference methods (many are currently missing)
-        derived = wft in self.net.current_context or \
-                  self._slot_based(wft, ignore.copy()) or \
-                  self._by_binary_op(wft, ignore.copy()) or \
-                  self._by_nary_op(wft, ignore.copy())
+        derived = self._by_propagation(wft) or \
+                  self._slot_based(wft, ignore.copy())
+        if not derived:
+            premises = self._by_instantiation(wft)
+            if not premises:
+                premises = yield from self._by_binary_op(wft, ignore)
+            if not premises:
+                premises = yield from self._by_nary_op(wft, ignore)
+            if premises:
+                self.net.justify(wft, premises)
+                derived = True
 
         # Assert derived propositions
         if derived:
-            self.net.current_context.add_derived(wft)
+            context.add_derived(wft)
 
             # Prints intermediate knowledge in debug mode
             if self.debug:
@@ -118,6 +186,25 @@ class Inference:
 
         return derived
 
+    def _by_propagation(self, wft: Node):
+        """ Unit propagation over believed andor and thresh nodes.
+        Returns true if the wft is forced true by the current context's beliefs. """
+        propagator = self._propagator()
+        propagator.sync()
+        return propagator.value(wft) is True
+
+    def _by_instantiation(self, wft: Node):
+        """ Instantiates believed generic terms, e.g. Isa(every(x, Isa(x, Dog)), Animal).
+        Returns the generic term and the believed restriction instances as premises if a
+        generic term unifies with the wft and the restrictions on its variables hold. """
+        if has_variables(wft):
+            return None
+        context = self.net.current_context
+        for generic, subst, support in self.matcher.match(wft, context.holds, generic_only=True):
+            if context.holds(generic):
+                return [generic] + support
+        return None
+
     def _slot_based(self, wft: Node, ignore):
         """ Slot based inference. """
 
@@ -138,8 +225,9 @@ class Inference:
 
     def _by_binary_op(self, wft: Node, ignore):
         """ Follows up cq arc to a binary operator
-        Returns true if the binary operator itself is asserted and
-        the bound is hit by the number of asserted antecedents. """
+        Returns the premises used (the binary operator and its true antecedents) if the
+        binary operator itself is asserted and the bound is hit by the number of
+        asserted antecedents. """
 
         implNodes = wft.follow_up_cable(self.net.slots['cq'])
 
@@ -147,21 +235,21 @@ class Inference:
         for impl in implNodes:
 
             # Check if the binary operation wft is asserted
-            if self._ask_if(impl, ignore.copy()):
-                bound = impl.bound
+            if (yield impl, ignore.copy()):
+                premises = [impl]
 
-                # Only return true if enough of the antecedents are true
+                # Only return premises if enough of the antecedents are true
                 for ant in impl.antecedents():
-                    if self._ask_if(ant, ignore.copy()):
-                        bound -= 1
-                        if bound < 1:
-                            return True
+                    if (yield ant, ignore.copy()):
+                        premises.append(ant)
+                        if len(premises) > impl.bound:
+                            return premises
 
-        return False
+        return None
 
     def _by_nary_op(self, wft: Node, ignore):
         """ Follows up andor and thresh arcs to a minmax (nary) operator
-        Returns true if the nary operator itself is asserted and
+        Returns the nary operator as the only premise if it is asserted and
         the given wft is needed to fall between the min and max values.
 
         Currently a partial, poor implementation.
@@ -175,8 +263,8 @@ class Inference:
 
         # Check if wft node asserted and given wft is needed to fall between the min and max values
         for andOr in andOrNodes:
-            if self._ask_if(andOr, ignore.copy()) and andOr.min >= andOr.num_constituents():
-                return True
+            if andOr.min >= andOr.num_constituents() and (yield andOr, ignore.copy()):
+                return [andOr]
 
         # For thresh caseframe (also: iff, etc.)
         threshNodes = set()
@@ -187,7 +275,7 @@ class Inference:
 
         # Check if wft node asserted and given wft is needed to fall outside the min and max values
         for thresh in threshNodes:
-            if self._ask_if(thresh, ignore.copy()) and thresh.min >= thresh.num_constituents():
-                return True
+            if thresh.min >= thresh.num_constituents() and (yield thresh, ignore.copy()):
+                return [thresh]
 
-        return False
+        return None
@@ -0,0 +1,232 @@
+"""
+Unit propagation for andor and thresh nodes, in the style of a SAT solver.
+Every believed AndOrNode/ThreshNode is a cardinality constraint on its arguments.
+Arguments watch the constraints they appear in, so deciding a node only revisits
+the constraints on that node's watch list.
+"""
+
+# =====================================
+# -------------- IMPORTS --------------
+# =====================================
+
+from collections import deque
+from weakref import WeakMethod
+from ..sneps.Node import Node, AndOrNode, ThreshNode, MinMaxOpNode
+from .SNIPError import SNIPError
+
+# =====================================
+# -------------- GLOBALS --------------
+# =====================================
+
+class PropagationError(SNIPError):
+    pass
+
+# =====================================
+# ------------ CONSTRAINT -------------
+# =====================================
+
+class Constraint:
+    """ A believed andor/thresh node, viewed as a constraint on how many of its
+        arguments may be true.
+            andor{i, j}: between i and j arguments are true
+            thresh{i, j}: fewer than i or more than j arguments are true """
+
+    __slots__ = ('node', 'args', 'min', 'max', 'thresh', 'num_true', 'num_false')
+
+    def __init__(self, node: MinMaxOpNode) -> None:
+        self.node = node
+        self.args = list(node.frame.filler_set[0].nodes)
+        self.min = node.min
+        self.max = node.max
+        self.thresh = isinstance(node, ThreshNode)
+        self.num_true = 0
+        self.num_false = 0
+
+    def num_unknown(self) -> int:
+        return len(self.args) - self.num_true - self.num_false
+
+    def __repr__(self) -> str:
+        return "<Constraint {} T:{} F:{} U:{}>".format(self.node.name, self.num_true, self.num_false, self.num_unknown())
+
+class BeliefHook:
+    """ An ATMS belief hook which tells a propagator about new beliefs while it exists. """
+
+    __slots__ = ('method',)
+
+    def __init__(self, propagator) -> None:
+        self.method = WeakMethod(propagator.belief_added)
+
+    def alive(self) -> bool:
+        return self.method() is not None
+
+    def __call__(self, context, node) -> None:
+        method = self.method()
+        if method is not None:
+            method(context, node)
+
+# =====================================
+# ------------ PROPAGATOR -------------
+# =====================================
+
+class Propagator:
+    """ Derives the arguments of believed andor/thresh nodes in one context.
+        A node is true when it is believed and false when its negation (not(node)) is believed.
+        Forced nodes are recorded as derived beliefs in the context. """
+
+    def __init__(self, net, context=None) -> None:
+        self.net = net
+        self.context = net.current_context if context is None else context
+        self.added = [] # Beliefs added to the context since the last sync
+        self.reset()
+        # Held weakly, so that the ATMS does not keep a discarded propagator alive
+        hooks = self.context.atms.belief_hooks
+        hooks[:] = [hook for hook in hooks if not isinstance(hook, BeliefHook) or hook.alive()]
+        hooks.append(BeliefHook(self))
+
+    def reset(self) -> None:
+        """ Forgets every decision, so that the next sync decides every belief again. """
+        self.values = {} # Maps nodes to True/False once decided
+        self.reasons = {} # Maps forced nodes to the list of nodes that forced them
+        self.watches = {} # Maps nodes to the constraints they are arguments of
+        self.constraints = {} # Maps andor/thresh nodes to their active Constraint
+        self.queue = deque() # Nodes decided, but not yet propagated
+        self.pending = set() # Contents of the queue, for constant time lookups
+        self.conflicts = [] # Constraints that can no longer be satisfied
+        self.derived = set() # Beliefs added to the context by propagation
+        self.scanned = False # Whether the context's beliefs have been read since the reset
+        self.added.clear()
+        self._revision = self.context.revision
+
+    def belief_added(self, context, node) -> None:
+        if context is self.context and self.scanned:
+            self.added.append(node)
+
+    def sync(self) -> set:
+        """ Decides every belief added to the context since the last sync, then propagates.
+            Returns the set of beliefs derived by this call. """
+        # Propagation is monotonic, so retractions require starting over
+        if self.context.revision != self._revision:
+            self.reset()
+
+        if not self.scanned:
+            for node in self.context.all_asserted():
+                self.assign(node, True)
+            self.scanned = True
+        else:
+            added, self.added = self.added, []
+            for node in added:
+                if node not in self.values:
+                    self.assign(node, True)
+        return self.propagate()
+
+    def assign(self, node: Node, value: bool) -> None:
+        """ Decides a node. Conflicting decisions are recorded rather than raised,
+            since SNePS logic is paraconsistent. """
+        current = self.values.get(node)
+        if current is None:
+            self.values[node] = value
+            self.queue.append(node)
+            self.pending.add(node)
+        elif current is not value:
+            self.conflicts.append(node)
+
+    def propagate(self) -> set:
+        """ Runs unit propagation until no more nodes are forced.
+            Returns the set of beliefs derived by this call. """
+        derived = set()
+        while self.queue:
+            node = self.queue.popleft()
+            self.pending.discard(node)
+            value = self.values[node]
+
+            # A believed andor/thresh becomes an active constraint
+            if value and isinstance(node, (AndOrNode, ThreshNode)) and node not in self.constraints:
+                self._activate(node, derived)
+
+            # Only constraints watching this node are revisited
+            for constraint in self.watches.get(node, ()):
+                if value:
+                    constraint.num_true += 1
+                else:
+                    constraint.num_false += 1
+                self._check(constraint, derived)
+
+        self.derived.update(derived)
+        return derived
+
+    def _activate(self, node: MinMaxOpNode, derived: set) -> None:
+        """ Starts watching the arguments of a newly believed constraint node. """
+        constraint = Constraint(node)
+        self.constraints[node] = constraint
+        for arg in constraint.args:
+            self.watches.setdefault(arg, []).append(constraint)
+
+            # Arguments still in the queue are counted when they are popped
+            value = self.values.get(arg)
+            if value is not None and arg not in self.pending:
+                if value:
+                    constraint.num_true += 1
+                else:
+                    constraint.num_false += 1
+        self._check(constraint, derived)
+
+    def _check(self, constraint: Constraint, derived: set) -> None:
+        """ Forces the undecided arguments of a constraint when its bounds leave only one option. """
+        num_true = constraint.num_true
+        num_unknown = constraint.num_unknown()
+
+        if constraint.thresh:
+            can_be_below = num_true < constraint.min
+            can_be_above = num_true + num_unknown > constraint.max
+            if not can_be_below and not can_be_above:
+                self.conflicts.append(constraint.node)
+            elif num_unknown == 0:
+                return
+            elif not can_be_below and num_true + num_unknown == constraint.max + 1:
+                self._force(constraint, True, derived)
+            elif not can_be_above and num_true == constraint.min - 1:
+                self._force(constraint, False, derived)
+        else:
+            if num_true > constraint.max or num_true + num_unknown < constraint.min:
+                self.conflicts.append(constraint.node)
+            elif num_unknown == 0:
+                return
+            elif num_true == constraint.max:
+                self._force(constraint, False, derived)
+            elif num_true + num_unknown == constraint.min:
+                self._force(constraint, True, derived)
+
+    def _force(self, constraint: Constraint, value: bool, derived: set) -> None:
+        """ Decides every undecided argument of the constraint, recording each as a derived belief. """
+        # The constraint and the arguments already decided are the reasons
+        reasons = [constraint.node]
+        for arg in constraint.args:
+            if arg in self.values and arg not in self.pending:
+                reasons.append(arg if self.values[arg] else self.negation(arg))
+
+        for arg in constraint.args:
+            if arg in self.values:
+                continue
+            belief = arg if value else self.negation(arg)
+            self.reasons[belief] = reasons
+            self.net.justify(belief, reasons)
+            if belief not in self.context:
+                self.context.add_derived(belief)
+                derived.add(belief)
+            self.assign(arg, value)
+            if belief is not arg:
+                self.assign(belief, True)
+
+    def negation(self, node: Node) -> Node:
+        """ Returns the node not(node), building it if necessary. """
+        for neg in node.follow_up_cable(self.net.slots['nor']):
+            if isinstance(neg, AndOrNode) and neg.num_constituents() == 1:
+                return neg
+        neg = self.net.build_wft("not({})".format(node.name))
+        if neg is None:
+            raise PropagationError("ERROR: Could not build the negation of {}".format(node.name))
+        return neg
+
+    def value(self, node: Node):
+        """ True, False, or None if propagation has not decided the node. """
+        return self.values.get(node)
@@ -0,0 +1,115 @@
+"""
+Explicit-stack backward chaining for SNIP.
+Inference methods are written as generators which yield the subgoals they need and
+receive back whether each subgoal was derived. The driver in this file keeps those
+generators on a list instead of the Python call stack, which lets it enforce limits
+on steps, depth and time, and stop as soon as a query is cancelled.
+"""
+
+# =====================================
+# -------------- IMPORTS --------------
+# =====================================
+
+from enum import Enum
+from time import monotonic
+
+# =====================================
+# -------------- BUDGET ---------------
+# =====================================
+
+class CancellationToken:
+    """ Shared flag used to stop a running query early, e.g. from another thread. """
+
+    def __init__(self) -> None:
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+class Budget:
+    """ Limits on a single query. None means unlimited.
+        max_steps: number of subgoals that may be expanded
+        max_depth: length of the longest chain of subgoals
+        timeout: wall-clock seconds
+        token: CancellationToken checked before every step """
+
+    def __init__(self, max_steps: int = None, max_depth: int = None,
+                 timeout: float = None, token: CancellationToken = None) -> None:
+        self.max_steps = max_steps
+        self.max_depth = max_depth
+        self.timeout = timeout
+        self.token = token
+
+# =====================================
+# -------------- ANSWER ---------------
+# =====================================
+
+class Answer(Enum):
+    TRUE = 0
+    FALSE = 1
+    UNKNOWN = 2 # The budget ran out before the search was complete
+
+class QueryResult:
+    """ Outcome of a budgeted query. reason says why the answer is UNKNOWN. """
+
+    def __init__(self, wft, answer: Answer, steps: int, reason: str = None) -> None:
+        self.wft = wft
+        self.answer = answer
+        self.steps = steps
+        self.reason = reason
+
+    def __bool__(self) -> bool:
+        return self.answer is Answer.TRUE
+
+    def __repr__(self) -> str:
+        return "<QueryResult {} {}{}>".format(self.wft, self.answer.name,
+                                              "" if self.reason is None else " ({})".format(self.reason))
+
+# =====================================
+# -------------- DRIVER ---------------
+# =====================================
+
+def solve(wft, goal, budget: Budget = None) -> QueryResult:
+    """ Evaluates goal(wft, ignore), where goal returns a generator that yields
+        (subgoal, ignore) pairs and is sent back a bool for each one. """
+    budget = Budget() if budget is None else budget
+    deadline = None if budget.timeout is None else monotonic() + budget.timeout
+
+    stack = [goal(wft, set())]
+    steps = 0
+    truncated = False # True if a subgoal was abandoned for being too deep
+    value = None
+
+    while stack:
+        # Stop early when cancelled or out of time or steps
+        if budget.token is not None and budget.token.cancelled:
+            return QueryResult(wft, Answer.UNKNOWN, steps, "cancelled")
+        if deadline is not None and monotonic() > deadline:
+            return QueryResult(wft, Answer.UNKNOWN, steps, "timeout")
+
+        try:
+            subgoal, ignore = stack[-1].send(value)
+        except StopIteration as stop:
+            # This goal is finished; hand its result to the goal that asked for it
+            stack.pop()
+            value = bool(stop.value)
+            continue
+
+        # Subgoals beyond the maximum depth are treated as not derivable
+        if budget.max_depth is not None and len(stack) >= budget.max_depth:
+            truncated = True
+            value = False
+            continue
+
+        steps += 1
+        if budget.max_steps is not None and steps > budget.max_steps:
+            return QueryResult(wft, Answer.UNKNOWN, steps - 1, "step limit")
+        stack.append(goal(subgoal, ignore))
+        value = None
+
+    if value:
+        return QueryResult(wft, Answer.TRUE, steps)
+    elif truncated:
+        return QueryResult(wft, Answer.UNKNOWN, steps, "depth limit")
+    else:
+        return QueryResult(wft, Answer.FALSE, steps)
@@ -0,0 +1,264 @@
+"""
+Unification of SNePS terms, and a discrimination tree for finding the molecular nodes
+a term might unify with. Arbitrary and indefinite nodes are variables: the tree treats
+them as wildcards, and unification binds them to terms which satisfy their restrictions.
+"""
+
+# =====================================
+# -------------- IMPORTS --------------
+# =====================================
+
+from collections import Counter
+from ..sneps.Node import Node, Molecular, MinMaxOpNode, ImplNode, Variable
+
+# =====================================
+# -------------- GLOBALS --------------
+# =====================================
+
+WILDCARD = '*'
+
+def frame_key(node: Molecular) -> tuple:
+    """ The part of a molecular node's key which must match exactly. """
+    if isinstance(node, MinMaxOpNode):
+        return (node.frame.caseframe.name, node.min, node.max)
+    if isinstance(node, ImplNode):
+        return (node.frame.caseframe.name, node.bound)
+    return (node.frame.caseframe.name,)
+
+def filler_key(node: Node) -> str:
+    """ One symbol standing for a filler: its name, its caseframe, or a wildcard. """
+    if isinstance(node, Variable):
+        return WILDCARD
+    if isinstance(node, Molecular):
+        return "(" + node.frame.caseframe.name
+    return node.name
+
+def term_keys(node: Molecular) -> list:
+    """ The sequence of keys under which a molecular node is stored:
+        its frame key, then a sorted tuple of filler symbols for each slot. """
+    keys = [frame_key(node)]
+    for fillers in node.frame.filler_set:
+        keys.append(tuple(sorted(filler_key(filler) for filler in fillers.nodes)))
+    return keys
+
+def compatible(key: tuple, other: tuple) -> bool:
+    """ True if the filler symbols of two slots could be paired off, letting wildcards
+        stand for anything. """
+    if len(key) != len(other):
+        return False
+    counts = Counter(key)
+    other_counts = Counter(other)
+    wild = counts.pop(WILDCARD, 0)
+    other_wild = other_counts.pop(WILDCARD, 0)
+    return sum((counts - other_counts).values()) <= other_wild and \
+           sum((other_counts - counts).values()) <= wild
+
+def has_variables(node: Node, visited=None) -> bool:
+    """ True if the node is, or contains, an arbitrary or indefinite node. """
+    if isinstance(node, Variable):
+        return True
+    if not isinstance(node, Molecular):
+        return False
+    if visited is None:
+        visited = set()
+    visited.add(node)
+    return any(filler not in visited and has_variables(filler, visited)
+               for fillers in node.frame.filler_set for filler in fillers.nodes)
+
+# =====================================
+# -------- DISCRIMINATION TREE --------
+# =====================================
+
+class TreeLevel:
+    """ One level of the discrimination tree. Children whose keys contain a
+        wildcard are also listed separately, so that a ground query only has to
+        look at its own key and at those. """
+
+    __slots__ = ('children', 'wild', 'nodes')
+
+    def __init__(self) -> None:
+        self.children = {} # Maps keys to TreeLevels
+        self.wild = {} # The subset of children whose keys contain a wildcard
+        self.nodes = [] # Names of the nodes stored at a leaf
+
+class DiscriminationTree:
+    """ Indexes molecular nodes by caseframe and filler structure. Nodes are stored by
+        name and looked up when yielded, so the tree does not keep them in memory. """
+
+    def __init__(self, lookup) -> None:
+        self.root = TreeLevel()
+        self.lookup = lookup # Returns the node with a given name, or None
+        self.generic = set() # Names of indexed nodes which contain variables
+        self.size = 0
+
+    def add(self, node: Node) -> None:
+        """ Indexes a node. Non-molecular nodes are ignored. """
+        if not isinstance(node, Molecular):
+            return
+        level = self.root
+        for key in term_keys(node):
+            child = level.children.get(key)
+            if child is None:
+                child = TreeLevel()
+                level.children[key] = child
+                if WILDCARD in key:
+                    level.wild[key] = child
+            level = child
+        level.nodes.append(node.name)
+        if has_variables(node):
+            self.generic.add(node.name)
+        self.size += 1
+
+    def rename(self, node: Node, old_name: str) -> None:
+        """ Updates the name stored for a renamed node. Renaming never changes a node's keys. """
+        if not isinstance(node, Molecular):
+            return
+        level = self.root
+        for key in term_keys(node):
+            level = level.children[key]
+        level.nodes[level.nodes.index(old_name)] = node.name
+        if old_name in self.generic:
+            self.generic.discard(old_name)
+            self.generic.add(node.name)
+
+    def candidates(self, node: Node, generic_only: bool = False, ground_only: bool = False):
+        """ Yields the indexed nodes which might unify with the given node. """
+        if not isinstance(node, Molecular):
+            return
+        keys = term_keys(node)
+        level = self.root.children.get(keys[0])
+        levels = [] if level is None else [level]
+        for key in keys[1:]:
+            next_levels = []
+            for level in levels:
+                if WILDCARD in key:
+                    next_levels.extend(child for other, child in level.children.items()
+                                       if compatible(key, other))
+                else:
+                    child = level.children.get(key)
+                    if child is not None:
+                        next_levels.append(child)
+                    next_levels.extend(child for other, child in level.wild.items()
+                                       if compatible(key, other))
+            levels = next_levels
+        for level in levels:
+            for name in level.nodes:
+                generic = name in self.generic
+                if (generic_only and not generic) or (ground_only and generic):
+                    continue
+                candidate = self.lookup(name)
+                if candidate is not None:
+                    yield candidate
+
+# =====================================
+# ------------ UNIFICATION ------------
+# =====================================
+
+def walk(node: Node, subst: dict) -> Node:
+    """ Follows variable bindings until reaching an unbound variable or a non-variable. """
+    while isinstance(node, Variable) and node in subst:
+        node = subst[node]
+    return node
+
+def unify(term: Node, other: Node, subst: dict):
+    """ Yields every substitution (a dict mapping variables to nodes) extending subst
+        under which the two terms are identical. """
+    term = walk(term, subst)
+    other = walk(other, subst)
+    if term is other:
+        yield subst
+    elif isinstance(term, Variable):
+        yield _bind(term, other, subst)
+    elif isinstance(other, Variable):
+        yield _bind(other, term, subst)
+    elif isinstance(term, Molecular) and isinstance(other, Molecular):
+        if frame_key(term) != frame_key(other) or term.frame.caseframe is not other.frame.caseframe:
+            return
+        yield from _unify_slots(term.frame.filler_set, other.frame.filler_set, 0, subst)
+
+def _bind(var: Variable, node: Node, subst: dict) -> dict:
+    new_subst = dict(subst)
+    new_subst[var] = node
+    return new_subst
+
+def _unify_slots(filler_set, other_filler_set, i: int, subst: dict):
+    """ Unifies the fillers of each slot, from slot i onward. """
+    if i == len(filler_set):
+        yield subst
+        return
+    fillers = list(filler_set[i].nodes)
+    other_fillers = list(other_filler_set[i].nodes)
+    if len(fillers) != len(other_fillers):
+        return
+    for new_subst in _unify_sets(fillers, other_fillers, subst):
+        yield from _unify_slots(filler_set, other_filler_set, i + 1, new_subst)
+
+def _unify_sets(fillers: list, other_fillers: list, subst: dict):
+    """ Fillers are sets, so every pairing of the two lists is tried. """
+    if not fillers:
+        yield subst
+        return
+    first, rest = fillers[0], fillers[1:]
+    for j, other in enumerate(other_fillers):
+        for new_subst in unify(first, other, subst):
+            yield from _unify_sets(rest, other_fillers[:j] + other_fillers[j + 1:], new_subst)
+
+# =====================================
+# -------------- MATCHER --------------
+# =====================================
+
+class Matcher:
+    """ Finds the nodes of a network which unify with a term, using a discrimination
+        tree kept up to date as nodes are added to the network. A variable may only be
+        bound to a term for which instances of all of its restrictions hold. """
+
+    def __init__(self, net) -> None:
+        self.net = net
+        self.tree = DiscriminationTree(lambda name: net.nodes.get(name))
+        for node in net.nodes.values():
+            self.tree.add(node)
+        net.node_hooks.append(self.tree.add)
+        net.rename_hooks.append(self.tree.rename)
+
+    @staticmethod
+    def of(net) -> 'Matcher':
+        """ Returns the network's Matcher, creating it the first time it is needed. Every
+            Inference on the network shares it, so the tree is built and hooked in only once. """
+        matcher = getattr(net, 'matcher', None)
+        if matcher is None:
+            matcher = net.matcher = Matcher(net)
+        return matcher
+
+    def match(self, term: Node, holds, generic_only: bool = False):
+        """ Yields (node, substitution, restriction instances) for each indexed node
+            which unifies with term. holds(node) decides whether a restriction instance is believed. """
+        for candidate in self.tree.candidates(term, generic_only=generic_only):
+            for subst in unify(candidate, term, {}):
+                for support in self._restrictions_hold(subst, holds, set()):
+                    yield candidate, subst, support
+
+    def _restrictions_hold(self, subst: dict, holds, checked: set):
+        """ Yields the lists of believed restriction instances that satisfy the
+            restrictions of every variable bound in subst. """
+        restrictions = [(var, restriction) for var in subst if var not in checked
+                        for restriction in getattr(var, 'restriction_set', ())]
+        yield from self._satisfy(restrictions, subst, holds, checked | set(subst))
+
+    def _satisfy(self, restrictions: list, subst: dict, holds, checked: set):
+        if not restrictions:
+            yield []
+            return
+        (var, restriction), rest = restrictions[0], restrictions[1:]
+        if isinstance(walk(var, subst), Variable):
+            # Unbound (or bound to another variable), so there is nothing to check
+            yield from self._satisfy(rest, subst, holds, checked)
+            return
+        for instance in self.tree.candidates(restriction, ground_only=True):
+            if not holds(instance):
+                continue
+            for new_subst in unify(restriction, instance, subst):
+                # Variables bound by this instance bring their own restrictions
+                new_restrictions = [(other, other_restriction) for other in new_subst if other not in checked
+                                    for other_restriction in getattr(other, 'restriction_set', ())]
+                for support in self._satisfy(rest + new_restrictions, new_subst, holds, checked | set(new_subst)):
+                    yield [instance] + support
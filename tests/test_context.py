@@ -0,0 +1,131 @@
+""" Beliefs shared between contexts through their hypotheses, and retraction. """
+
+import pytest
+from src import Network, Inference
+from src.sneps.Context import ContextError
+from src.snip.Search import Answer
+
+def new_network():
+    net = Network()
+    net.verbose = False
+    net.define_context('child')
+    return net
+
+def answer(inf, wft_str: str, context_name: str):
+    net = inf.net
+    current = net.current_context.name
+    net.set_current_context(context_name)
+    try:
+        return inf.query(wft_str).answer
+    finally:
+        net.set_current_context(current)
+
+def test_inherited_belief_not_copied_into_child():
+    net = new_network()
+    net.assert_wft('Isa(Fido, Dog)')
+    inf = Inference(net)
+    assert answer(inf, 'Isa(Fido, Dog)', 'child') is Answer.TRUE
+    assert not net.contexts['child'].ders
+
+def test_parent_retraction_seen_from_child():
+    net = new_network()
+    net.assert_wft('Isa(Fido, Dog)')
+    inf = Inference(net)
+    assert answer(inf, 'Isa(Fido, Dog)', 'child') is Answer.TRUE
+    net.retract_wft('Isa(Fido, Dog)')
+    assert answer(inf, 'Isa(Fido, Dog)', 'child') is Answer.FALSE
+
+def test_parent_retraction_removes_beliefs_derived_in_child():
+    net = new_network()
+    net.assert_wft('if(Isa(Fido, Dog), Isa(Fido, Animal))')
+    net.assert_wft('Isa(Fido, Dog)')
+    inf = Inference(net)
+    assert answer(inf, 'Isa(Fido, Animal)', 'child') is Answer.TRUE
+    animal = net.build_wft('Isa(Fido, Animal)')
+    assert animal in net.contexts['child'].ders
+    assert net.retract_wft('Isa(Fido, Dog)') == {animal}
+    assert not net.believes(animal, 'child')
+    assert answer(inf, 'Isa(Fido, Animal)', 'child') is Answer.FALSE
+
+def test_parent_retraction_removes_unlabelled_copy_in_child():
+    net = new_network()
+    net.assert_wft('Isa(Fido, Dog)')
+    dog = net.build_wft('Isa(Fido, Dog)')
+    net.contexts['child'].add_derived(dog)
+    assert net.retract_wft('Isa(Fido, Dog)') == {dog}
+    assert not net.believes(dog, 'child')
+
+def scenario_network(*names):
+    """ A network with a rule in the default context, and a sibling context for each name. """
+    net = Network()
+    net.verbose = False
+    net.assert_wft('if(Isa(Fido, Dog), Isa(Fido, Animal))')
+    for name in names:
+        net.define_context(name)
+    return net
+
+def assert_in(net, wft_str: str, context_name: str):
+    net.set_current_context(context_name)
+    net.assert_wft(wft_str)
+    net.set_current_context('default')
+
+def test_one_derivation_serves_sibling_contexts():
+    net = scenario_network('first', 'second', 'third')
+    assert_in(net, 'Isa(Fido, Dog)', 'first')
+    assert_in(net, 'Isa(Fido, Dog)', 'second')
+    inf = Inference(net)
+    assert answer(inf, 'Isa(Fido, Animal)', 'first') is Answer.TRUE
+    animal = net.build_wft('Isa(Fido, Animal)')
+    # Labelled with the hypotheses it rests on, so the sibling needs no inference
+    assert net.believes(animal, 'second')
+    assert not net.contexts['second'].ders
+    assert not net.believes(animal, 'third')
+    assert sorted(net.believing_contexts(animal)) == ['first', 'second']
+
+def test_labels_keep_only_minimal_environments():
+    net = scenario_network()
+    rule = net.build_wft('if(Isa(Fido, Dog), Isa(Fido, Animal))')
+    dog = net.build_wft('Isa(Fido, Dog)')
+    pet = net.build_wft('Isa(Fido, Pet)')
+    animal = net.build_wft('Isa(Fido, Animal)')
+    for node in (dog, pet):
+        net.current_context.add_hypothesis(node)
+    net.justify(animal, [rule, dog, pet])
+    net.justify(animal, [rule, dog])
+    bits = net.atms.hyp_bits
+    assert net.atms.labels[animal] == [bits[rule] | bits[dog]]
+
+def test_retraction_sweeps_only_dependent_beliefs():
+    net = scenario_network()
+    net.assert_wft('if(Isa(Fido, Pet), Isa(Fido, Owned))')
+    net.assert_wft('Isa(Fido, Dog)')
+    net.assert_wft('Isa(Fido, Pet)')
+    inf = Inference(net)
+    assert inf.query('Isa(Fido, Animal)').answer is Answer.TRUE
+    assert inf.query('Isa(Fido, Owned)').answer is Answer.TRUE
+    animal = net.build_wft('Isa(Fido, Animal)')
+    owned = net.build_wft('Isa(Fido, Owned)')
+    assert net.retract_wft('Isa(Fido, Dog)') == {animal}
+    assert not net.believes(animal)
+    assert owned in net.current_context.ders
+
+def test_retraction_keeps_beliefs_with_other_support():
+    net = scenario_network()
+    net.assert_wft('if(Isa(Fido, Wolf), Isa(Fido, Animal))')
+    net.assert_wft('Isa(Fido, Dog)')
+    net.assert_wft('Isa(Fido, Wolf)')
+    animal = net.build_wft('Isa(Fido, Animal)')
+    net.justify(animal, [net.build_wft('if(Isa(Fido, Dog), Isa(Fido, Animal))'), net.build_wft('Isa(Fido, Dog)')])
+    net.justify(animal, [net.build_wft('if(Isa(Fido, Wolf), Isa(Fido, Animal))'), net.build_wft('Isa(Fido, Wolf)')])
+    net.current_context.add_derived(animal)
+    assert net.retract_wft('Isa(Fido, Dog)') == set()
+    assert net.believes(animal)
+    assert net.retract_wft('Isa(Fido, Wolf)') == {animal}
+
+def test_retracting_a_derived_belief_is_an_error():
+    net = scenario_network()
+    net.assert_wft('Isa(Fido, Dog)')
+    inf = Inference(net)
+    assert inf.query('Isa(Fido, Animal)').answer is Answer.TRUE
+    with pytest.raises(ContextError):
+        net.retract(net.build_wft('Isa(Fido, Animal)'))
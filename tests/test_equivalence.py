@@ -0,0 +1,64 @@
+""" Equivalence classes of terms related by asserted Equiv propositions, in each context. """
+
+import pytest
+from src import Network
+from src.sneps.Context import ContextError
+
+EQUIV_PATH = 'kstar(compose(equiv-, !, equiv))' # The terms the equiv slot's path makes equivalent
+
+def new_network():
+    """ Equiv(A, B) in the default context, Equiv(B, C) in its child, and Equiv(C, D) in a sibling. """
+    net = Network()
+    net.verbose = False
+    net.define_context('child')
+    net.define_context('sibling')
+    net.assert_wft('Equiv(A, B)')
+    for context_name, wft_str in (('child', 'Equiv(B, C)'), ('sibling', 'Equiv(C, D)')):
+        net.set_current_context(context_name)
+        net.assert_wft(wft_str)
+    net.set_current_context('default')
+    net.build_wft('Equiv(D, E)')
+    return net
+
+def names(nodes) -> set:
+    return set(node.name for node in nodes)
+
+def agrees_with_path(net) -> bool:
+    """ True if every term's class in the default context is what following the equiv path from
+        it derives. (Elsewhere they differ: ! only checks a context's own beliefs.) """
+    return all(names(net.equivalence_class(term)) == names(net.paths_from([term], EQUIV_PATH)) for term in 'ABCDE')
+
+def test_classes_follow_each_context_and_its_parents():
+    net = new_network()
+    assert net.equivalent('A', 'B') and not net.equivalent('A', 'C')
+    assert net.equivalent('A', 'C', 'child')
+    assert not net.equivalent('A', 'C', 'sibling') and net.equivalent('C', 'D', 'sibling')
+    assert not net.equivalent('D', 'E', 'sibling')
+    assert names(net.equivalence_class('A', 'child')) == {'A', 'B', 'C'}
+    assert names(net.equivalence_class('E')) == {'E'}
+    assert sorted(sorted(names(members)) for members in net.equivalence_classes('sibling')) == [['A', 'B'], ['C', 'D']]
+    assert agrees_with_path(net)
+
+def test_classes_merge_after_assertion():
+    net = new_network()
+    assert not net.equivalent('A', 'E', 'child')
+    net.assert_wft('Equiv(D, E)')
+    # Asserted in the parent, so inherited by both children
+    assert net.equivalent('D', 'E', 'child') and net.equivalent('C', 'E', 'sibling')
+    net.assert_wft('Equiv(C, D)')
+    assert net.equivalent('A', 'E', 'child')
+    assert agrees_with_path(net)
+
+def test_classes_split_after_retraction():
+    net = new_network()
+    assert net.equivalent('A', 'C', 'child')
+    net.retract_wft('Equiv(A, B)')
+    assert not net.equivalent('A', 'B')
+    assert not net.equivalent('A', 'C', 'child') and net.equivalent('B', 'C', 'child')
+    assert names(net.equivalence_class('A', 'child')) == {'A'}
+    assert agrees_with_path(net)
+
+def test_unknown_context_is_an_error():
+    net = new_network()
+    with pytest.raises(ContextError):
+        net.equivalent('A', 'B', 'nowhere')
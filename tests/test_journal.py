@@ -0,0 +1,92 @@
+""" Recovery and following of a journaled network, when queries build nodes between journaled operations. """
+
+import io
+import json
+import os
+import subprocess
+import sys
+import textwrap
+from contextlib import redirect_stdout
+
+from src import Network, Inference
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def new_network():
+    net = Network()
+    net.verbose = False
+    net.define_slot('happy', 'Entity')
+    net.define_caseframe('Happy', 'Proposition', ['happy'])
+    return net
+
+def by_wft(net, wft_str):
+    return next(node for node in net.nodes.values() if str(node) == wft_str)
+
+def molecular(net) -> dict:
+    """ Maps the names of the network's molecular nodes to their wfts. """
+    return {node.name: str(node) for node in net.nodes.values() if hasattr(node, 'frame')}
+
+def hypotheses(net) -> set:
+    return set(str(node) for node in net.current_context.hyps)
+
+def run_primary(code: str, **values) -> dict:
+    """ Runs code as the primary, in its own process so that its naming counters are its own.
+        The code stores what the test should compare in result. """
+    script = ("import json, sys\n"
+              "from src import Network, Inference\n"
+              "values = json.loads(sys.argv[1])\n"
+              "result = {}\n"
+              + textwrap.dedent(code) +
+              "print(json.dumps(result))\n")
+    output = subprocess.run([sys.executable, '-c', script, json.dumps(values)], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def test_recover_after_query_builds_node(tmp_path):
+    net = new_network()
+    net.attach_journal(str(tmp_path))
+    with redirect_stdout(io.StringIO()):
+        # Builds Happy(X) outside any journaled operation
+        Inference(net).ask_if("Happy(X)")
+        net.assert_wft("Happy(Y)")
+        net.assert_wft("Happy(X)")
+        net.retract(by_wft(net, "Happy(X)"))
+    net.detach_journal()
+
+    recovered = Network.recover(str(tmp_path))
+    recovered.detach_journal()
+    assert molecular(recovered) == molecular(net)
+    assert hypotheses(recovered) == hypotheses(net) == {"Happy(Y)"}
+
+def test_follower_matches_primary_names(tmp_path):
+    directory = str(tmp_path)
+    run_primary("""
+        net = Network()
+        net.verbose = False
+        net.define_slot('happy', 'Entity')
+        net.define_caseframe('Happy', 'Proposition', ['happy'])
+        net.attach_journal(values['directory'])
+        net.detach_journal()
+    """, directory=directory)
+
+    follower = Network.follow(directory)
+    with redirect_stdout(io.StringIO()):
+        # The follower builds its own Happy(X) before the primary does
+        Inference(follower).ask_if("Happy(X)")
+
+    primary = run_primary("""
+        net = Network.recover(values['directory'])
+        net.verbose = False
+        Inference(net).ask_if("Happy(X)")
+        net.assert_wft("Happy(Y)")
+        net.assert_wft("Happy(X)")
+        net.retract(next(node for node in net.nodes.values() if str(node) == "Happy(X)"))
+        net.detach_journal()
+        result['molecular'] = {node.name: str(node) for node in net.nodes.values() if hasattr(node, 'frame')}
+        result['hyps'] = sorted(str(node) for node in net.current_context.hyps)
+    """, directory=directory)
+
+    follower.poll()
+    follower.unfollow()
+    assert molecular(follower) == primary['molecular']
+    assert sorted(hypotheses(follower)) == primary['hyps'] == ["Happy(Y)"]
@@ -0,0 +1,49 @@
+""" Listing a network's contents as records, and keeping quiet when verbosity is off. """
+
+from src import Network, Inference
+
+def new_network():
+    net = Network()
+    net.set_verbosity(False)
+    net.define_type('Agent', ['Entity'])
+    net.define_slot('owner', 'Agent', docstring="Who owns something")
+    net.define_caseframe('Owns', 'Proposition', ['owner', 'member'], docstring="Ownership")
+    net.define_context('other', "Another view")
+    net.assert_wft('Owns(Alice, Fido)')
+    net.build_wft('Isa(Fido, Dog)')
+    return net
+
+def test_records_describe_each_part_of_the_network():
+    net = new_network()
+    terms = {record.name: record for record in net.iter_terms()}
+    owns = net.build_wft('Owns(Alice, Fido)')
+    assert terms[owns.name].asserted and terms[owns.name].node is owns
+    assert (terms['Alice'].kind, terms['Alice'].sem_type, terms['Alice'].asserted) == ('Base', 'Agent', False)
+    [slot] = net.iter_slots(lambda record: record.name == 'owner')
+    assert (slot.sem_type, slot.docstring, slot.min) == ('Agent', "Who owns something", 1)
+    [caseframe] = net.iter_caseframes(lambda record: record.name == 'Owns')
+    assert caseframe.slots == ('owner', 'member')
+    [agent] = net.iter_types(lambda record: record.name == 'Agent')
+    assert agent.parents == ('Entity',)
+    [other] = net.iter_contexts(lambda record: record.name == 'other')
+    assert (other.parent, other.docstring) == ('default', "Another view")
+
+def test_listing_is_lazy():
+    net = new_network()
+    checked = []
+    records = net.iter_terms(lambda record: checked.append(record) or record.kind == 'Base')
+    assert checked == []
+    assert next(records).kind == 'Base'
+    assert len(checked) < len(net.nodes)
+
+def test_nothing_printed_when_not_verbose(capsys):
+    net = new_network()
+    net.assert_wft('if(Owns(Alice, Fido), Isa(Fido, Dog))')
+    net.retract_wft('Owns(Alice, Fido)')
+    inf = Inference(net)
+    inf.ask('Isa(Fido, Dog)')
+    inf.ask_if_not('Isa(Fido, Dog)')
+    assert capsys.readouterr().out == ''
+    net.set_verbosity(True)
+    net.assert_wft('Isa(Rex, Dog)')
+    assert 'Isa(Rex, Dog)' in capsys.readouterr().out
@@ -0,0 +1,79 @@
+""" Loading .sneps files, and the errors collected on the way. """
+
+import io
+
+from src import Network
+
+def load(text: str):
+    net = Network()
+    net.verbose = False
+    return net, net.load_sneps(io.StringIO(text))
+
+def test_missing_bracket_only_loses_its_term():
+    net, report = load("define_slot(owner, Entity)\n"
+                       "define_caseframe(Owns, Proposition, [owner])\n"
+                       "Isa(Fido, Dog)\n"
+                       "Isa(Rex, Dog\n"
+                       "Owns(Alice)\n"
+                       "\n"
+                       "if(Isa(Tom, Cat),\n"
+                       "   Isa(Tom, Animal))\n"
+                       "define_context(other)\n")
+    assert [(error.line, error.text) for error in report.errors] == [(4, "Isa(Rex, Dog")]
+    assert "Unbalanced" in report.errors[0].message
+    assert report.asserted == 3
+    assert report.directives == 3
+    assert "other" in net.contexts
+    assert "Rex" not in net.nodes
+
+def test_blank_line_ends_an_open_term():
+    net, report = load("Isa(Fido,\n"
+                       "\n"
+                       "    Isa(Rex, Dog)\n")
+    assert [error.line for error in report.errors] == [1]
+    assert report.asserted == 1
+    assert "Rex" in net.nodes
+
+def test_errors_collected_with_line_numbers():
+    net, report = load("define_slot(owner, Entity)\n"
+                       "define_slot(owner, Entity)   ; defined twice\n"
+                       "define_caseframe(Owns, Proposition, [owner, nothing])\n"
+                       "Isa(Fido, Dog)\n"
+                       "Isa(Fido,, Dog)\n"
+                       "define_type(Pet, [Animal], extra=1)\n"
+                       "Isa(Rex, Dog)\n")
+    assert [error.line for error in report.errors] == [2, 3, 5, 6]
+    assert all(error.message for error in report.errors)
+    assert report.terms == 7
+    assert report.asserted == 2
+    assert report.directives == 1
+
+def test_directives_take_effect_between_assertions():
+    net, report = load("; Fido belongs to the default context\n"
+                       "Isa(Fido, Dog)\n"
+                       "define_context(other, \"Another \\\"view\\\"\")\n"
+                       "set_current_context(other)\n"
+                       "define_slot(owner, Entity, min=1, max=None)\n"
+                       "define_caseframe(Owns, Proposition,\n"
+                       "                 [owner, member])\n"
+                       "Owns(Alice, Fido) ; in other\n")
+    assert not report.errors
+    fido = net.build_wft('Isa(Fido, Dog)')
+    owns = net.build_wft('Owns(Alice, Fido)')
+    assert fido in net.contexts['default'].hyps
+    assert owns in net.contexts['other'].hyps
+    assert owns not in net.contexts['default'].hyps
+    assert net.contexts['other'].docstring == 'Another "view"'
+    assert net.find_slot('owner').min == 1
+
+def test_progress_reported_while_loading_a_file(tmp_path):
+    path = tmp_path / "dogs.sneps"
+    path.write_text("".join("Isa(Dog{}, Dog)\n".format(i) for i in range(25)))
+    net = Network()
+    net.verbose = False
+    seen = []
+    report = net.load_sneps(str(path), batch_size=4, progress=lambda r: seen.append(r.terms), progress_every=10)
+    assert seen == [10, 20, 25]
+    assert report.asserted == 25
+    assert report.source == str(path)
+    assert "25 terms" in str(report)
@@ -0,0 +1,76 @@
+""" Importing N-Triples files into caseframes. """
+
+import io
+
+import pytest
+
+from src import Network
+from src.sneps.NTriples import NTriplesError
+
+EX = "http://example.org/"
+
+def triple(subject: str, predicate: str, object: str) -> str:
+    return "<{0}{1}> <{0}{2}> <{0}{3}> .\n".format(EX, subject, predicate, object)
+
+def new_network():
+    net = Network()
+    net.verbose = False
+    net.define_type('Agent', ['Thing'])
+    net.define_slot('agent', 'Agent')
+    net.define_slot('theme', 'Entity')
+    net.define_slot('place', 'Entity')
+    net.define_caseframe('Holds', 'Proposition', ['agent', 'theme'])
+    net.define_caseframe('Puts', 'Proposition', ['agent', 'theme', 'place'])
+    return net
+
+def test_import_builds_and_asserts_mapped_triples():
+    net = new_network()
+    lines = io.StringIO(triple("Fido", "type", "Dog") + triple("Fido", "likes", "Bone") + "not a triple\n")
+    report = net.import_ntriples(lines, {EX + "type": "Isa(member, class)"})
+    assert (report.triples, report.built, report.skipped) == (3, 1, 1)
+    assert [error.line for error in report.errors] == [3]
+    assert [str(node) for node in net.current_context.hyps] == ["Isa(Fido, Dog)"]
+    assert net.nodes["Dog"].sem_type.name == "Category"
+
+def test_mapping_leaving_a_required_slot_empty_is_rejected():
+    net = new_network()
+    with pytest.raises(NTriplesError, match="place"):
+        net.import_ntriples(io.StringIO(triple("Alice", "puts", "Cup")), {EX + "puts": "Puts(agent, theme)"})
+    assert "Alice" not in net.nodes
+
+def test_failed_row_leaves_no_terms_behind():
+    net = new_network()
+    net.define_term("Idea", "Proposition")
+    report = net.import_ntriples(io.StringIO(triple("Idea", "holds", "Mug") + triple("Bob", "holds", "Cup")),
+                                 {EX + "holds": "Holds(agent, theme)"})
+    assert [error.line for error in report.errors] == [1]
+    assert report.built == 1
+    assert "Mug" not in net.nodes
+    assert "Bob" in net.nodes
+    assert net.nodes["Bob"].sem_type.name == "Agent"
+
+def test_prefixes_blank_nodes_and_clashing_names(tmp_path):
+    net = new_network()
+    path = tmp_path / "people.nt"
+    path.write_text("<http://one.org/Rex> <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <{0}Dog> .\n"
+                    "<http://two.org/Rex> <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <{0}Cat> .\n"
+                    "_:b1 <{0}holds> <{0}Cup> . # a comment\n"
+                    "<{0}Tom> <{0}age> \"7\" .\n".format(EX), encoding='utf-8')
+    report = net.import_ntriples(str(path), {"rdf:type": "Isa(member, class)", "ex:holds": ("Holds", "agent", "theme")},
+                                 prefixes={"ex": EX}, asserted=False)
+    assert (report.triples, report.built, report.skipped, report.errors) == (4, 3, 1, [])
+    assert report.source == str(path)
+    assert not net.current_context.hyps
+    built = set(str(node) for node in net.nodes.values() if hasattr(node, 'frame'))
+    assert built == {"Isa(Rex, Dog)", "Isa(Rex_2, Cat)", "Holds(blank_b1, Cup)"}
+    assert net.iri_names["http://two.org/Rex"] == "Rex_2"
+
+def test_batches_flushed_in_order_with_progress():
+    net = new_network()
+    lines = io.StringIO("".join(triple("Dog{}".format(i), "type", "Dog") for i in range(7)))
+    seen = []
+    report = net.import_ntriples(lines, {EX + "type": "Isa(member, class)"}, batch_size=3,
+                                 progress=lambda r: seen.append((r.triples, r.built)), progress_every=3)
+    assert seen == [(3, 3), (6, 6), (7, 7)]
+    assert len(net.current_context.hyps) == 7
+    assert "7 triples" in str(report)
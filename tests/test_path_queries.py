@@ -0,0 +1,212 @@
+""" Following paths from sets of nodes, through the closure cache, planner and rewriter. """
+
+import pytest
+from src import Network
+import src.sneps.Path as path_module
+import src.sneps.PathMatrix as path_matrix
+
+TAXONOMY = ['Isa(Fido, Dog)', 'Isa(Rex, Dog)', 'Isa(Tom, Cat)', 'Isa(Dog, Mammal)', 'Isa(Cat, Mammal)',
+            'Isa(Mammal, Animal)', 'Isa(Tweety, Bird)', 'Isa(Bird, Animal)']
+
+UP = 'kplus(compose(member-, class))' # The classes a node is a member of, and their superclasses
+
+PATHS = [UP, 'kstar(compose(member-, !, class))', 'kplus(compose(class-, member))',
+         'or(compose(member-, class), compose(class-, member))',
+         'and(kplus(compose(member-, class)), compose(member-, !, class))',
+         'irreflexive-restrict(kstar(or(compose(member-, class), compose(class-, member))))',
+         'converse(converse(compose(member-, compose(class))))']
+
+def new_network():
+    """ A taxonomy of believed Isa propositions, and one, Isa(Nemo, Fish), which is not believed. """
+    net = Network()
+    net.verbose = False
+    for wft_str in TAXONOMY:
+        net.assert_wft(wft_str)
+    net.build_wft('Isa(Nemo, Fish)')
+    return net
+
+def names(nodes) -> set:
+    return set(node.name for node in nodes)
+
+def base_terms(net) -> list:
+    return [node.name for node in net.nodes.values() if not hasattr(node, 'frame')]
+
+def one_at_a_time(net, terms: list, path_str: str) -> dict:
+    return {term: names(net.paths_from([term], path_str)) for term in terms}
+
+def test_paths_from_each_matches_one_source_at_a_time():
+    net = new_network()
+    terms = base_terms(net)
+    for path_str in PATHS:
+        each = {term: names(nodes) for term, nodes in net.paths_from_each(terms, path_str).items()}
+        assert each == one_at_a_time(net, terms, path_str), path_str
+        assert names(net.paths_from(terms, path_str)) == set().union(*each.values()), path_str
+    each = net.paths_from_each(['Fido', 'Nemo'], 'kstar(compose(member-, !, class))')
+    assert names(each['Fido']) == {'Fido', 'Dog', 'Mammal', 'Animal'}
+    assert names(each['Nemo']) == {'Nemo'}
+
+def test_closures_cached_and_extended_as_nodes_are_added():
+    net = new_network()
+    cache = net.closure_cache
+    assert names(net.paths_from(['Fido'], UP)) == {'Dog', 'Mammal', 'Animal'}
+    assert len(cache) == 1 and cache.hits == 0
+    assert names(net.paths_from(['Fido'], UP)) == {'Dog', 'Mammal', 'Animal'}
+    assert cache.hits == 1
+    # Animal was touched by the cached climb, so the closure is extended
+    net.assert_wft('Isa(Animal, Thing)')
+    assert names(net.paths_from(['Fido'], UP)) == {'Dog', 'Mammal', 'Animal', 'Thing'}
+    # Nothing the cached climb touched changes, so the closure is reused as is
+    net.assert_wft('Isa(Rock, Mineral)')
+    hits = cache.hits
+    assert names(net.paths_from(['Fido'], UP)) == {'Dog', 'Mammal', 'Animal', 'Thing'}
+    assert cache.hits == hits + 1
+
+def test_closure_cache_evicts_least_recently_used():
+    net = new_network()
+    cache = net.closure_cache
+    cache.max_nodes = 8
+    for term in ['Fido', 'Tom', 'Tweety', 'Rex']:
+        net.paths_from([term], UP)
+    assert cache.size <= 8
+    assert cache.evictions > 0
+    assert 'Rex' in names(key[2] for key in cache.entries)
+    assert names(net.paths_from(['Fido'], UP)) == {'Dog', 'Mammal', 'Animal'}
+
+def test_closures_depending_on_beliefs_are_not_cached():
+    net = new_network()
+    assert names(net.paths_from(['Nemo'], 'kplus(compose(member-, !, class))')) == set()
+    assert len(net.closure_cache) == 0
+    net.assert_wft('Isa(Nemo, Fish)')
+    assert names(net.paths_from(['Nemo'], 'kplus(compose(member-, !, class))')) == {'Fish'}
+
+def linked(node, other) -> bool:
+    """ True if a cable joins the two nodes, in either direction. """
+    def fills(molecular, filler):
+        frame = getattr(molecular, 'frame', None)
+        return frame is not None and any(filler in fillers.nodes for fillers in frame.filler_set)
+    return fills(node, other) or fills(other, node)
+
+def test_path_connects_agrees_with_paths_from():
+    net = new_network()
+    terms = base_terms(net)
+    for path_str in PATHS:
+        reached = one_at_a_time(net, terms, path_str)
+        for start in terms:
+            for end in terms:
+                assert net.path_connects(start, end, path_str) == (end in reached[start]), (path_str, start, end)
+
+def test_path_connects_returns_a_witness():
+    net = new_network()
+    witness = net.path_connects('Fido', 'Animal', UP, witness=True)
+    assert witness[0] is net.nodes['Fido'] and witness[-1] is net.nodes['Animal']
+    assert all(linked(node, next_node) for node, next_node in zip(witness, witness[1:]))
+    assert net.path_connects('Animal', 'Fido', UP, witness=True) is None
+    assert not net.path_connects('Nemo', 'Fish', 'compose(member-, !, class)')
+    assert net.path_connects('Nemo', 'Fish', 'compose(member-, class)')
+
+AND_PATHS = ['and(kplus(compose(member-, class)), compose(member-, !, class))',
+             'and(kstar(compose(class-, member)), or(compose(class-, member), compose(member-, class)))',
+             'and(kstar(or(compose(member-, class), compose(class-, member))), converse(compose(class-, member)))']
+
+def test_slot_statistics_counted_as_nodes_are_added():
+    net = new_network()
+    member = net.path_statistics.slots['member']
+    classes = net.path_statistics.slots['class']
+    # Eight believed Isa propositions, and Isa(Nemo, Fish)
+    assert (member.edges, member.sources, member.targets, member.max_down, member.max_up) == (9, 9, 9, 1, 1)
+    assert (classes.edges, classes.targets, classes.max_up) == (9, 6, 2)
+    assert classes.up_fanout == 1.5
+    net.assert_wft('Isa(Lassie, Dog)')
+    assert (classes.edges, classes.targets, classes.max_up) == (10, 6, 3)
+
+def test_planner_does_not_change_what_and_paths_derive():
+    net = new_network()
+    terms = base_terms(net)
+    planned = {path_str: net.paths_from_each(terms, path_str) for path_str in AND_PATHS}
+    net.path_planner = None
+    for path_str in AND_PATHS:
+        assert net.paths_from_each(terms, path_str) == planned[path_str], path_str
+    assert names(planned[AND_PATHS[0]]['Fido']) == {'Dog'}
+
+def test_explain_follows_the_cheapest_branch_first():
+    net = new_network()
+    lines = net.explain(AND_PATHS[0], ['Fido']).splitlines()
+    assert lines[0].startswith('and  (from 1.0:')
+    branches = [line.strip() for line in lines if line.strip()[:2] in ('1.', '2.')]
+    assert branches[0].startswith('1. forward: compose')
+    assert branches[1].startswith('2. ') and 'kplus' in branches[1]
+
+REWRITES = {'converse(converse(kplus(compose(member-, class))))': 'kplus(compose(member-, class))',
+            'converse(compose(member-, class))': 'compose(class-, member)',
+            'kstar(kplus(kstar(compose(member-, class))))': 'kstar(compose(member-, class))',
+            'compose(member-, compose(class, compose(member-, class)))': 'compose(member-, class, member-, class)',
+            'or(compose(member-, class), or(compose(class-, member), compose(member-, class)))':
+                'or(compose(member-, class), compose(class-, member))',
+            'and(compose(member-, class), and(compose(member-, class), !))': 'and(compose(member-, class), !)',
+            'irreflexive-restrict(kplus(or(class, member)))': 'kplus(or(class, member))',
+            'irreflexive-restrict(kstar(compose(class-, member)))': 'irreflexive-restrict(kstar(compose(class-, member)))'}
+
+def test_paths_rewritten_into_normal_form():
+    net = new_network()
+    for path_str, rewritten in REWRITES.items():
+        assert str(net.parse_path(path_str)) == rewritten, path_str
+    net.optimize_paths = False
+    assert str(net.parse_path('kstar(kstar(member))')) == 'kstar(kstar(member))'
+
+def test_rewriting_does_not_change_what_paths_derive():
+    net = new_network()
+    terms = base_terms(net)
+    path_strs = list(REWRITES) + PATHS + AND_PATHS
+    rewritten = {path_str: net.paths_from_each(terms, path_str) for path_str in path_strs}
+    net.optimize_paths = False
+    for path_str in path_strs:
+        assert net.paths_from_each(terms, path_str) == rewritten[path_str], path_str
+        assert net.path_connects('Fido', 'Animal', path_str) == \
+            (net.nodes['Animal'] in rewritten[path_str]['Fido']), path_str
+
+def from_each(net, path_str: str) -> dict:
+    """ paths_from_each from every node, leaving out the nodes which derive nothing. """
+    return {term: nodes for term, nodes in net.paths_from_each(list(net.nodes), path_str).items() if nodes}
+
+@pytest.mark.parametrize('matrices', [True, False])
+def test_paths_from_all_matches_paths_from_each(monkeypatch, matrices):
+    if matrices and not path_matrix.has_scipy:
+        pytest.skip("SciPy is not installed")
+    monkeypatch.setattr(path_module, 'has_scipy', matrices)
+    # Several chunks, when followed without matrices
+    monkeypatch.setattr(path_matrix, 'CHUNK_SIZE', 4)
+    net = new_network()
+    for path_str in PATHS + AND_PATHS + ['kstar(class-)', 'irreflexive-restrict(kstar(compose(class-, member)))']:
+        assert net.paths_from_all(path_str) == from_each(net, path_str), path_str
+    classes = net.paths_from_all('kstar(class-)')
+    assert names(classes['Dog']) == {'Dog', net.build_wft('Isa(Fido, Dog)').name, net.build_wft('Isa(Rex, Dog)').name}
+
+def chain_network(length: int):
+    """ C0 is a C1, which is a C2, and so on. """
+    net = Network()
+    net.verbose = False
+    net.assert_wfts(['Isa(C{}, C{})'.format(i, i + 1) for i in range(length)])
+    return net
+
+def test_paths_from_iter_yields_what_paths_from_derives_once_each():
+    net = new_network()
+    terms = ['Fido', 'Rex', 'Tom', 'Dog']
+    for path_str in PATHS + AND_PATHS:
+        found = list(net.paths_from_iter(terms, path_str))
+        assert len(found) == len(set(found)), path_str
+        assert set(found) == net.paths_from(terms, path_str), path_str
+
+def test_first_result_found_without_following_the_whole_path(monkeypatch):
+    net = chain_network(500)
+    followed = []
+    follow = path_module.follow_cable
+
+    def counting_follow(node, *args):
+        followed.append(node)
+        return follow(node, *args)
+
+    monkeypatch.setattr(path_module, 'follow_cable', counting_follow)
+    results = net.paths_from_iter(['C0'], 'kplus(compose(member-, class))')
+    assert [next(results).name for _ in range(3)] == ['C1', 'C2', 'C3']
+    assert len(followed) < 20
+    assert len(list(results)) == 497
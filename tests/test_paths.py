@@ -0,0 +1,106 @@
+""" Paths through materialized path-based slots, in more than one context. """
+
+import sys
+import threading
+
+from src import Network
+
+def new_network(rel_path: str):
+    """ rel joins the ra and rb fillers of R propositions as rel_path says. R(A, B) is asserted
+        in the default context, and R(A, D) in the context other. """
+    net = Network()
+    net.verbose = False
+    net.define_slot('ra', 'Entity')
+    net.define_slot('rb', 'Entity')
+    net.define_slot('rel', 'Entity', path=rel_path)
+    net.define_caseframe('R', 'Proposition', ['ra', 'rb'])
+    net.define_context('other')
+    net.assert_wft('R(A, B)')
+    net.set_current_context('other')
+    net.assert_wft('R(A, D)')
+    net.set_current_context('default')
+    return net
+
+def names(nodes) -> set:
+    return set(node.name for node in nodes)
+
+def test_closure_over_materialized_slot_is_not_cached():
+    net = new_network('compose(ra-, !, rb)')
+    net.materialize_slot('rel')
+    assert names(net.paths_from(['A'], 'kplus(rel)')) == {'B'}
+    net.set_current_context('other')
+    assert names(net.paths_from(['A'], 'kplus(rel)')) == {'D'}
+    net.set_current_context('default')
+    net.retract_wft('R(A, B)')
+    assert names(net.paths_from(['A'], 'kplus(rel)')) == set()
+
+def test_irreflexive_restrict_kept_around_materialized_slot():
+    net = new_network('kstar(compose(ra-, rb))')
+    net.materialize_slot('rel')
+    expected = {'B', 'D'}
+    assert names(net.paths_from(['A'], 'irreflexive-restrict(rel)')) == expected
+    net.optimize_paths = False
+    assert names(net.paths_from(['A'], 'irreflexive-restrict(rel)')) == expected
+
+def test_materialized_slot_followed_in_named_context():
+    net = new_network('compose(ra-, !, rb)')
+    net.materialize_slot('rel')
+    assert names(net.paths_from(['A'], 'rel', 'other')) == {'D'}
+    assert names(net.paths_from_iter(['A'], 'rel', 'other')) == {'D'}
+    assert {name: names(nodes) for name, nodes in net.paths_from_all('rel', 'other').items()} == {'A': {'D'}}
+    assert net.path_connects('A', 'D', 'rel', context_name='other')
+    assert not net.path_connects('A', 'B', 'rel', context_name='other')
+    assert names(net.paths_from(['A'], 'rel')) == {'B'}
+
+def test_snapshot_keeps_beliefs_as_of_when_it_was_taken():
+    net = new_network('compose(ra-, !, rb)')
+    context = net.current_context
+    ab = net.build_wft('R(A, B)')
+    ac = net.build_wft('R(A, C)')
+    snapshot = context.snapshot()
+    net.assert_wft('R(A, C)')
+    net.retract(ab)
+    net.assert_wft('R(A, B)')
+    net.retract(ab)
+    assert ab in snapshot and ac not in snapshot
+    assert ac in context.snapshot() and ab not in context.snapshot()
+
+def test_iterating_query_ignores_later_beliefs():
+    net = new_network('compose(ra-, !, rb)')
+    derived = net.paths_from_iter(['A'], 'compose(ra-, !, rb)')
+    net.assert_wft('R(A, C)')
+    net.retract_wft('R(A, B)')
+    assert names(derived) == {'B'}
+
+def test_queries_in_threads_match_queries_in_turn():
+    net = new_network('compose(ra-, !, rb)')
+    for i in range(300):
+        net.assert_wft('R(N{}, N{})'.format(i, i + 1))
+    net.set_current_context('other')
+    for i in range(0, 300, 2):
+        net.assert_wft('R(N{}, N{})'.format(i, i + 1))
+    net.set_current_context('default')
+    net.materialize_slot('rel')
+    queries = [(start, path, context) for start in ('A', 'N0', 'N2')
+               for path in ('rel', 'kplus(compose(ra-, rb))') for context in ('default', 'other')]
+    expected = {query: names(net.paths_from([query[0]], query[1], query[2])) for query in queries}
+
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    try:
+        for _ in range(3):
+            # Each context's relation is derived again while the threads follow it
+            net.dematerialize_slot('rel')
+            net.materialize_slot('rel')
+            net.closure_cache.clear()
+            results = {}
+            def run(query):
+                results[query] = names(net.paths_from([query[0]], query[1], query[2]))
+            threads = [threading.Thread(target=run, args=(query,)) for query in queries]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert results == expected
+    finally:
+        sys.setswitchinterval(switch_interval)
@@ -0,0 +1,72 @@
+""" Saving whole networks to binary snapshots and loading them back. """
+
+import pytest
+from src import Network, Inference
+from src.sneps.Persistence import PersistenceError, MAGIC
+from src.snip.Search import Answer
+
+def new_network():
+    net = Network()
+    net.verbose = False
+    net.define_type('Agent', ['Thing'])
+    net.define_slot('owner', 'Agent', docstring="Who owns something")
+    net.define_slot('pet', 'Entity')
+    net.define_caseframe('Owns', 'Proposition', ['owner', 'pet'])
+    net.define_context('scenario', "A what-if")
+    net.assert_wft('Isa(every(x, Isa(x, Dog)), Animal)')
+    net.assert_wft('if(Isa(Fido, Dog), Isa(Fido, Pet))')
+    net.assert_wft('Isa(Fido, Dog)')
+    net.assert_wft('Owns(Alice, Fido)')
+    net.set_current_context('scenario')
+    net.assert_wft('Isa(Rex, Dog)')
+    net.set_current_context('default')
+    assert Inference(net).query('Isa(Fido, Pet)').answer is Answer.TRUE
+    return net
+
+def wfts(net) -> dict:
+    return {node.name: str(node) for node in net.nodes.values()}
+
+def beliefs(net) -> dict:
+    return {name: (sorted(str(node) for node in context.hyps), sorted(str(node) for node in context.ders))
+            for name, context in net.contexts.items()}
+
+def test_round_trip_keeps_nodes_definitions_and_beliefs(tmp_path):
+    net = new_network()
+    path = str(tmp_path / "net.snet")
+    net.save(path)
+    loaded = Network.load(path)
+    assert wfts(loaded) == wfts(net)
+    assert beliefs(loaded) == beliefs(net)
+    assert loaded.contexts['scenario'].parent is loaded.contexts['default']
+    assert loaded.contexts['scenario'].docstring == "A what-if"
+    assert loaded.find_slot('owner').docstring == "Who owns something"
+    assert set(loaded.caseframes) == set(net.caseframes)
+    types = loaded.sem_hierarchy
+    assert types.get_type('Thing').subtype(types.get_type('Agent'))
+
+def test_loaded_network_reuses_nodes_and_infers(tmp_path):
+    path = str(tmp_path / "net.snet")
+    new_network().save(path)
+    loaded = Network.load(path)
+    loaded.verbose = False
+    size = len(loaded.nodes)
+    assert loaded.build_wft('Owns(Alice, Fido)') in loaded.current_context.hyps
+    assert len(loaded.nodes) == size
+    inf = Inference(loaded)
+    assert inf.query('Isa(Fido, Animal)').answer is Answer.TRUE
+    loaded.set_current_context('scenario')
+    assert inf.query('Isa(Rex, Animal)').answer is Answer.TRUE
+
+def test_loaded_network_saves_the_same_network():
+    net = new_network()
+    again = Network.from_snapshot_bytes(Network.from_snapshot_bytes(net.snapshot_bytes()).snapshot_bytes())
+    assert wfts(again) == wfts(net)
+    assert beliefs(again) == beliefs(net)
+
+def test_other_files_are_rejected(tmp_path):
+    with pytest.raises(PersistenceError):
+        Network.from_snapshot_bytes(b'not a snapshot')
+    data = bytearray(new_network().snapshot_bytes())
+    data[len(MAGIC)] = 99 # The version, first in the header
+    with pytest.raises(PersistenceError):
+        Network.from_snapshot_bytes(bytes(data))
@@ -0,0 +1,67 @@
+""" Unit propagation over andor and thresh rules, and how it agrees with backward chaining. """
+
+from src import Network, Inference
+from src.snip.Search import Answer
+
+ARGUMENTS = ['Isa(A, B)', 'Isa(C, D)', 'Isa(E, F)', 'Isa(G, H)']
+
+def new_network():
+    net = Network()
+    net.verbose = False
+    return net
+
+def backward_chaining(net) -> Inference:
+    """ An Inference which only chains backward through the rules. """
+    inf = Inference(net)
+    inf._by_propagation = lambda wft: False
+    return inf
+
+def wfts(nodes) -> set:
+    return set(str(node) for node in nodes)
+
+def test_propagation_agrees_with_backward_chaining():
+    rule = 'and(Isa(A, B), and(Isa(C, D), Isa(E, F)))'
+    net = new_network()
+    net.assert_wft(rule)
+    propagated = wfts(Inference(net).propagate())
+
+    other = new_network()
+    other.assert_wft(rule)
+    inf = backward_chaining(other)
+    chained = set(wft for wft in ARGUMENTS if inf.query(wft).answer is Answer.TRUE)
+    assert chained == {'Isa(A, B)', 'Isa(C, D)', 'Isa(E, F)'}
+    assert chained <= propagated
+
+def test_propagation_forces_negations_backward_chaining_misses():
+    net = new_network()
+    net.assert_wft('xor(Isa(A, B), Isa(C, D), Isa(E, F))')
+    net.assert_wft('Isa(A, B)')
+    assert wfts(Inference(net).propagate()) == {'not(Isa(C, D))', 'not(Isa(E, F))'}
+    assert Inference(net).query('not(Isa(C, D))').answer is Answer.TRUE
+
+    other = new_network()
+    other.assert_wft('xor(Isa(A, B), Isa(C, D), Isa(E, F))')
+    other.assert_wft('Isa(A, B)')
+    assert backward_chaining(other).query('not(Isa(E, F))').answer is Answer.FALSE
+
+def test_thresh_forces_the_other_argument():
+    net = new_network()
+    net.assert_wft('iff(Isa(A, B), Isa(C, D))')
+    net.assert_wft('Isa(A, B)')
+    assert wfts(Inference(net).propagate()) == {'Isa(C, D)'}
+
+def test_sync_decides_only_new_beliefs_until_a_retraction():
+    net = new_network()
+    inf = Inference(net)
+    net.assert_wft('xor(Isa(A, B), Isa(C, D))')
+    net.assert_wft('xor(Isa(E, F), Isa(G, H))')
+    assert inf.propagate() == set()
+    net.assert_wft('Isa(A, B)')
+    assert wfts(inf.propagate()) == {'not(Isa(C, D))'}
+    net.assert_wft('Isa(E, F)')
+    assert wfts(inf.propagate()) == {'not(Isa(G, H))'}
+    net.retract_wft('Isa(E, F)')
+    assert not net.believes(net.build_wft('not(Isa(G, H))'))
+    # Decisions resting on the retracted belief are forgotten
+    net.assert_wft('Isa(G, H)')
+    assert wfts(inf.propagate()) == {'not(Isa(E, F))'}
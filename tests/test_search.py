@@ -0,0 +1,51 @@
+""" Budgeted backward chaining: queries stop with UNKNOWN when their budget runs out. """
+
+from src import Network, Inference
+from src.snip.Search import Answer, Budget, CancellationToken
+
+CHAIN_LENGTH = 6
+
+def chain_network():
+    """ Isa(Rex, C0), and if(Isa(Rex, Ci), Isa(Rex, Ci+1)) along the chain. """
+    net = Network()
+    net.verbose = False
+    net.assert_wft('Isa(Rex, C0)')
+    for i in range(CHAIN_LENGTH):
+        net.assert_wft('if(Isa(Rex, C{}), Isa(Rex, C{}))'.format(i, i + 1))
+    return net
+
+END = 'Isa(Rex, C{})'.format(CHAIN_LENGTH)
+
+def test_unlimited_query_reaches_the_end_of_the_chain():
+    result = Inference(chain_network()).query(END)
+    assert result.answer is Answer.TRUE
+    assert result.steps > CHAIN_LENGTH
+
+def test_step_limit_gives_unknown():
+    result = Inference(chain_network()).query(END, Budget(max_steps=3))
+    assert result.answer is Answer.UNKNOWN
+    assert result.reason == "step limit"
+    assert result.steps == 3
+    assert not result
+
+def test_depth_limit_gives_unknown_not_false():
+    result = Inference(chain_network()).query(END, Budget(max_depth=3))
+    assert result.answer is Answer.UNKNOWN
+    assert result.reason == "depth limit"
+
+def test_underivable_query_within_budget_is_false():
+    result = Inference(chain_network()).query('Isa(Rex, Cat)', Budget(max_steps=1000, max_depth=50))
+    assert result.answer is Answer.FALSE
+
+def test_cancelled_and_timed_out_queries_give_unknown():
+    token = CancellationToken()
+    token.cancel()
+    result = Inference(chain_network()).query(END, Budget(token=token))
+    assert (result.answer, result.reason) == (Answer.UNKNOWN, "cancelled")
+    result = Inference(chain_network()).query(END, Budget(timeout=-1))
+    assert (result.answer, result.reason) == (Answer.UNKNOWN, "timeout")
+
+def test_default_budget_used_when_none_given():
+    inf = Inference(chain_network(), Budget(max_steps=3))
+    assert inf.query(END).answer is Answer.UNKNOWN
+    assert inf.query(END, Budget()).answer is Answer.TRUE
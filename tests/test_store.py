@@ -0,0 +1,45 @@
+""" Nodes kept in a SQLite node store keep their changes once evicted from its cache. """
+
+import gc
+
+from src import Network
+
+def evict(net) -> None:
+    net.node_store.clear_cache()
+    gc.collect()
+
+def test_retype_survives_eviction(tmp_path):
+    net = Network()
+    net.verbose = False
+    net.define_term("Dog")
+    net.use_sqlite_store(str(tmp_path / "nodes.db"), cache_size=1)
+    # Filling the class slot retypes Dog to Category
+    net.assert_wft("Isa(Rex, Dog)")
+    assert net.nodes["Dog"].sem_type.name == "Category"
+    # The parser holds on to the last wft it built, so another is parsed before evicting
+    net.assert_wft("Isa(Tom, Cat)")
+    evict(net)
+    assert "Dog" not in net.node_store.live
+    assert net.nodes["Dog"].sem_type.name == "Category"
+
+def test_respecified_term_survives_eviction(tmp_path):
+    net = Network()
+    net.verbose = False
+    net.define_term("Cat")
+    net.use_sqlite_store(str(tmp_path / "nodes.db"), cache_size=1)
+    net.define_term("Cat", "Category")
+    net.define_term("Tom")
+    evict(net)
+    assert "Cat" not in net.node_store.live
+    assert net.nodes["Cat"].sem_type.name == "Category"
+
+def test_closure_cache_bounded_like_node_cache(tmp_path):
+    net = Network()
+    net.verbose = False
+    for i in range(20):
+        net.assert_wft("Isa(C{}, C{})".format(i, i + 1))
+    net.use_sqlite_store(str(tmp_path / "nodes.db"), cache_size=5)
+    assert net.closure_cache.max_nodes == 5
+    for i in range(20):
+        net.paths_from(["C{}".format(i)], "kplus(compose(member-, class))")
+    assert net.closure_cache.size <= 5
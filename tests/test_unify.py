@@ -0,0 +1,49 @@
+""" Matching terms against the network through the discrimination tree, and instantiating generic terms. """
+
+from src import Network, Inference
+from src.snip.Search import Answer
+from src.snip.Unify import Matcher
+
+def new_network():
+    net = Network()
+    net.verbose = False
+    net.assert_wft('Isa(every(x, Isa(x, Dog)), Animal)')
+    net.assert_wft('Isa(Fido, Dog)')
+    return net
+
+def names(nodes) -> set:
+    return set(str(node) for node in nodes)
+
+def test_generic_term_binds_variable_satisfying_its_restriction():
+    net = new_network()
+    inf = Inference(net)
+    unifiers = dict((str(node), subst) for node, subst in inf.unifiers('Isa(Fido, Animal)'))
+    assert unifiers.pop('Isa(Fido, Animal)') == {}
+    [(generic, subst)] = unifiers.items()
+    assert generic.startswith('Isa(every(')
+    assert list(subst.values()) == [net.nodes['Fido']]
+
+def test_restrictions_not_believed_give_no_unifier():
+    net = new_network()
+    inf = Inference(net)
+    assert names(node for node, _ in inf.unifiers('Isa(Rex, Animal)')) == {'Isa(Rex, Animal)'}
+    assert inf.query('Isa(Fido, Animal)').answer is Answer.TRUE
+    assert inf.query('Isa(Rex, Animal)').answer is Answer.FALSE
+    net.assert_wft('Isa(Rex, Dog)')
+    assert inf.query('Isa(Rex, Animal)').answer is Answer.TRUE
+
+def test_tree_only_yields_nodes_which_might_unify():
+    net = new_network()
+    net.assert_wft('Isa(Rex, Cat)')
+    net.assert_wft('Member(Fido, Pack)')
+    matcher = Matcher.of(net)
+    candidates = set(matcher.tree.candidates(net.build_wft('Isa(Fido, Animal)')))
+    generic = [node for node in net.current_context.hyps if str(node).startswith('Isa(every(') and str(node).endswith('Animal)')]
+    assert candidates == set(generic) | {net.build_wft('Isa(Fido, Animal)')}
+
+def test_matcher_shared_and_kept_up_to_date():
+    net = new_network()
+    first, second = Inference(net), Inference(net)
+    assert first.matcher is second.matcher
+    net.assert_wft('Isa(Rex, Dog)')
+    assert 'Isa(Rex, Dog)' in names(first.matcher.tree.candidates(net.build_wft('Isa(Rex, Dog)')))
@@ -0,0 +1,182 @@
+""" Exporting networks and parts of them, and the caseframe summary. """
+
+import io
+import xml.etree.ElementTree as ElementTree
+
+import pytest
+from src import Network
+from src.sneps.SNError import SNError
+from src.sneps.Visualization import CaseframeSummary
+
+GRAPHML = '{http://graphml.graphdrawing.org/xmlns}'
+
+def new_network():
+    net = Network()
+    net.verbose = False
+    net.define_context('other')
+    net.assert_wft('Isa(Fido, Dog)')
+    net.set_current_context('other')
+    net.assert_wft('Isa(Rex, Cat)')
+    net.set_current_context('default')
+    net.build_wft('Isa(Tom, Cat)')
+    return net
+
+def graphml(net, **filters):
+    """ Returns the nodes (mapped to whether they are asserted) and the edges of a GraphML export. """
+    out = io.StringIO()
+    net.export_graphml(out, **filters)
+    graph = ElementTree.fromstring(out.getvalue()).find(GRAPHML + 'graph')
+    nodes = {node.get('id'): node.find(GRAPHML + "data[@key='asserted']").text == 'true'
+             for node in graph.iter(GRAPHML + 'node')}
+    edges = set((edge.get('source'), edge.get('target'), edge.find(GRAPHML + 'data').text)
+                for edge in graph.iter(GRAPHML + 'edge'))
+    return nodes, edges
+
+def dot(net, **filters) -> list:
+    out = io.StringIO()
+    net.export_dot(out, **filters)
+    return out.getvalue().splitlines()
+
+def test_graphml_holds_every_node_and_cable():
+    net = new_network()
+    nodes, edges = graphml(net)
+    assert set(nodes) == set(node.name for node in net.nodes.values())
+    fido = net.build_wft('Isa(Fido, Dog)').name
+    assert nodes[fido] and not nodes[net.build_wft('Isa(Rex, Cat)').name]
+    assert (fido, 'Fido', 'member') in edges and (fido, 'Dog', 'class') in edges
+    assert len(edges) == 6
+
+def test_filtered_exports_keep_both_ends_of_each_edge():
+    net = new_network()
+    rex = net.build_wft('Isa(Rex, Cat)').name
+    nodes, edges = graphml(net, context='other')
+    # Beliefs inherited from the parent context are exported, and marked, too
+    assert nodes == {net.build_wft('Isa(Fido, Dog)').name: True, rex: True,
+                     'Fido': False, 'Dog': False, 'Rex': False, 'Cat': False}
+    assert all(source in nodes and target in nodes for source, target, _ in edges)
+    nodes, _ = graphml(net, nodes=['Tom'], caseframes=None)
+    assert nodes == {'Tom': False}
+    nodes, _ = graphml(net, caseframes=['Isa'], context='default')
+    assert sorted(nodes) == sorted([net.build_wft('Isa(Fido, Dog)').name, 'Fido', 'Dog'])
+
+def test_dot_written_to_a_file(tmp_path):
+    net = new_network()
+    path = str(tmp_path / "network.dot")
+    net.export_dot(path, context='other')
+    with open(path, encoding='utf-8') as file:
+        lines = file.read().splitlines()
+    assert lines == dot(net, context='other')
+    assert lines[0] == 'digraph network {' and lines[-1] == '}'
+    rex = net.build_wft('Isa(Rex, Cat)').name
+    assert '  "{}" [label="{}!"];'.format(rex, rex) in lines
+    assert '  "{}" -> "Rex" [label="member"];'.format(rex) in lines
+
+def test_unknown_filters_are_errors():
+    net = new_network()
+    with pytest.raises(SNError):
+        dot(net, context='nowhere')
+    with pytest.raises(SNError):
+        dot(net, caseframes=['Nothing'])
+
+def pets_network():
+    net = Network()
+    net.verbose = False
+    for wft_str in ('Isa(Fido, Dog)', 'Isa(Fido, Pet)', 'Isa(Rex, Dog)', 'Isa(every(x, Isa(x, Cat)), Pet)'):
+        net.assert_wft(wft_str)
+    return net
+
+def names(nodes) -> set:
+    """ Base node names, and the wfts of molecular nodes, whose names depend on the order they were built in. """
+    return set(str(node) if hasattr(node, 'frame') else node.name for node in nodes)
+
+def arbitrary(net) -> str:
+    return next(node.name for node in net.nodes.values() if type(node).__name__ == 'Arbitrary')
+
+def test_subgraph_grows_with_radius():
+    net = pets_network()
+    assert names(net.subgraph(['Fido'], radius=0)) == {'Fido'}
+    assert names(net.subgraph(['Fido'], radius=1)) == {'Fido', 'Isa(Fido, Dog)', 'Isa(Fido, Pet)'}
+    around = net.subgraph(['Fido'], radius=3)
+    assert names(around) == {'Fido', 'Isa(Fido, Dog)', 'Isa(Fido, Pet)', 'Dog', 'Pet', 'Isa(Rex, Dog)',
+                                  'Isa(every(arb1, [Isa(arb1, Cat)]), Pet)'.replace('arb1', arbitrary(net))}
+    assert around.distances[net.nodes['Dog']] == 2
+    assert 'Rex' not in names(around)
+
+def test_subgraph_follows_only_the_given_directions_and_slots():
+    net = pets_network()
+    fido_dog = net.build_wft('Isa(Fido, Dog)').name
+    assert names(net.subgraph(['Fido'], radius=2, directions=['down'])) == {'Fido'}
+    assert names(net.subgraph([fido_dog], radius=2, directions=['down'])) == {'Isa(Fido, Dog)', 'Fido', 'Dog'}
+    assert names(net.subgraph(['Dog'], radius=2, slots=['member'])) == {'Dog'}
+    assert names(net.subgraph(['Dog'], radius=2, slots=['class'])) == \
+        {'Dog', 'Isa(Fido, Dog)', 'Isa(Rex, Dog)'}
+    arb = net.nodes[arbitrary(net)]
+    assert set(net.subgraph([arb.name], radius=1, directions=['restriction'])) == {arb} | set(arb.restriction_set)
+
+def test_exports_draw_only_the_subgraph():
+    net = pets_network()
+    subgraph = net.subgraph(['Dog'], radius=1, directions=['up'])
+    nodes, edges = graphml(net, nodes=subgraph)
+    assert set(nodes) == set(node.name for node in subgraph)
+    fido_dog = net.build_wft('Isa(Fido, Dog)').name
+    rex_dog = net.build_wft('Isa(Rex, Dog)').name
+    assert edges == {(fido_dog, 'Dog', 'class'), (rex_dog, 'Dog', 'class')}
+
+def test_subgraph_arguments_are_checked():
+    net = pets_network()
+    with pytest.raises(SNError):
+        net.subgraph(['Nobody'])
+    with pytest.raises(SNError):
+        net.subgraph(['Fido'], slots=['nothing'])
+    with pytest.raises(SNError):
+        net.subgraph(['Fido'], directions=['sideways'])
+
+def recount(net) -> CaseframeSummary:
+    """ The summary of the network's nodes as they are now. """
+    summary = CaseframeSummary()
+    for node in net.nodes.values():
+        summary.add(node)
+    return summary
+
+def owners_network():
+    net = Network()
+    net.verbose = False
+    net.define_type('Agent', ['Entity'])
+    net.define_slot('owner', 'Agent')
+    net.define_caseframe('Owns', 'Proposition', ['owner', 'member'])
+    for wft_str in ('Isa(Fido, Dog)', 'Isa(Rex, Dog)', 'Isa(Alice, Person)', 'Owns(Bob, [Fido, Rex])'):
+        net.assert_wft(wft_str)
+    return net
+
+def test_summary_counts_caseframes_types_and_cables():
+    net = owners_network()
+    summary = net.summary
+    assert summary.frame_nodes == {'Isa': 3, 'Owns': 1}
+    assert summary.caseframe_types == {'Isa': 'Propositional', 'Owns': 'Proposition'}
+    assert summary.cables[('Isa', 'member', 'Entity')] == 3
+    assert summary.cables[('Owns', 'member', 'Entity')] == 2
+    assert summary.max_fillers[('Owns', 'member')] == 2
+    edges = {(caseframe, slot, type_name): (count, mean, most)
+             for caseframe, slot, type_name, count, mean, most in summary.edges()}
+    assert edges[('Owns', 'member', 'Entity')] == (2, 2.0, 2)
+    assert edges[('Isa', 'class', 'Category')] == (3, 1.0, 1)
+
+def test_summary_follows_retyped_nodes():
+    net = owners_network()
+    # Alice was an Entity in Isa, and becomes an Agent here
+    net.assert_wft('Owns(Alice, Fido)')
+    assert net.nodes['Alice'].sem_type.name == 'Agent'
+    fresh = recount(net)
+    assert net.summary.type_nodes == fresh.type_nodes
+    assert net.summary.frame_nodes == fresh.frame_nodes
+    assert net.summary.cables == fresh.cables
+    assert net.summary.cables[('Isa', 'member', 'Agent')] == 1
+
+def test_summary_exported_as_dot():
+    net = owners_network()
+    out = io.StringIO()
+    net.export_summary(out)
+    lines = out.getvalue().splitlines()
+    assert '  "frame Owns" [label="Owns: Proposition (1 nodes)", shape=box];' in lines
+    assert '  "frame Owns" -> "type Agent" [label="owner x1, 1.0 per node (max 1)"];' in lines
+    assert sum(line.count(' -> ') for line in lines) == len(list(net.summary.edges()))